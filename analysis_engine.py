@@ -0,0 +1,279 @@
+# -*- coding: utf-8 -*-
+"""
+供应链物料时间差距分析工具 - 分析引擎
+
+与 Streamlit 无关的纯计算函数，各页面统一调用。
+"""
+
+import numpy as np
+import pandas as pd
+
+from diagnostics import stage
+
+# 一天对应的纳秒数
+NS_PER_DAY = 86_400 * 1_000_000_000
+
+# 采购计划与到货数据的关联键
+KEY_COLUMNS = ['物料编号', '架次']
+
+# 到货汇总输出列
+ROLLUP_COLUMNS = ['已到货数量', '首次到货日期', '最后到货日期', '到货批次数', '齐套日期']
+
+
+def calculate_days_difference(demand_date, delivery_date):
+    """计算需求日期与到货日期之间的天数差距（逐行标量版本，仅作对照基准）"""
+    if pd.isna(demand_date) or pd.isna(delivery_date):
+        return None
+    return (delivery_date - demand_date).days
+
+
+def _as_datetime_values(values):
+    """将任意日期序列转换为 datetime64[ns] 数组，无法解析的值记为 NaT"""
+    series = pd.Series(values, copy=False)
+    if not pd.api.types.is_datetime64_any_dtype(series):
+        series = pd.to_datetime(series, errors='coerce')
+    if getattr(series.dt, 'tz', None) is not None:
+        series = series.dt.tz_localize(None)
+    return series.to_numpy(dtype='datetime64[ns]')
+
+
+def compute_days_gap(demand_dates, delivery_dates):
+    """向量化计算天数差距（到货日期 - 需求日期）
+
+    任一日期缺失时结果为 <NA>，返回整数天的 Int64 数组，
+    取整方式与 Timedelta.days 一致（向下取整）。
+    """
+    demand = _as_datetime_values(demand_dates)
+    delivery = _as_datetime_values(delivery_dates)
+
+    missing = np.isnat(demand) | np.isnat(delivery)
+    # 先把缺失位置置零，避免 NaT 参与整数运算时溢出
+    demand_ns = np.where(missing, 0, demand.view('i8'))
+    delivery_ns = np.where(missing, 0, delivery.view('i8'))
+    days = np.floor_divide(delivery_ns - demand_ns, NS_PER_DAY)
+
+    return pd.arrays.IntegerArray(days.astype('int64'), missing)
+
+
+def add_days_gap(merged_data, demand_col='需求日期', delivery_col='实际到货日期', out_col='天数差距'):
+    """为合并后的数据添加天数差距列（原地修改并返回）"""
+    merged_data[out_col] = compute_days_gap(merged_data[demand_col], merged_data[delivery_col])
+    return merged_data
+
+
+def factorize_keys(frame):
+    """将(物料编号, 架次)组合键编码为连续整数
+
+    返回 (codes, keys)：codes 为每行的组号，keys 为按组号排列的唯一键表。
+    物料编号或架次为空的行组号为 -1，不进入键表（与 KeyIndex 一致）。
+    """
+    material_codes, materials = pd.factorize(frame['物料编号'])
+    batch_codes, batches = pd.factorize(frame['架次'])
+    combined = material_codes.astype('int64') * max(len(batches), 1) + batch_codes
+    keyed = (material_codes >= 0) & (batch_codes >= 0)
+    codes = np.full(len(combined), -1, dtype='int64')
+    codes[keyed], uniques = pd.factorize(combined[keyed])
+    # 用 take 取值，分类类型的键列保持原有分类，关联时无需转换
+    keys = pd.DataFrame({
+        '物料编号': materials.take(uniques // max(len(batches), 1)),
+        '架次': batches.take(uniques % max(len(batches), 1))
+    })
+    return codes, keys
+
+
+class KeyIndex:
+    """采购计划的(物料编号, 架次)编码，其他数据集按同一编码映射，计划中没有的键记为 -1
+
+    编码为 0 ~ 计划键数-1 的连续整数（n_keys 个），可直接作为数组下标。
+    """
+
+    def __init__(self, plans):
+        self._uniques = {}
+        codes = []
+        for col in ['物料编号', '架次']:
+            col_codes, uniques = pd.factorize(plans[col].astype(object))
+            self._uniques[col] = uniques
+            codes.append(col_codes.astype('int64'))
+        self._n_batches = max(len(self._uniques['架次']), 1)
+        combined = self._combine(*codes)
+        self._keys = pd.Index(np.unique(combined[combined >= 0]))
+        self.codes = self._dense(combined)
+        self.n_keys = len(self._keys)
+
+    def _combine(self, material_codes, batch_codes):
+        codes = material_codes * self._n_batches + batch_codes
+        codes[(material_codes < 0) | (batch_codes < 0)] = -1
+        return codes
+
+    def _dense(self, combined):
+        return self._keys.get_indexer(combined)
+
+    def encode(self, events):
+        """把其他数据集的键映射到计划键编码（分类列只需重映射分类本身）"""
+        return self._dense(self._combine(*(
+            pd.Categorical(events[col], categories=self._uniques[col]).codes.astype('int64')
+            for col in ['物料编号', '架次']
+        )))
+
+
+def rollup_deliveries(deliveries, procurement_plans=None):
+    """将到货明细汇总为每个(物料编号, 架次)一行
+
+    输出累计到货数量、首次/最后到货日期、到货批次数，以及累计到货数量
+    首次覆盖需求数量的齐套日期（需提供采购计划，否则为空）。
+    先按到货日期整体排序，再用分组累计和计算，不做逐组循环。
+    """
+    if deliveries.empty:
+        return pd.DataFrame(columns=KEY_COLUMNS + ROLLUP_COLUMNS)
+
+    codes, rollup = factorize_keys(deliveries)
+    n_groups = len(rollup)
+    quantities = pd.to_numeric(deliveries['已到货数量'], errors='coerce').fillna(0).to_numpy(dtype='float64')
+    dates = _as_datetime_values(deliveries['实际到货日期'])
+
+    # 物料编号或架次为空的到货无法关联到计划，不参与汇总
+    keyed = codes >= 0
+    if not keyed.all():
+        codes, quantities, dates = codes[keyed], quantities[keyed], dates[keyed]
+
+    rollup['已到货数量'] = np.bincount(codes, weights=quantities, minlength=n_groups)
+    rollup['到货批次数'] = np.bincount(codes, minlength=n_groups)
+    date_range = pd.Series(dates).groupby(codes).agg(['min', 'max'])
+    rollup['首次到货日期'] = date_range['min'].to_numpy()
+    rollup['最后到货日期'] = date_range['max'].to_numpy()
+    rollup['齐套日期'] = pd.Series(pd.NaT, index=rollup.index, dtype='datetime64[ns]')
+
+    if procurement_plans is not None and not procurement_plans.empty and '需求数量' in procurement_plans.columns:
+        demand = (
+            pd.to_numeric(procurement_plans['需求数量'], errors='coerce')
+            .groupby([procurement_plans['物料编号'], procurement_plans['架次']], sort=False, observed=True)
+            .sum()
+            .rename_axis(KEY_COLUMNS)
+        )
+        group_demand = demand.reindex(pd.MultiIndex.from_frame(rollup[KEY_COLUMNS])).to_numpy(dtype='float64')
+
+        # 稳定排序：同一键内按到货日期先后累计，日期缺失的记录排在最后
+        sort_key = np.where(np.isnat(dates), np.iinfo('int64').max, dates.view('i8'))
+        order = np.argsort(sort_key, kind='stable')
+        sorted_codes = codes[order]
+        cumulative = pd.Series(quantities[order]).groupby(sorted_codes).cumsum().to_numpy()
+
+        # 每组第一条累计数量达到需求的到货记录即为齐套
+        covered = np.flatnonzero(cumulative >= group_demand[sorted_codes])
+        filled_groups, first_pos = np.unique(sorted_codes[covered], return_index=True)
+        fill_dates = np.full(n_groups, np.datetime64('NaT'), dtype='datetime64[ns]')
+        fill_dates[filled_groups] = dates[order][covered[first_pos]]
+        rollup['齐套日期'] = fill_dates
+
+    rollup['已到货数量'] = _restore_integer(rollup['已到货数量'])
+    return rollup[KEY_COLUMNS + ROLLUP_COLUMNS]
+
+
+def _restore_integer(values):
+    """汇总结果若全为整数则还原为 int64"""
+    if len(values) and np.all(np.mod(values, 1) == 0):
+        return values.astype('int64')
+    return values
+
+
+def build_analysis_dataset(procurement_plans, deliveries):
+    """合并采购计划与到货数据，生成各页面共用的分析数据集
+
+    到货数据先汇总为每个(物料编号, 架次)一行再关联，分批到货不会复制计划行。
+    实际到货日期取齐套日期，尚未齐套的取最后到货日期。
+    包含天数差距、已到货数量（缺失记为0）和完成率列。
+    """
+    with stage('到货汇总'):
+        rollup = rollup_deliveries(deliveries, procurement_plans)
+
+    with stage('合并'):
+        merged_data = pd.merge(
+            procurement_plans,
+            rollup,
+            on=KEY_COLUMNS,
+            how='left',
+            validate='many_to_one'
+        )
+        merged_data['实际到货日期'] = merged_data['齐套日期'].fillna(merged_data['最后到货日期'])
+        merged_data['到货批次数'] = merged_data['到货批次数'].fillna(0).astype('int64')
+
+    # 计算天数差距
+    with stage('天数差距'):
+        add_days_gap(merged_data)
+
+    # 填充缺失的到货数量为0，并计算完成率
+    merged_data['已到货数量'] = pd.to_numeric(merged_data['已到货数量'], errors='coerce').fillna(0)
+    merged_data['完成率'] = (merged_data['已到货数量'] / merged_data['需求数量'] * 100).round(2)
+
+    return merged_data
+
+
+def build_batch_summary(merged_data):
+    """一次分组计算所有架次的汇总指标
+
+    每个架次一行：物料种类数、总需求数量、总到货数量、完成率(%)、延迟数、最大延迟(天)。
+    """
+    columns = ['物料种类数', '总需求数量', '总到货数量', '完成率', '延迟数', '最大延迟']
+    if merged_data.empty:
+        return pd.DataFrame(columns=columns, index=pd.Index([], name='架次'))
+
+    batches = merged_data['架次']
+    gaps = merged_data['天数差距']
+    summary = pd.DataFrame({
+        '需求数量': pd.to_numeric(merged_data['需求数量'], errors='coerce'),
+        '已到货数量': merged_data['已到货数量'],
+        '延迟': gaps.gt(0).fillna(False).astype('int64'),
+        '天数差距': gaps.astype('Float64')
+    }).groupby(batches, observed=True, sort=True).agg(
+        物料种类数=('需求数量', 'size'),
+        总需求数量=('需求数量', 'sum'),
+        总到货数量=('已到货数量', 'sum'),
+        延迟数=('延迟', 'sum'),
+        最大延迟=('天数差距', 'max')
+    )
+    summary.index.name = '架次'
+    required = summary['总需求数量'].where(summary['总需求数量'] > 0)
+    summary['完成率'] = (summary['总到货数量'] / required * 100).fillna(0).round(2)
+    return summary[columns]
+
+
+def batch_row_index(merged_data):
+    """按架次分组的行位置索引 {架次: 行位置数组}，切换架次时按位置直接取行"""
+    if merged_data.empty:
+        return {}
+    return merged_data.groupby('架次', observed=True, sort=False).indices
+
+
+def build_supplier_summary(merged_data):
+    """一次分组计算所有供应商的汇总指标
+
+    每个供应商一行：计划行数、总需求数量、总到货数量、完成率(%)、
+    平均时间差距(天)、按时到货率(%)、延迟数、最大延迟(天)。
+    """
+    columns = ['计划行数', '总需求数量', '总到货数量', '完成率', '平均时间差距', '按时到货率', '延迟数', '最大延迟']
+    if merged_data.empty or '供应商' not in merged_data.columns:
+        return pd.DataFrame(columns=columns, index=pd.Index([], name='供应商'))
+
+    gaps = merged_data['天数差距']
+    summary = pd.DataFrame({
+        '需求数量': pd.to_numeric(merged_data['需求数量'], errors='coerce'),
+        '已到货数量': merged_data['已到货数量'],
+        '按时': gaps.le(0).fillna(False).astype('int64'),
+        '延迟': gaps.gt(0).fillna(False).astype('int64'),
+        '天数差距': gaps.astype('Float64')
+    }).groupby(merged_data['供应商'], observed=True, sort=True).agg(
+        计划行数=('需求数量', 'size'),
+        总需求数量=('需求数量', 'sum'),
+        总到货数量=('已到货数量', 'sum'),
+        按时数=('按时', 'sum'),
+        延迟数=('延迟', 'sum'),
+        平均时间差距=('天数差距', 'mean'),
+        最大延迟=('天数差距', 'max')
+    )
+    summary.index.name = '供应商'
+    required = summary['总需求数量'].where(summary['总需求数量'] > 0)
+    summary['完成率'] = (summary['总到货数量'] / required * 100).fillna(0).round(2)
+    # 与首页口径一致：按时到货率以全部计划行为分母
+    summary['按时到货率'] = (summary['按时数'] / summary['计划行数'] * 100).round(2)
+    summary['平均时间差距'] = summary['平均时间差距'].round(2)
+    return summary[columns]
@@ -0,0 +1,73 @@
+# -*- coding: utf-8 -*-
+"""
+日期解析基准测试：pandas 按首个值推断格式（原实现）与按抽样推断格式的向量化解析的耗时和结果对比
+
+每种写法分别测试：标准日期、带时间、日/月/年、中文日期、文本形式的Excel序列号、
+混合写法（含空白和无法识别的值）、Excel日期单元格与文本混合。
+
+用法: python benchmarks/bench_dates.py [行数]
+"""
+
+import os
+import sys
+import time
+import warnings
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from date_parsing import EXCEL_EPOCH, parse_dates
+
+
+def make_cases(n_rows, seed=0):
+    """构造各种写法的日期列，返回 {名称: (日期列, 期望结果)}"""
+    rng = np.random.default_rng(seed)
+    expected = pd.Series(pd.Timestamp('2023-01-01') + pd.to_timedelta(rng.integers(0, 730, n_rows), unit='D'))
+    with_time = expected + pd.to_timedelta(rng.integers(0, 86_400, n_rows), unit='s')
+    serial = ((expected - pd.Timestamp(EXCEL_EPOCH)).dt.days).astype(str)
+
+    mixed = expected.dt.strftime('%Y-%m-%d').astype(object)
+    mixed[::3] = expected[::3].dt.strftime('%Y年%m月%d日')
+    mixed[1::50] = ''
+    mixed[2::1000] = '待定'
+    mixed_expected = expected.copy()
+    mixed_expected[1::50] = pd.NaT
+    mixed_expected[2::1000] = pd.NaT
+
+    cells = pd.Series(list(expected), dtype=object)
+    cells[::100] = expected[::100].dt.strftime('%Y/%m/%d')
+
+    return {
+        '标准日期': (expected.dt.strftime('%Y-%m-%d'), expected),
+        '带时间': (with_time.dt.strftime('%Y-%m-%d %H:%M:%S'), with_time),
+        '日/月/年': (expected.dt.strftime('%d/%m/%Y'), expected),
+        '中文日期': (expected.dt.strftime('%Y年%m月%d日'), expected),
+        'Excel序列号': (serial, expected),
+        '混合写法': (mixed, mixed_expected),
+        '日期单元格+文本': (cells, expected),
+    }
+
+
+def _timed(func):
+    start = time.perf_counter()
+    result = func()
+    return result, time.perf_counter() - start
+
+
+def run(n_rows):
+    print(f"行数: {n_rows:,}")
+    print(f"{'写法':<12}{'原实现':>10}{'错误行':>10}{'新实现':>10}{'错误行':>10}{'无法识别':>10}")
+    for name, (values, expected) in make_cases(n_rows).items():
+        with warnings.catch_warnings():
+            warnings.simplefilter('ignore', UserWarning)
+            legacy, legacy_seconds = _timed(lambda: pd.to_datetime(values, errors='coerce'))
+        (parsed, info), seconds = _timed(lambda: parse_dates(values))
+        legacy_wrong = int((legacy.ne(expected) & ~(legacy.isna() & expected.isna())).sum())
+        wrong = int((parsed.ne(expected) & ~(parsed.isna() & expected.isna())).sum())
+        print(f"{name:<12}{legacy_seconds:>9.3f}s{legacy_wrong:>10,}{seconds:>9.3f}s{wrong:>10,}{info['unparsed']:>10,}")
+
+
+if __name__ == '__main__':
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else 200_000)
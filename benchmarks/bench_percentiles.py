@@ -0,0 +1,100 @@
+# -*- coding: utf-8 -*-
+"""
+延迟分位数基准测试：按组精确计算分位数（pandas groupby.quantile）与分位数草图的耗时、内存和误差对比
+
+草图构建一次后，每种分组分别查询全部数据和只选部分供应商的结果，列出与精确值的最大误差（天），
+以及误差与上限 α·|精确值| + 0.5 天（相对误差加上取整）之比的最大值，应不超过 1。
+按物料编号、架次分组且带筛选条件时草图不能回答，页面改用 exact_group_percentiles，这里列出其耗时。
+另外用长尾分布（|差距| 达数千天）的数据检验相对误差上限。
+
+用法: python benchmarks/bench_percentiles.py [行数]
+"""
+
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from quantile_sketch import PERCENTILES, RELATIVE_ACCURACY, GapSketches, exact_group_percentiles
+
+COLUMNS = [f'P{p}' for p in PERCENTILES]
+
+
+def make_frame(n_rows, long_tail=False, seed=0):
+    """构造带缺失到货的分析数据集（只含草图用到的列）"""
+    rng = np.random.default_rng(seed)
+    n_materials = max(n_rows // 200, 10)
+    materials = rng.integers(0, n_materials, n_rows)
+    if long_tail:
+        gaps = np.round(rng.lognormal(3, 1.5, n_rows) * np.where(rng.random(n_rows) < 0.3, -1, 1))
+    else:
+        gaps = np.round(rng.normal(2.5, 10, n_rows))
+    gaps[rng.random(n_rows) < 0.05] = np.nan
+    return pd.DataFrame({
+        '供应商': pd.Categorical([f'供应商{i % 50 + 1:03d}' for i in range(n_materials)])[materials],
+        '物料类型': pd.Categorical(np.array(['紧固件', '密封件', '传动件', '电气件', '结构件', '管路件'])[materials % 6]),
+        '有效性': pd.Categorical(np.where(rng.random(n_rows) < 0.9, '有效', '不在有效架次')),
+        '物料编号': pd.Categorical([f'M{i:05d}' for i in range(n_materials)])[materials],
+        '架次': pd.Categorical([f'{i:03d}' for i in range(1, 201)])[rng.integers(0, 200, n_rows)],
+        '天数差距': gaps,
+    })
+
+
+def _timed(func):
+    start = time.perf_counter()
+    result = func()
+    return result, time.perf_counter() - start
+
+
+def exact(df, by, selections):
+    """精确分位数：按组排序取第 floor(q·(n-1)) 个值，与草图的取值方式相同"""
+    mask = np.ones(len(df), dtype=bool)
+    for dim, selected in selections.items():
+        mask &= df[dim].isin(selected).to_numpy()
+    subset = df.loc[mask & df['天数差距'].notna().to_numpy(), [by, '天数差距']]
+    table = subset.groupby(by, observed=True)['天数差距'].quantile(
+        [p / 100 for p in PERCENTILES], interpolation='lower').unstack()
+    table.columns = COLUMNS
+    table.index = table.index.astype(object)
+    return table
+
+
+def max_error(sketched, expected):
+    """草图结果与精确值的最大误差（天），以及误差与上限之比的最大值"""
+    sketched = sketched[COLUMNS].reindex(expected.index).to_numpy()
+    expected = expected.to_numpy()
+    error = np.abs(sketched - expected)
+    return float(error.max()), float(np.max(error / (RELATIVE_ACCURACY * np.abs(expected) + 0.5)))
+
+
+def run(n_rows):
+    print(f"行数: {n_rows:,}  误差上限: {RELATIVE_ACCURACY:.0%}")
+    for name, long_tail in (('正态', False), ('长尾', True)):
+        df = make_frame(n_rows, long_tail=long_tail)
+        sketches, seconds = _timed(lambda: GapSketches(df))
+        entries = sum(len(counts) for counts in sketches.counts.values())
+        memory = sum(counts.memory_usage(deep=False) for counts in sketches.counts.values()) / 1024 ** 2
+        print(f"\n[{name}] 草图构建 {seconds:.3f}s，计数 {entries:,} 项，{memory:.1f} MB")
+        print(f"{'分组':<8}{'筛选':<8}{'组数':>8}{'精确':>10}{'草图':>10}{'最大误差':>10}{'误差/上限':>10}"
+              "  （* 草图不覆盖，改为精确计算）")
+        for by in ('供应商', '物料类型', '物料编号', '架次'):
+            for label, selections in (('全部', {}), ('5个供应商', {'供应商': [f'供应商{i:03d}' for i in range(1, 6)]})):
+                expected, exact_seconds = _timed(lambda: exact(df, by, selections))
+                if sketches.covers(selections, by):
+                    sketched, sketch_seconds = _timed(lambda: sketches.percentiles(selections, by=by))
+                else:
+                    rows = np.flatnonzero(df['供应商'].isin(selections['供应商']).to_numpy())
+                    sketched, sketch_seconds = _timed(
+                        lambda: exact_group_percentiles(df['天数差距'].to_numpy()[rows], df[by].iloc[rows]))
+                    label += '*'
+                error, ratio = max_error(sketched, expected)
+                print(f"{by:<8}{label:<8}{len(expected):>8,}{exact_seconds * 1000:>8.1f}ms"
+                      f"{sketch_seconds * 1000:>8.1f}ms{error:>9.0f}天{ratio:>10.2f}")
+
+
+if __name__ == '__main__':
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000)
@@ -0,0 +1,209 @@
+# -*- coding: utf-8 -*-
+"""
+规模基准测试：在不同数据量下对各处理环节计时，结果写入 JSON 文件便于版本间对比
+
+环节：导入(CSV解析+紧凑类型) → 合并(分析数据集，含天数差距和有效性) → 天数差距 →
+架次/供应商汇总 → 筛选索引与查询 → 图表数据 → 报告导出
+
+用法:
+    python benchmarks/bench_scaling.py                          # 默认 1万/10万/100万/500万 行
+    python benchmarks/bench_scaling.py --sizes 10000 100000 --output results.json
+    python benchmarks/bench_scaling.py --sizes 100000 --compare benchmarks/results/上次.json
+"""
+
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from analysis_engine import batch_row_index, compute_days_gap
+from chart_data import histogram_figure, limit_bars, trend_figure
+from data_io import read_table_bytes
+from filter_engine import STATUS_DELAYED, FilterIndex
+from pipeline import build_flagged_dataset, summarize
+from reports import GAP_REPORT, SUMMARY_REPORT, write_report
+from sample_data import generate_sample_data
+from schema import compact_frame
+
+DEFAULT_SIZES = [10_000, 100_000, 1_000_000, 5_000_000]
+
+RESULTS_DIR = os.path.join(ROOT, 'benchmarks', 'results')
+
+# 对比时耗时增加超过该比例、且至少多出 REGRESSION_MIN_SECONDS 秒时视为性能回退
+REGRESSION_THRESHOLD = 0.2
+REGRESSION_MIN_SECONDS = 0.05
+
+
+def _peak_rss_mb():
+    """进程内存峰值(MB)，不支持的平台返回 None"""
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux 单位为 KB，macOS 为字节
+    return round(peak / (1024 * 1024 if sys.platform == 'darwin' else 1024), 1)
+
+
+def _git_commit():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+class Timer:
+    """依次记录各环节耗时"""
+
+    def __init__(self, rows):
+        self.rows = rows
+        self.results = []
+
+    def run(self, stage, func, *args, **kwargs):
+        started = time.perf_counter()
+        value = func(*args, **kwargs)
+        seconds = time.perf_counter() - started
+        self.results.append({'rows': self.rows, 'stage': stage, 'seconds': round(seconds, 4)})
+        print(f"  {stage:<16}{seconds:>10.3f} 秒")
+        return value
+
+
+def _ingest(plan_csv, delivery_csv):
+    plans = compact_frame(read_table_bytes(plan_csv, 'plans.csv', 'procurement_plans'), 'procurement_plans')
+    deliveries = compact_frame(read_table_bytes(delivery_csv, 'deliveries.csv', 'deliveries'), 'deliveries')
+    return plans, deliveries
+
+
+def _filter(merged_data):
+    index = FilterIndex(merged_data, dimensions=('供应商', '物料类型', '物料名称', '有效性'))
+    suppliers = index.options('供应商')[: max(len(index.options('供应商')) // 4, 1)]
+    start, end = index.date_bounds('需求日期')
+    positions = index.select(
+        STATUS_DELAYED, {'供应商': suppliers}, {'需求日期': (start, start + (end - start) / 2)}
+    )
+    index.gap_stats(positions)
+    index.group_mean_gap('供应商', positions)
+    return positions
+
+
+def _charts(merged_data, batch_summary):
+    histogram_figure(merged_data['天数差距'], 30, "天数差距分布", "天数差距", "频数")
+    trend_figure(merged_data['需求日期'], merged_data['天数差距'], "天数差距趋势", "需求日期", "天数差距")
+    limit_bars(batch_summary.reset_index(), '完成率')
+
+
+def _export(merged_data, batch_summary, report_type, compress=False):
+    with tempfile.TemporaryFile() as out:
+        write_report(report_type, merged_data, batch_summary, out, compress=compress)
+        return out.tell()
+
+
+def run_size(n_rows, args):
+    print(f"行数: {n_rows:,}")
+    timer = Timer(n_rows)
+    plans, deliveries = timer.run(
+        '生成数据', generate_sample_data, n_rows, args.batches, args.suppliers, args.partial_ratio, args.date_skew
+    )
+    n_deliveries = len(deliveries)
+
+    if not args.skip_ingest:
+        plan_csv = plans.to_csv(index=False).encode('utf-8')
+        delivery_csv = deliveries.to_csv(index=False).encode('utf-8')
+        del plans, deliveries
+        plans, deliveries = timer.run('导入', _ingest, plan_csv, delivery_csv)
+        del plan_csv, delivery_csv
+
+    merged_data = timer.run('合并', build_flagged_dataset, plans, deliveries)
+    del deliveries
+    timer.run('天数差距', compute_days_gap, merged_data['需求日期'], merged_data['实际到货日期'])
+    batch_summary, _ = timer.run('汇总', summarize, merged_data)
+    timer.run('架次索引', batch_row_index, merged_data)
+    timer.run('筛选', _filter, merged_data)
+    timer.run('图表数据', _charts, merged_data, batch_summary)
+    timer.run('导出CSV', _export, merged_data, batch_summary, GAP_REPORT)
+    timer.run('导出Excel汇总', _export, merged_data, batch_summary, SUMMARY_REPORT)
+
+    peak = _peak_rss_mb()
+    print(f"  到货记录 {n_deliveries:,} 条，内存峰值 {peak} MB")
+    return timer.results, {'rows': n_rows, 'deliveries': n_deliveries, 'peak_rss_mb': peak}
+
+
+def compare(results, baseline_path):
+    """与以前的结果文件对比，打印各环节耗时比（本次/基准）"""
+    with open(baseline_path, encoding='utf-8') as f:
+        baseline = json.load(f)
+    previous = {(r['rows'], r['stage']): r['seconds'] for r in baseline['results']}
+    print(f"\n与 {baseline_path}（{baseline['meta'].get('commit')}）对比：")
+    for r in results:
+        before = previous.get((r['rows'], r['stage']))
+        if before:
+            ratio = r['seconds'] / before
+            slower = ratio > 1 + REGRESSION_THRESHOLD and r['seconds'] - before >= REGRESSION_MIN_SECONDS
+            flag = "  ⚠️ 变慢" if slower else ""
+            print(f"  {r['rows']:>10,} {r['stage']:<16}{before:>9.3f} → {r['seconds']:>9.3f} 秒  ×{ratio:.2f}{flag}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="规模基准测试")
+    parser.add_argument('--sizes', type=int, nargs='+', default=DEFAULT_SIZES, help="采购计划行数")
+    parser.add_argument('--batches', type=int, default=200, help="架次数")
+    parser.add_argument('--suppliers', type=int, default=50, help="供应商数")
+    parser.add_argument('--partial-ratio', type=float, default=0.3, help="分批到货的计划行占比")
+    parser.add_argument('--date-skew', type=float, default=3.0, help="到货日期平均偏移(天)")
+    parser.add_argument('--skip-ingest', action='store_true', help="跳过CSV导入环节（大数据量时节省内存）")
+    parser.add_argument('--output', help="结果文件路径，默认写入 benchmarks/results/")
+    parser.add_argument('--compare', help="与以前的结果文件对比")
+    args = parser.parse_args(argv)
+
+    results, sizes = [], []
+    for n_rows in args.sizes:
+        size_results, size_info = run_size(n_rows, args)
+        results.extend(size_results)
+        sizes.append(size_info)
+
+    report = {
+        'meta': {
+            'timestamp': datetime.now().isoformat(timespec='seconds'),
+            'commit': _git_commit(),
+            'python': platform.python_version(),
+            'pandas': pd.__version__,
+            'numpy': np.__version__,
+            'platform': platform.platform(),
+            'cpu_count': os.cpu_count(),
+            'params': {
+                'batches': args.batches,
+                'suppliers': args.suppliers,
+                'partial_ratio': args.partial_ratio,
+                'date_skew': args.date_skew,
+                'skip_ingest': args.skip_ingest,
+            },
+        },
+        'sizes': sizes,
+        'results': results,
+    }
+    output = args.output or os.path.join(RESULTS_DIR, f"scaling_{datetime.now():%Y%m%d_%H%M%S}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    print(f"\n结果已写入 {output}")
+
+    if args.compare:
+        compare(results, args.compare)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,158 @@
+# -*- coding: utf-8 -*-
+"""
+启动基准测试：逐个页面测量冷启动和重新运行耗时
+
+每个页面在新的子进程中用 Streamlit 的 AppTest 运行（不启动浏览器和服务）：
+- 冷启动：新进程中第一次运行页面脚本的耗时（含页面及其依赖模块的导入），取多个进程的中位数
+- 重新运行：加载示例数据后，再次运行页面脚本的耗时中位数（相当于每次点击控件）
+同时记录冷启动时加载了哪些较重的模块（plotly.express、openpyxl 等）。
+每个子进程使用新的临时本地数据库，不读写 data/ 下的数据库。
+
+用法:
+    python benchmarks/bench_startup.py
+    python benchmarks/bench_startup.py --reruns 20 --cold-runs 5 --output startup.json
+    python benchmarks/bench_startup.py --scripts app.py pages/2_📈_时间差距分析.py
+"""
+
+import argparse
+import glob
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+RESULTS_DIR = os.path.join(ROOT, 'benchmarks', 'results')
+
+# 冷启动时检查是否已加载的较重模块
+HEAVY_MODULES = ['plotly.express', 'openpyxl', 'ingest', 'reports']
+
+DEFAULT_RERUNS = 15
+DEFAULT_COLD_RUNS = 3
+
+
+def _git_commit():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _default_scripts():
+    return ['app.py'] + sorted(os.path.relpath(p, ROOT) for p in glob.glob(os.path.join(ROOT, 'pages', '*.py')))
+
+
+def measure_script(script, reruns):
+    """在当前进程中测量一个页面脚本（由子进程调用，此前不导入任何项目模块）"""
+    os.chdir(ROOT)
+    sys.path.insert(0, ROOT)
+    started = time.perf_counter()
+    from streamlit.testing.v1 import AppTest
+    import_seconds = time.perf_counter() - started
+
+    loaded_before = set(sys.modules)
+    app = AppTest.from_file(script, default_timeout=300)
+    started = time.perf_counter()
+    app.run()
+    cold_seconds = time.perf_counter() - started
+    if app.exception:
+        raise RuntimeError(f"{script} 运行出错: {app.exception[0].value}")
+    loaded = set(sys.modules) - loaded_before
+    result = {
+        'script': script,
+        'import_streamlit_seconds': round(import_seconds, 4),
+        'cold_seconds': round(cold_seconds, 4),
+        'modules_loaded': len(loaded),
+        'heavy_modules': [name for name in HEAVY_MODULES if name in loaded],
+    }
+    if reruns <= 0:
+        return result
+
+    [button for button in app.sidebar.button if '示例' in button.label][0].click().run()
+    timings = []
+    for _ in range(reruns):
+        started = time.perf_counter()
+        app.run()
+        timings.append(time.perf_counter() - started)
+    result['rerun_median_seconds'] = round(statistics.median(timings), 4)
+    result['rerun_min_seconds'] = round(min(timings), 4)
+    return result
+
+
+def _run_child(script, reruns):
+    with tempfile.TemporaryDirectory() as tmp:
+        completed = subprocess.run(
+            [sys.executable, os.path.abspath(__file__), '--child', script, '--reruns', str(reruns)],
+            cwd=ROOT, capture_output=True, text=True, encoding='utf-8',
+            env={**os.environ, 'ANALYSIS_STORE_PATH': os.path.join(tmp, 'store.db')}
+        )
+    if completed.returncode != 0:
+        raise RuntimeError(f"{script} 测量失败:\n{completed.stderr[-2000:]}")
+    return json.loads(completed.stdout.strip().splitlines()[-1])
+
+
+def run_script(script, reruns, cold_runs):
+    """在新的子进程中测量一个页面脚本，避免前一个页面已导入的模块影响冷启动
+
+    共启动 cold_runs 个子进程，冷启动耗时取中位数；重新运行只在第一个子进程中测量。
+    """
+    result = _run_child(script, reruns)
+    colds = [result['cold_seconds']] + [_run_child(script, 0)['cold_seconds'] for _ in range(cold_runs - 1)]
+    result['cold_runs_seconds'] = colds
+    result['cold_seconds'] = round(statistics.median(colds), 4)
+    return result
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="启动基准测试")
+    parser.add_argument('--scripts', nargs='+', help="页面脚本（相对项目目录），默认 app.py 及 pages/ 下全部页面")
+    parser.add_argument('--reruns', type=int, default=DEFAULT_RERUNS, help="每个页面重新运行的次数")
+    parser.add_argument('--cold-runs', type=int, default=DEFAULT_COLD_RUNS, help="每个页面测量冷启动的进程数")
+    parser.add_argument('--output', help="结果文件路径，默认写入 benchmarks/results/")
+    parser.add_argument('--child', help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.child:
+        print(json.dumps(measure_script(args.child, args.reruns), ensure_ascii=False))
+        return 0
+
+    results = []
+    print(f"{'页面':<28}{'冷启动':>10}{'重新运行':>10}  已加载的较重模块")
+    for script in args.scripts or _default_scripts():
+        result = run_script(script, max(args.reruns, 1), max(args.cold_runs, 1))
+        results.append(result)
+        print(
+            f"{script:<28}{result['cold_seconds']:>9.3f}s{result['rerun_median_seconds']:>9.3f}s  "
+            f"{', '.join(result['heavy_modules']) or '-'}"
+        )
+
+    report = {
+        'meta': {
+            'timestamp': datetime.now().isoformat(timespec='seconds'),
+            'commit': _git_commit(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'cpu_count': os.cpu_count(),
+            'reruns': args.reruns,
+            'cold_runs': args.cold_runs,
+        },
+        'results': results,
+    }
+    output = args.output or os.path.join(RESULTS_DIR, f"startup_{datetime.now():%Y%m%d_%H%M%S}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    print(f"\n结果已写入 {output}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
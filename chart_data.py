@@ -0,0 +1,165 @@
+# -*- coding: utf-8 -*-
+"""
+供应链物料时间差距分析工具 - 图表数据层
+
+图表数据在服务端预先聚合，再交给 Plotly 绘制，保证图形大小与数据量无关：
+- 直方图用 NumPy 预先分箱，只传各箱计数
+- 趋势图数据点过多时按日/周/月聚合，并给出最小/最大值区间；仍过多时用LTTB降采样
+- 数据点超过阈值时改用 WebGL 轨迹
+"""
+
+import numpy as np
+import pandas as pd
+import plotly.graph_objects as go
+
+from diagnostics import timed
+
+# 超过该点数时使用 WebGL 轨迹（Scattergl）
+WEBGL_THRESHOLD = 5_000
+
+# 趋势图最多绘制的点数
+MAX_TREND_POINTS = 2_000
+
+# 条形图最多显示的条数
+MAX_BARS = 50
+
+# 趋势聚合周期的显示名称
+PERIOD_LABELS = {'D': '按日', 'W': '按周', 'MS': '按月'}
+
+
+def scatter_trace_class(n_points):
+    """按点数选择轨迹类型：点多时用 WebGL 渲染"""
+    return go.Scattergl if n_points > WEBGL_THRESHOLD else go.Scatter
+
+
+def histogram_bins(values, nbins):
+    """用 NumPy 对数值预先分箱，返回 (各箱计数, 箱边界)
+
+    整数天数据的箱宽取整数，避免同一天数被拆到两个箱。
+    """
+    values = pd.Series(values).dropna().to_numpy(dtype='float64')
+    if values.size == 0:
+        return np.array([], dtype='int64'), np.array([], dtype='float64')
+
+    low, high = values.min(), values.max()
+    if np.all(np.mod(values, 1) == 0):
+        width = max(np.ceil((high - low + 1) / nbins), 1)
+        edges = np.arange(low - 0.5, high + width, width)
+    else:
+        edges = np.histogram_bin_edges(values, bins=nbins)
+    counts, edges = np.histogram(values, bins=edges)
+    return counts, edges
+
+
+@timed('图表构建')
+def histogram_figure(values, nbins, title, x_label, y_label):
+    """预分箱直方图"""
+    counts, edges = histogram_bins(values, nbins)
+    centers = (edges[:-1] + edges[1:]) / 2
+    fig = go.Figure(go.Bar(
+        x=centers,
+        y=counts,
+        width=np.diff(edges),
+        customdata=np.column_stack([edges[:-1], edges[1:]]) if len(counts) else None,
+        hovertemplate=f"{x_label}: %{{customdata[0]:.1f}} ~ %{{customdata[1]:.1f}}<br>{y_label}: %{{y}}<extra></extra>"
+    ))
+    fig.update_layout(title=title, xaxis_title=x_label, yaxis_title=y_label, bargap=0.05)
+    return fig
+
+
+def lttb(x, y, n_out):
+    """Largest-Triangle-Three-Buckets 降采样，保留曲线形状特征，返回选中点的下标"""
+    n = len(x)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+
+    x = np.asarray(x, dtype='float64')
+    y = np.asarray(y, dtype='float64')
+    # 首尾点固定保留，中间分成 n_out - 2 个桶
+    bucket_edges = np.linspace(1, n - 1, n_out - 1).astype('int64')
+    selected = np.empty(n_out, dtype='int64')
+    selected[0] = 0
+    selected[-1] = n - 1
+
+    previous = 0
+    for i in range(n_out - 2):
+        start, end = bucket_edges[i], bucket_edges[i + 1]
+        # 下一个桶的平均点作为三角形第三个顶点
+        next_start = end
+        next_end = bucket_edges[i + 2] if i + 2 < len(bucket_edges) else n
+        avg_x = x[next_start:next_end].mean()
+        avg_y = y[next_start:next_end].mean()
+
+        area = np.abs(
+            (x[previous] - avg_x) * (y[start:end] - y[previous])
+            - (x[previous] - x[start:end]) * (avg_y - y[previous])
+        )
+        previous = start + int(np.argmax(area))
+        selected[i + 1] = previous
+    return selected
+
+
+def aggregate_trend(dates, values, max_points=MAX_TREND_POINTS):
+    """按时间聚合趋势数据，返回 (聚合后的数据, 聚合周期)
+
+    原始点数不超过 max_points 时不聚合（周期为 None），否则依次尝试按日、周、月聚合，
+    输出每期的平均值、最小值、最大值和记录数。
+    """
+    trend = pd.DataFrame({
+        'date': pd.to_datetime(pd.Series(dates), errors='coerce').to_numpy(),
+        'value': pd.to_numeric(pd.Series(values), errors='coerce').astype('float64').to_numpy()
+    }).dropna()
+
+    if len(trend) <= max_points:
+        return trend.sort_values('date', kind='stable').rename(columns={'value': 'mean'}), None
+
+    for freq in ['D', 'W', 'MS']:
+        grouped = trend.groupby(pd.Grouper(key='date', freq=freq))['value'].agg(['mean', 'min', 'max', 'count'])
+        grouped = grouped[grouped['count'] > 0].reset_index()
+        if len(grouped) <= max_points:
+            return grouped, freq
+    return grouped, freq
+
+
+@timed('图表构建')
+def trend_figure(dates, values, title, x_label, y_label, max_points=MAX_TREND_POINTS):
+    """时间趋势图：数据点过多时按周期聚合并绘制最小/最大值区间"""
+    trend, freq = aggregate_trend(dates, values, max_points)
+    fig = go.Figure()
+
+    if freq is None:
+        trace_class = scatter_trace_class(len(trend))
+        fig.add_trace(trace_class(
+            x=trend['date'], y=trend['mean'], mode='lines+markers', name=y_label
+        ))
+    else:
+        if len(trend) > max_points:
+            keep = lttb(trend['date'].astype('int64').to_numpy(), trend['mean'].to_numpy(), max_points)
+            trend = trend.iloc[keep]
+        trace_class = scatter_trace_class(len(trend))
+        period = PERIOD_LABELS[freq]
+        fig.add_trace(trace_class(
+            x=trend['date'], y=trend['max'], mode='lines', line={'width': 0},
+            name=f'{period}最大值', showlegend=False, hoverinfo='skip'
+        ))
+        fig.add_trace(trace_class(
+            x=trend['date'], y=trend['min'], mode='lines', line={'width': 0},
+            fill='tonexty', fillcolor='rgba(99, 110, 250, 0.2)', name=f'{period}最小~最大'
+        ))
+        fig.add_trace(trace_class(
+            x=trend['date'], y=trend['mean'], mode='lines', name=f'{period}平均值',
+            customdata=trend['count'],
+            hovertemplate=f"{x_label}: %{{x|%Y-%m-%d}}<br>平均{y_label}: %{{y:.1f}}<br>记录数: %{{customdata}}<extra></extra>"
+        ))
+        title = f"{title}（{period}聚合）"
+
+    fig.update_layout(title=title, xaxis_title=x_label, yaxis_title=y_label)
+    return fig
+
+
+def limit_bars(frame, value_col, max_bars=MAX_BARS, ascending=False):
+    """条形图数据过多时只保留按 value_col 排序的前 max_bars 条，返回 (数据, 是否截断)"""
+    if len(frame) <= max_bars:
+        return frame, False
+    ordered = frame.sort_values(value_col, ascending=ascending, kind='stable', na_position='last')
+    return ordered.head(max_bars), True
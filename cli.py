@@ -0,0 +1,90 @@
+# -*- coding: utf-8 -*-
+"""
+供应链物料时间差距分析工具 - 命令行入口
+
+不启动浏览器，读取输入文件、运行分析并把报告写入目录，适合定时任务：
+
+    python cli.py --plans 采购计划.csv --deliveries 到货.csv --output-dir reports
+    python cli.py --plans 采购计划.csv --deliveries 到货.csv --output-dir reports \\
+        --partition supplier --workers 32 --compress
+"""
+
+import argparse
+import os
+import sys
+import time
+from datetime import datetime
+
+import pandas as pd
+
+from data_io import read_table_file
+from pipeline import PARTITION_MODES, PARTITION_NONE, filter_plans, run_analysis
+from reports import REPORT_TYPES, save_report
+from schema import compact_frame, describe_unparsed_dates
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="供应链物料时间差距分析（命令行模式）")
+    parser.add_argument('--plans', required=True, help="采购计划文件（CSV/Excel）")
+    parser.add_argument('--deliveries', required=True, help="到货数据文件（CSV/Excel）")
+    parser.add_argument('--mapping', help="物料架次映射文件（有效起始/结束架次），可选")
+    parser.add_argument('--output-dir', required=True, help="报告输出目录")
+    parser.add_argument('--reports', nargs='+', choices=REPORT_TYPES, default=REPORT_TYPES,
+                        help="要生成的报告类型，默认全部")
+    parser.add_argument('--partition', choices=PARTITION_MODES, default=PARTITION_NONE,
+                        help="并行分区方式：none 不分区，supplier 按供应商，batch 按架次范围")
+    parser.add_argument('--workers', type=int, default=os.cpu_count(), help="并行进程数，默认为CPU核数")
+    parser.add_argument('--suppliers', nargs='+', help="只分析这些供应商")
+    parser.add_argument('--batch-range', nargs=2, metavar=('起始架次', '结束架次'),
+                        help="只分析该架次范围（按架次号数值比较，两端包含）")
+    parser.add_argument('--exclude-ineffective', action='store_true', help="排除不在有效架次内的计划行")
+    parser.add_argument('--compress', action='store_true', help="CSV报告压缩为zip")
+    return parser
+
+
+def _load(path, dataset_name):
+    started = time.perf_counter()
+    df = compact_frame(read_table_file(path, dataset_name), dataset_name)
+    print(f"读取 {path}: {len(df):,} 行，{time.perf_counter() - started:.1f} 秒")
+    note = describe_unparsed_dates(df)
+    if note:
+        print(f"  {note}", file=sys.stderr)
+    return df
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+
+    try:
+        plans = _load(args.plans, 'procurement_plans')
+        deliveries = _load(args.deliveries, 'deliveries')
+        mapping = _load(args.mapping, 'material_batch_mapping') if args.mapping else pd.DataFrame()
+    except (OSError, ValueError) as e:
+        print(f"读取输入文件失败: {e}", file=sys.stderr)
+        return 1
+
+    if args.suppliers or args.batch_range:
+        plans = filter_plans(plans, args.suppliers, args.batch_range)
+        print(f"筛选后采购计划: {len(plans):,} 行")
+
+    started = time.perf_counter()
+    result = run_analysis(
+        plans, deliveries, mapping,
+        partition=args.partition, workers=args.workers, exclude=args.exclude_ineffective
+    )
+    print(f"分析完成: {len(result['merged']):,} 条计划行，{len(result['batch_summary']):,} 个架次，"
+          f"{time.perf_counter() - started:.1f} 秒")
+
+    stamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+    for report_type in args.reports:
+        started = time.perf_counter()
+        path = save_report(
+            report_type, result['merged'], result['batch_summary'], args.output_dir,
+            stem=f'{report_type}_{stamp}', compress=args.compress
+        )
+        print(f"已生成 {path}，{time.perf_counter() - started:.1f} 秒")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
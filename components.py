@@ -0,0 +1,84 @@
+# -*- coding: utf-8 -*-
+"""
+供应链物料时间差距分析工具 - 页面组件
+"""
+
+from datetime import datetime
+
+import numpy as np
+import streamlit as st
+
+from diagnostics import stage
+
+# 每页行数可选项
+PAGE_SIZE_OPTIONS = [20, 50, 100, 200]
+
+NO_SORT = '（不排序）'
+
+
+def _sort_order(df, positions, sort_col, ascending, key):
+    """排序后的行位置，按(数据表, 行集合, 排序列, 方向)缓存，翻页时不重复排序"""
+    signature = (id(df), len(df), len(positions), hash(positions.tobytes()), sort_col, ascending)
+    cached = st.session_state.get(f'{key}_order')
+    if cached is not None and cached[0] == signature:
+        return cached[1]
+    values = df[sort_col].take(positions).reset_index(drop=True)
+    order = positions[
+        values.sort_values(ascending=ascending, kind='stable', na_position='last').index.to_numpy()
+    ]
+    st.session_state[f'{key}_order'] = (signature, order)
+    return order
+
+
+def paginated_table(df, columns, key, download_name="数据", positions=None):
+    """分页表格：排序、切片和列投影在服务端完成，只把当前页发送到浏览器
+
+    df 为完整数据（不会被复制），positions 为要显示的行位置（默认全部行），
+    columns 为要显示的列，key 用于区分页面上的多个表格。完整结果需要时再生成CSV下载。
+    """
+    columns = [col for col in columns if col in df.columns]
+    if positions is None:
+        positions = np.arange(len(df))
+    total = len(positions)
+
+    col1, col2, col3, col4 = st.columns([2, 1, 1, 1])
+    with col1:
+        sort_col = st.selectbox("排序列", [NO_SORT] + columns, key=f'{key}_sort')
+    with col2:
+        ascending = st.radio("排序方向", ["升序", "降序"], horizontal=True, key=f'{key}_direction') == "升序"
+    with col3:
+        page_size = st.selectbox("每页行数", PAGE_SIZE_OPTIONS, key=f'{key}_page_size')
+
+    n_pages = max(-(-total // page_size), 1)
+    page_key = f'{key}_page'
+    # 筛选条件变化导致总页数减少时，把页码收回到有效范围
+    if st.session_state.get(page_key, 1) > n_pages:
+        st.session_state[page_key] = n_pages
+    with col4:
+        page = st.number_input("页码", min_value=1, max_value=n_pages, step=1, key=page_key)
+
+    start = (page - 1) * page_size
+    stop = min(start + page_size, total)
+    if sort_col == NO_SORT:
+        page_positions = positions[start:stop]
+    else:
+        page_positions = _sort_order(df, positions, sort_col, ascending, key)[start:stop]
+
+    # 先切出当前页再投影列，只有这部分数据会被序列化发送到浏览器
+    page_data = df.iloc[page_positions, [df.columns.get_loc(col) for col in columns]]
+    with stage('表格序列化'):
+        st.dataframe(page_data, hide_index=True, use_container_width=True)
+    st.caption(f"共 {total:,} 条记录，当前显示第 {start + 1 if total else 0:,}~{stop:,} 条（第 {page}/{n_pages} 页）")
+
+    ready_key = f'{key}_download_ready'
+    if st.button("📄 生成完整结果下载", key=f'{key}_prepare'):
+        st.session_state[ready_key] = True
+    if st.session_state.get(ready_key):
+        st.download_button(
+            label=f"📥 下载完整结果（{total:,} 条）",
+            data=df.iloc[positions][columns].to_csv(index=False).encode('utf-8-sig'),
+            file_name=f"{download_name}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv",
+            mime="text/csv",
+            key=f'{key}_download',
+            on_click=lambda: st.session_state.pop(ready_key, None)
+        )
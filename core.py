@@ -0,0 +1,510 @@
+# -*- coding: utf-8 -*-
+"""
+供应链物料时间差距分析工具 - 页面公共部分
+
+各页面（app.py 及 pages/ 下的页面文件）共享的会话状态、数据集读写、缓存的分析数据集和侧边栏。
+这里只导入页面都要用到的轻量模块；图表(plotly.express)、报告导出(openpyxl)、
+文件导入等只在用到它们的页面中导入，打开首页和切换页面时不必加载。
+"""
+
+import sqlite3
+
+import streamlit as st
+import pandas as pd
+
+from analysis_engine import batch_row_index
+from data_store import DATASET_NAMES, DatasetStore
+from dataset_registry import DatasetRegistry, SessionHandle, child_version
+from diagnostics import LOG_PATH, append_log, end_rerun, record_frame, stage, start_rerun
+from effectivity import EffectivityIndex
+from filter_engine import FilterIndex
+from incremental import refresh_analysis, refresh_batch_views, upsert_frame
+from kpi_cube import KpiCube
+from lead_time import STAGES, build_stage_timeline
+from pipeline import build_flagged_dataset, exclude_ineffective, summarize
+from quantile_sketch import GapSketches
+from sample_data import create_sample_data, create_sample_mapping, create_sample_stage_data, generate_sample_data
+from schema import DATASET_LABELS, UPSERT_KEYS, compact_frame, frame_memory
+
+# 侧边栏保留的最近运行记录数
+DIAGNOSTICS_HISTORY = 20
+
+# 影响分析数据集的数据集，整表替换后需要整表重算
+ANALYSIS_INPUTS = ('procurement_plans', 'deliveries', 'material_batch_mapping')
+
+# 会话缓存的派生结果（也在各会话间共享）及其名称
+CACHE_LABELS = {
+    'effectivity_cache': '有效架次索引',
+    'analysis_cache': '分析数据集',
+    'effective_cache': '分析数据集（仅有效计划行）',
+    'filter_cache': '筛选索引',
+    'batch_cache': '架次汇总',
+    'kpi_cache': 'KPI汇总立方体',
+    'sketch_cache': '延迟分位数草图',
+    'stage_cache': '环节时间线',
+}
+
+# 侧边栏中在各页面共用的控件；页面切换时 Streamlit 会清除未在新页面出现过的控件状态，需要保留
+SHARED_WIDGET_KEYS = ('exclude_ineffective', 'diagnostics_enabled')
+
+
+def init_session_state():
+    """初始化session state"""
+    for name in DATASET_NAMES:
+        if name not in st.session_state:
+            st.session_state[name] = pd.DataFrame()
+    if 'data_loaded' not in st.session_state:
+        st.session_state.data_loaded = False
+    if 'registry_handle' not in st.session_state:
+        st.session_state.registry_handle = SessionHandle()
+    if 'dataset_versions' not in st.session_state:
+        # 各数据集在共享登记表中的版本号，未写入过的数据集没有版本号
+        st.session_state.dataset_versions = {}
+    if 'pending_rows' not in st.session_state:
+        st.session_state.pending_rows = {}
+    if 'memory_report' not in st.session_state:
+        st.session_state.memory_report = {}
+    if 'store_scope' not in st.session_state:
+        # 从本地数据库按条件加载时的筛选条件 (供应商列表, 架次范围)，整库加载或数据被替换后为 None
+        st.session_state.store_scope = None
+    if 'delta_log' not in st.session_state:
+        # 增量记录：since 为分析缓存所对应的数据版本（None 表示需要整表重算），keys 为此后累积的脏键
+        st.session_state.delta_log = {'since': None, 'keys': []}
+
+
+@st.cache_resource
+def get_registry():
+    """进程内共享的数据集登记表，各会话引用同一份数据和分析结果"""
+    return DatasetRegistry()
+
+
+def dataset_key(*names):
+    """数据集的版本号组合，作为派生结果的缓存键"""
+    return tuple(st.session_state.dataset_versions.get(name) for name in names)
+
+
+def _use_version(name, version):
+    """让会话的数据集引用登记表中的版本，使已缓存的分析数据集失效"""
+    registry = get_registry()
+    st.session_state[name] = registry.frame(version)
+    st.session_state.dataset_versions[name] = version
+    st.session_state.memory_report[name] = registry.memory(version)
+    st.session_state.pending_rows.pop(name, None)
+    if name in ANALYSIS_INPUTS:
+        st.session_state.delta_log['since'] = None
+
+
+def set_dataset(name, df, alias=None):
+    """写入数据集：按列定义转换为紧凑类型后登记到共享登记表，会话只保存引用
+
+    其他会话已登记过内容相同的数据时直接引用那一份。alias 见 DatasetRegistry.publish。
+    """
+    compacted = compact_frame(df, name)
+    version = get_registry().publish(
+        st.session_state.registry_handle, name, compacted,
+        alias=alias, memory=(frame_memory(df), frame_memory(compacted))
+    )
+    _use_version(name, version)
+
+
+def flush_pending(name):
+    """把追加缓冲区中的记录一次性并入数据集
+
+    共享的数据不原地修改：在当前版本上应用追加缓冲区得到新版本再登记（写时复制）。
+    采购计划和到货按编号更新已有记录、追加新记录，并记下受影响的(物料编号, 架次)，
+    下次读取分析数据集时只重算这些键。
+    """
+    pending = st.session_state.pending_rows.pop(name, None)
+    if not pending:
+        return
+    current = st.session_state[name]
+    delta = pd.concat(pending, ignore_index=True)
+    if current.empty:
+        set_dataset(name, delta)
+        return
+    combined, dirty_keys = upsert_frame(current, delta, UPSERT_KEYS.get(name))
+    registry = get_registry()
+    version = registry.publish(
+        st.session_state.registry_handle, name, combined,
+        version=child_version(st.session_state.dataset_versions.get(name), name, delta)
+    )
+    st.session_state[name] = registry.frame(version)
+    st.session_state.dataset_versions[name] = version
+    if name in UPSERT_KEYS and dirty_keys is not None:
+        st.session_state.delta_log['keys'].append(dirty_keys)
+    elif name in ANALYSIS_INPUTS:
+        st.session_state.delta_log['since'] = None
+
+
+def get_dataset(name):
+    """读取数据集，读取前先合并待追加的记录"""
+    flush_pending(name)
+    return st.session_state[name]
+
+
+def pending_count(name):
+    """追加缓冲区中尚未合并的记录数"""
+    return sum(len(rows) for rows in st.session_state.pending_rows.get(name, []))
+
+
+def has_data():
+    """当前会话是否已加载或录入数据"""
+    return st.session_state.data_loaded or not st.session_state.procurement_plans.empty
+
+
+@st.cache_resource
+def get_store():
+    """进程内共享的本地数据库存储"""
+    return DatasetStore()
+
+
+def _persist(write):
+    """写入本地数据库，失败时只提示不中断页面"""
+    try:
+        write(get_store())
+    except (sqlite3.Error, OSError, ValueError) as e:
+        st.warning(f"⚠️ 数据未能保存到本地数据库: {e}")
+
+
+def show_chart(fig):
+    """绘制图表，诊断模式下计入图表序列化耗时"""
+    with stage('图表序列化'):
+        st.plotly_chart(fig, use_container_width=True)
+
+
+def replace_dataset(name, df):
+    """整表替换数据集，并同步替换本地数据库中的表"""
+    set_dataset(name, df)
+    if name == 'procurement_plans':
+        st.session_state.store_scope = None
+    _persist(lambda store: store.replace_dataset(name, df))
+
+
+def append_to_dataset(name, new_rows):
+    """向数据集追加记录：先放入追加缓冲区，读取数据集时再一次性合并
+
+    逐条录入时不再每次复制整张表；采购计划和到货中编号已存在的记录视为更新。
+    本地数据库只写入这些记录。
+    """
+    st.session_state.pending_rows.setdefault(name, []).append(new_rows)
+    _persist(lambda store: store.upsert_rows(name, new_rows, UPSERT_KEYS.get(name)))
+
+
+def restore_datasets(suppliers=None, batch_range=None):
+    """从本地数据库读取数据集到当前会话，筛选条件以SQL下推执行
+
+    数据库自上次读取后没有写入时，直接引用其他会话已读入的同一份数据，不再读库。
+    下推只作用于加载范围：各分析页面的筛选和汇总在已加载的数据上进行（筛选索引、KPI 汇总立方体），
+    不再回到数据库查询。新会话首次运行时整库加载。
+    """
+    store = get_store()
+    registry = get_registry()
+    for name in DATASET_NAMES:
+        if store.has_table(name):
+            alias = ('store', name, store.revision(name), tuple(suppliers or ()), tuple(batch_range or ()))
+            version = registry.attach_alias(st.session_state.registry_handle, name, alias)
+            if version is not None:
+                _use_version(name, version)
+            else:
+                set_dataset(name, store.load_dataset(name, suppliers, batch_range), alias)
+    st.session_state.data_loaded = not st.session_state.procurement_plans.empty
+    st.session_state.store_scope = (list(suppliers or ()), tuple(batch_range or ())) \
+        if suppliers or any(batch_range or ()) else None
+
+
+def describe_store_scope():
+    """按条件加载时的加载范围说明，如 '供应商 甲、乙；架次 002 至 010'；整库加载时返回空字符串"""
+    scope = st.session_state.get('store_scope')
+    if not scope:
+        return ""
+    suppliers, batch_range = scope
+    parts = [f"供应商 {'、'.join(map(str, suppliers))}"] if suppliers else []
+    if any(batch_range):
+        start, end = batch_range
+        parts.append(f"架次 {start or '最早'} 至 {end or '最晚'}")
+    return "；".join(parts)
+
+
+def _cached(slot, key, build):
+    """按键缓存派生结果：键变化时先到共享登记表中取其他会话已算好的结果，没有再调用 build() 计算
+
+    会话在 slot 中保留所用结果的引用，登记表释放旧版本后仍可用它做增量更新。
+    """
+    cached = st.session_state.get(slot)
+    if cached is None or cached[0] != key:
+        st.session_state[slot] = (key, get_registry().derived((slot, key), build))
+    return st.session_state[slot][1]
+
+
+def get_effectivity_index():
+    """获取当前数据版本的物料有效架次区间索引，同一版本只构建一次"""
+    mapping = get_dataset('material_batch_mapping')
+    return _cached('effectivity_cache', dataset_key('material_batch_mapping'), lambda: EffectivityIndex(mapping))
+
+
+def analysis_version():
+    """分析数据集的版本：输入数据集的版本号 + 是否排除非有效计划行"""
+    return dataset_key(*ANALYSIS_INPUTS), st.session_state.get('exclude_ineffective', False)
+
+
+def _build_analysis(effectivity):
+    with stage('分析数据集'):
+        return build_flagged_dataset(st.session_state.procurement_plans, st.session_state.deliveries, effectivity)
+
+
+def _refresh_analysis(cached, key, effectivity):
+    """上次计算后只有追加/更新：只重算脏键对应的行，并修补架次汇总、KPI 汇总立方体和分位数草图"""
+    delta_log = st.session_state.delta_log
+    dirty_keys = pd.concat(delta_log['keys'], ignore_index=True) if delta_log['keys'] else None
+    with stage('增量更新'):
+        merged_data, rows = refresh_analysis(
+            cached[1],
+            st.session_state.procurement_plans,
+            st.session_state.deliveries,
+            dirty_keys,
+            effectivity
+        )
+        batch = st.session_state.get('batch_cache')
+        if batch is not None and batch[0] == (cached[0], False):
+            patched = refresh_batch_views(*batch[1], merged_data, rows)
+            _cached('batch_cache', (key, False), lambda: patched)
+        existing = rows[rows < len(cached[1])]
+        cube = st.session_state.get('kpi_cache')
+        if cube is not None and cube[0] == (cached[0], False):
+            patched_cube = cube[1].updated(cached[1].iloc[existing], merged_data.iloc[rows])
+            _cached('kpi_cache', (key, False), lambda: patched_cube)
+        sketches = st.session_state.get('sketch_cache')
+        if sketches is not None and sketches[0] == (cached[0], False):
+            patched_sketches = sketches[1].updated(cached[1].iloc[existing], merged_data.iloc[rows])
+            _cached('sketch_cache', (key, False), lambda: patched_sketches)
+    return merged_data
+
+
+def get_analysis_dataset():
+    """获取当前数据版本的分析数据集（合并 + 天数差距 + 有效性），同一版本只计算一次
+
+    勾选"排除非有效计划行"时返回去掉不在有效架次的计划行后的数据集。
+    返回的数据集在各页面、各会话间共享，只读使用，不要原地修改。
+    """
+    flush_pending('procurement_plans')
+    flush_pending('deliveries')
+    effectivity = get_effectivity_index()
+    key = dataset_key(*ANALYSIS_INPUTS)
+    cached = st.session_state.get('analysis_cache')
+    if cached is not None and cached[0] != key and st.session_state.delta_log['since'] == cached[0]:
+        merged_data = _cached('analysis_cache', key, lambda: _refresh_analysis(cached, key, effectivity))
+    else:
+        merged_data = _cached('analysis_cache', key, lambda: _build_analysis(effectivity))
+    st.session_state.delta_log = {'since': key, 'keys': []}
+    record_frame('分析数据集', merged_data)
+
+    if not analysis_version()[1]:
+        return merged_data
+    return _cached('effective_cache', key, lambda: exclude_ineffective(merged_data))
+
+
+def get_filter_index():
+    """获取当前分析数据集的多维筛选索引，同一版本只构建一次"""
+    merged_data = get_analysis_dataset()
+
+    def build():
+        with stage('筛选索引'):
+            return FilterIndex(merged_data, dimensions=('供应商', '物料类型', '物料名称', '有效性'))
+    return _cached('filter_cache', analysis_version(), build)
+
+
+def get_batch_views():
+    """获取当前分析数据集的架次汇总表和架次分组索引，同一版本只计算一次
+
+    汇总表按架次号数值排序（'2' 排在 '10' 之前）。
+    """
+    merged_data = get_analysis_dataset()
+
+    def build():
+        with stage('架次视图'):
+            batch_summary, _ = summarize(merged_data)
+            return batch_summary, batch_row_index(merged_data)
+    return _cached('batch_cache', analysis_version(), build)
+
+
+def get_kpi_cube():
+    """获取当前分析数据集的 KPI 汇总立方体（供应商 × 物料类型 × 有效性 × 周/月），同一版本只构建一次"""
+    merged_data = get_analysis_dataset()
+
+    def build():
+        with stage('KPI立方体'):
+            return KpiCube(merged_data)
+    return _cached('kpi_cache', analysis_version(), build)
+
+
+def get_gap_sketches():
+    """获取当前分析数据集的天数差距分位数草图（按供应商、物料类型、物料编号、架次），同一版本只构建一次"""
+    merged_data = get_analysis_dataset()
+
+    def build():
+        with stage('分位数草图'):
+            return GapSketches(merged_data)
+    return _cached('sketch_cache', analysis_version(), build)
+
+
+def get_stage_timeline():
+    """获取当前数据版本的供应链环节时间线，同一版本只构建一次"""
+    names = [name for _, name, _ in STAGES] + ['returned_materials']
+    datasets = {name: get_dataset(name) for name in names}
+    return _cached('stage_cache', dataset_key(*names), lambda: build_stage_timeline(datasets))
+
+
+def load_sample_data():
+    """加载示例数据（各环节数据和架次映射），并写入本地数据库"""
+    sample_plans, sample_deliveries = create_sample_data()
+    replace_dataset('procurement_plans', sample_plans)
+    replace_dataset('deliveries', sample_deliveries)
+    for name, df in create_sample_stage_data(sample_plans, sample_deliveries).items():
+        replace_dataset(name, df)
+    replace_dataset('material_batch_mapping', create_sample_mapping())
+    st.session_state.data_loaded = True
+
+
+def render_sidebar():
+    """各页面共用的侧边栏：快速操作、模拟数据和分析选项"""
+    st.sidebar.title("📊 供应链分析工具")
+    st.sidebar.markdown("---")
+    st.sidebar.markdown("### 快速操作")
+    if st.sidebar.button("📝 加载示例数据"):
+        load_sample_data()
+        st.sidebar.success("✅ 示例数据已加载！")
+
+    scope = describe_store_scope()
+    if scope:
+        st.sidebar.info(f"当前会话只加载了本地数据库中的部分数据（{scope}），各分析页面只分析这部分数据")
+
+    with st.sidebar.expander("🧪 生成模拟数据"):
+        st.caption("按生产规模生成模拟采购计划和到货数据，只保存在当前会话，不写入本地数据库")
+        sim_plans = st.number_input("计划行数", min_value=100, max_value=10_000_000, value=100_000, step=10_000)
+        sim_batches = st.number_input("架次数", min_value=1, max_value=10_000, value=100)
+        sim_suppliers = st.number_input("供应商数", min_value=1, max_value=10_000, value=50)
+        sim_partial = st.slider("分批到货占比", 0.0, 1.0, 0.3, 0.05)
+        sim_skew = st.slider("到货平均偏移(天)", -30, 30, 3, help="正数整体延迟，负数整体提前")
+        if st.button("生成模拟数据"):
+            with st.spinner("正在生成..."):
+                sim_plan_data, sim_deliveries = generate_sample_data(
+                    int(sim_plans), int(sim_batches), int(sim_suppliers), sim_partial, sim_skew
+                )
+                for name in DATASET_NAMES:
+                    set_dataset(name, pd.DataFrame())
+                set_dataset('procurement_plans', sim_plan_data)
+                set_dataset('deliveries', sim_deliveries)
+            st.session_state.data_loaded = True
+            st.session_state.store_scope = None
+            st.success(f"✅ 已生成 {len(sim_plan_data):,} 条计划行、{len(sim_deliveries):,} 条到货记录")
+
+    if not st.session_state.material_batch_mapping.empty or pending_count('material_batch_mapping'):
+        st.sidebar.checkbox(
+            "排除非有效计划行",
+            key='exclude_ineffective',
+            help="按【架次管理】中的有效起始/结束架次，分析时去掉不在有效架次内的采购计划行"
+        )
+
+    st.sidebar.checkbox(
+        "🩺 诊断模式",
+        key='diagnostics_enabled',
+        help="记录每次运行各环节的耗时、数据表大小和进程内存，显示在侧边栏底部并写入本地日志"
+    )
+
+
+def page_setup(label):
+    """页面开头调用：页面配置、诊断记录、会话状态初始化、首次运行时恢复数据、侧边栏"""
+    st.set_page_config(
+        page_title="供应链物料时间差距分析工具",
+        page_icon="📊",
+        layout="wide",
+        initial_sidebar_state="expanded"
+    )
+
+    # 诊断模式：记录本次运行各环节的耗时、数据表大小和进程内存
+    if st.session_state.get('diagnostics_enabled'):
+        start_rerun(label)
+
+    # 重新赋值后控件状态不随页面切换清除
+    for key in SHARED_WIDGET_KEYS:
+        if key in st.session_state:
+            st.session_state[key] = st.session_state[key]
+
+    init_session_state()
+
+    # 新会话首次运行时从本地数据库恢复数据
+    if 'store_restored' not in st.session_state:
+        st.session_state.store_restored = True
+        try:
+            restore_datasets()
+        except sqlite3.Error as e:
+            st.warning(f"⚠️ 无法从本地数据库恢复数据: {e}")
+
+    render_sidebar()
+
+
+def render_diagnostics():
+    """结束本次运行的诊断记录：写入日志，并在侧边栏显示各环节耗时、数据表大小和最近运行"""
+    for name in DATASET_NAMES:
+        df = st.session_state[name]
+        if not df.empty:
+            record_frame(DATASET_LABELS.get(name, name), df)
+    record = end_rerun()
+    if record is None:
+        return
+    history = st.session_state.setdefault('diagnostics_history', [])
+    history.append(record)
+    del history[:-DIAGNOSTICS_HISTORY]
+    try:
+        append_log(record)
+    except OSError as e:
+        st.sidebar.caption(f"⚠️ 诊断日志写入失败: {e}")
+
+    with st.sidebar.expander("🩺 本次运行诊断", expanded=True):
+        rss = record['rss_bytes']
+        col1, col2 = st.columns(2)
+        col1.metric("总耗时", f"{record['total_seconds']:.2f} 秒")
+        col2.metric(
+            "进程内存（峰值）" if record['rss_source'] == 'peak' else "进程内存",
+            f"{rss / 1024 ** 2:,.0f} MB" if rss else "N/A"
+        )
+
+        stages = pd.DataFrame(record['stages'] + [{'name': '其他', 'depth': 0, 'seconds': record['other_seconds']}])
+        st.dataframe(pd.DataFrame({
+            '环节': ['　' * depth + name for name, depth in zip(stages['name'], stages['depth'])],
+            '耗时(秒)': stages['seconds'],
+            '占比(%)': (stages['seconds'] / max(record['total_seconds'], 1e-9) * 100).round(1),
+        }), hide_index=True)
+
+        if record['frames']:
+            frames = pd.DataFrame.from_dict(record['frames'], orient='index')
+            st.dataframe(pd.DataFrame({
+                '数据表': frames.index,
+                '行数': frames['rows'],
+                '列数': frames['columns'],
+                '内存(MB)': (frames['bytes'] / 1024 ** 2).round(1),
+            }), hide_index=True)
+
+        st.caption("最近运行")
+        st.dataframe(pd.DataFrame({
+            '时间': [r['time'][11:] for r in reversed(history)],
+            '页面': [r['label'] for r in reversed(history)],
+            '耗时(秒)': [r['total_seconds'] for r in reversed(history)],
+        }), hide_index=True)
+        st.caption(f"日志: {LOG_PATH}")
+
+
+def page_footer():
+    """页面结尾调用：页脚，以及诊断模式下的本次运行诊断"""
+    st.markdown("---")
+    st.markdown(
+        """
+        <div style='text-align: center; color: gray;'>
+        供应链物料时间差距分析工具 v1.0 | © 2024
+        </div>
+        """,
+        unsafe_allow_html=True
+    )
+
+    # 诊断面板放在最后，记录完整的一次运行
+    render_diagnostics()
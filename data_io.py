@@ -0,0 +1,117 @@
+# -*- coding: utf-8 -*-
+"""
+供应链物料时间差距分析工具 - 数据读取
+
+大文件CSV按块流式读取：先从文件头部样本识别编码，再按显式列类型分块解析，
+每块读入后立即规范化，避免整文件多次解析。
+"""
+
+import codecs
+import io
+import os
+
+import pandas as pd
+
+from schema import UNPARSED_DATES_ATTR, csv_dtypes, normalize_frame
+
+# 编码识别使用的文件头部样本大小
+SNIFF_BYTES = 64 * 1024
+
+# 每块读取的行数
+CHUNK_ROWS = 100_000
+
+
+def sniff_encoding(sample):
+    """根据文件头部字节识别编码：utf-8-sig / utf-8 / gbk"""
+    if sample.startswith(codecs.BOM_UTF8):
+        return 'utf-8-sig'
+    try:
+        # 样本末尾可能截断在多字节字符中间，使用增量解码器忽略不完整的尾部
+        codecs.getincrementaldecoder('utf-8')().decode(sample, final=False)
+        return 'utf-8'
+    except UnicodeDecodeError:
+        return 'gbk'
+
+
+def _file_size(file):
+    """获取文件对象的字节大小，保持当前读取位置不变"""
+    position = file.tell()
+    file.seek(0, os.SEEK_END)
+    size = file.tell()
+    file.seek(position)
+    return size
+
+
+def read_csv_chunked(file, dataset_name=None, chunksize=CHUNK_ROWS, progress_callback=None):
+    """分块读取CSV文件并逐块规范化
+
+    file 为二进制文件对象（如上传文件），progress_callback 接收 0~1 之间的读取进度。
+    """
+    file.seek(0)
+    encoding = sniff_encoding(file.read(SNIFF_BYTES))
+    total_bytes = max(_file_size(file), 1)
+
+    try:
+        return _read_chunks(file, encoding, dataset_name, chunksize, total_bytes, progress_callback)
+    except UnicodeDecodeError:
+        if encoding != 'utf-8':
+            raise
+        # 头部样本恰好全是ASCII、后文才出现GBK字符时，改用GBK重新读取
+        return _read_chunks(file, 'gbk', dataset_name, chunksize, total_bytes, progress_callback)
+
+
+def _read_chunks(file, encoding, dataset_name, chunksize, total_bytes, progress_callback):
+    file.seek(0)
+    reader = pd.read_csv(
+        file,
+        encoding=encoding,
+        dtype=csv_dtypes(dataset_name),
+        chunksize=chunksize
+    )
+
+    chunks = []
+    unparsed = {}
+    with reader:
+        for chunk in reader:
+            chunk = normalize_frame(chunk, dataset_name)
+            for col, count in chunk.attrs.get(UNPARSED_DATES_ATTR, {}).items():
+                unparsed[col] = unparsed.get(col, 0) + count
+            chunks.append(chunk)
+            if progress_callback is not None:
+                progress_callback(min(file.tell() / total_bytes, 1.0))
+
+    if not chunks:
+        return pd.DataFrame()
+    df = pd.concat(chunks, ignore_index=True)
+    # 各块的无法识别行数合计到整个文件
+    df.attrs = {UNPARSED_DATES_ATTR: unparsed} if unparsed else {}
+    return df
+
+
+def read_excel_table(file, filename, dataset_name=None):
+    """读取Excel文件并规范化：.xlsx 使用 openpyxl，.xls 使用 xlrd"""
+    engine = 'xlrd' if filename.lower().endswith('.xls') else 'openpyxl'
+    return normalize_frame(pd.read_excel(file, engine=engine), dataset_name)
+
+
+def read_table_bytes(data, filename, dataset_name=None, progress_callback=None):
+    """按扩展名解析内存中的CSV/Excel文件内容，不支持的格式抛出 ValueError
+
+    progress_callback 只用于CSV，接收 0~1 之间的读取进度。
+    """
+    if filename.lower().endswith('.csv'):
+        return read_csv_chunked(io.BytesIO(data), dataset_name, progress_callback=progress_callback)
+    if filename.lower().endswith(('.xlsx', '.xls')):
+        return read_excel_table(io.BytesIO(data), filename, dataset_name)
+    raise ValueError(f"不支持的文件格式: {filename}")
+
+
+def read_table_file(path, dataset_name=None):
+    """按扩展名读取本地CSV/Excel文件并规范化，不支持的格式抛出 ValueError"""
+    filename = os.path.basename(path)
+    if filename.lower().endswith('.csv'):
+        with open(path, 'rb') as file:
+            return read_csv_chunked(file, dataset_name)
+    if filename.lower().endswith(('.xlsx', '.xls')):
+        return read_excel_table(path, filename, dataset_name)
+    raise ValueError(f"不支持的文件格式: {filename}")
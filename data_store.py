@@ -0,0 +1,300 @@
+# -*- coding: utf-8 -*-
+"""
+供应链物料时间差距分析工具 - 本地数据库存储
+
+基于标准库 sqlite3 的持久化数据集存储，所有会话共用同一个数据库文件：
+- 上传/示例数据整表替换，手动录入只追加新增行，追加导入按编号更新已有行
+- 含(物料编号, 架次)的表建立联合索引
+- 按供应商/架次范围加载、架次汇总等以SQL下推到数据库执行，只把需要的行读入内存；
+  加载后各分析页面的筛选和汇总在内存中的数据上进行
+"""
+
+import contextlib
+import itertools
+import os
+import re
+import sqlite3
+
+import pandas as pd
+
+from effectivity import BATCH_NUMBER_PATTERN, batch_number, sort_batches
+from schema import match_keys, normalize_frame
+
+# 可用环境变量 ANALYSIS_STORE_PATH 指定其他数据库文件（如基准测试使用临时数据库）
+DB_PATH = os.environ.get('ANALYSIS_STORE_PATH') or os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), 'data', 'analysis_store.db'
+)
+
+# 允许持久化的数据集（与 session state 中的数据集名称一致）
+DATASET_NAMES = [
+    'procurement_plans',
+    'contracts',
+    'orders',
+    'deliveries',
+    'inspection_queue',
+    'inventory',
+    'delivered_materials',
+    'returned_materials',
+    'batch_info',
+    'material_batch_mapping',
+]
+
+# 写入数据库时每批插入的行数
+INSERT_CHUNK_ROWS = 50_000
+
+# 按编号查找已有记录时每条SQL的编号个数（低于SQLite参数个数上限）
+LOOKUP_CHUNK_IDS = 500
+
+# 按编号更新时暂存新记录的表，更新完成后删除
+UPSERT_STAGING_TABLE = '_upsert_staging'
+
+# 暂存表中记录要覆盖的目标行 rowid 的列
+TARGET_ROWID = '_target_rowid'
+
+
+def _quote(identifier):
+    """SQL标识符加引号（列名多为中文）"""
+    return '"' + str(identifier).replace('"', '""') + '"'
+
+
+def _sql_batch_number(value):
+    """SQL函数 batch_number()：架次号转换为整数，规则与 effectivity.batch_number 相同，无法识别时为 -1"""
+    if value is None:
+        return -1
+    if isinstance(value, (int, float)):
+        return int(value)
+    match = re.search(BATCH_NUMBER_PATTERN, str(value))
+    return int(match.group(1)) if match else -1
+
+
+class DatasetStore:
+    """SQLite数据集存储，每次操作使用独立连接，可在多个会话线程间共享"""
+
+    def __init__(self, path=DB_PATH):
+        self.path = path
+        self._writes = itertools.count(1)
+        self._revisions = {}
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with self._connect() as conn:
+            conn.execute('PRAGMA journal_mode=WAL')
+
+    @contextlib.contextmanager
+    def _connect(self):
+        """打开连接并在事务中执行：正常结束时提交、出错时回滚，最后关闭连接"""
+        conn = sqlite3.connect(self.path, timeout=30)
+        try:
+            conn.create_function('batch_number', 1, _sql_batch_number, deterministic=True)
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    @staticmethod
+    def _check_name(name):
+        if name not in DATASET_NAMES:
+            raise ValueError(f"未知的数据集: {name}")
+
+    def _table_columns(self, conn, name):
+        rows = conn.execute(f'PRAGMA table_info({_quote(name)})').fetchall()
+        return [row[1] for row in rows]
+
+    def _ensure_indexes(self, conn, name, columns):
+        if '物料编号' in columns and '架次' in columns:
+            conn.execute(
+                f'CREATE INDEX IF NOT EXISTS {_quote("idx_" + name + "_key")} '
+                f'ON {_quote(name)} ("物料编号", "架次")'
+            )
+        if '架次' in columns:
+            conn.execute(
+                f'CREATE INDEX IF NOT EXISTS {_quote("idx_" + name + "_batch")} '
+                f'ON {_quote(name)} ("架次")'
+            )
+
+    def _touch(self, name):
+        self._revisions[name] = next(self._writes)
+
+    def revision(self, name):
+        """数据集在本进程中最近一次写入的序号（未写入过为0），用于判断已读入内存的数据是否过期"""
+        return self._revisions.get(name, 0)
+
+    def has_table(self, name):
+        with self._connect() as conn:
+            return bool(self._table_columns(conn, name))
+
+    def replace_dataset(self, name, df):
+        """整表替换数据集（上传文件、加载示例数据）"""
+        self._check_name(name)
+        with self._connect() as conn:
+            conn.execute(f'DROP TABLE IF EXISTS {_quote(name)}')
+            df.to_sql(name, conn, index=False, chunksize=INSERT_CHUNK_ROWS)
+            self._ensure_indexes(conn, name, df.columns)
+        self._touch(name)
+
+    def _append(self, conn, name, rows):
+        existing = self._table_columns(conn, name)
+        for col in rows.columns:
+            if existing and col not in existing:
+                conn.execute(f'ALTER TABLE {_quote(name)} ADD COLUMN {_quote(col)}')
+        rows.to_sql(name, conn, index=False, if_exists='append', chunksize=INSERT_CHUNK_ROWS)
+        self._ensure_indexes(conn, name, rows.columns)
+
+    def append_rows(self, name, rows):
+        """只追加新增行（手动录入），表中缺少的列自动补齐"""
+        self._check_name(name)
+        with self._connect() as conn:
+            self._append(conn, name, rows)
+        self._touch(name)
+
+    def _matching_rowids(self, conn, name, rows, id_columns):
+        """rows 各行在表中按匹配键找到的最后一条记录的 rowid，没有匹配的为 -1"""
+        keys = match_keys(rows, id_columns)
+        first = id_columns[0]
+        ids = rows.loc[keys.notna(), first].astype(str).unique().tolist()
+        selected = ', '.join(_quote(col) for col in id_columns)
+        parts = [pd.DataFrame(columns=['_rowid'] + list(id_columns))]
+        for start in range(0, len(ids), LOOKUP_CHUNK_IDS):
+            chunk = ids[start:start + LOOKUP_CHUNK_IDS]
+            parts.append(pd.read_sql_query(
+                f'SELECT rowid AS _rowid, {selected} FROM {_quote(name)} '
+                f'WHERE {_quote(first)} IN ({", ".join("?" * len(chunk))})',
+                conn, params=chunk
+            ))
+        existing = pd.concat(parts, ignore_index=True).sort_values('_rowid', kind='stable')
+        lookup = pd.Series(existing['_rowid'].to_numpy(dtype='int64'), index=match_keys(existing, id_columns).to_numpy())
+        lookup = lookup[lookup.index.notna() & ~lookup.index.duplicated(keep='last')]
+        return lookup.reindex(keys.to_numpy()).fillna(-1).to_numpy(dtype='int64')
+
+    def _update_rows(self, conn, name, rows, rowids):
+        """按 rowid 原位置覆盖记录：新记录先写入暂存表（类型转换与追加相同），再用一条SQL更新"""
+        existing = self._table_columns(conn, name)
+        for col in rows.columns:
+            if col not in existing:
+                conn.execute(f'ALTER TABLE {_quote(name)} ADD COLUMN {_quote(col)}')
+        staged = rows.assign(**{TARGET_ROWID: rowids})
+        staged.to_sql(UPSERT_STAGING_TABLE, conn, index=False, if_exists='replace', chunksize=INSERT_CHUNK_ROWS)
+        conn.execute(f'CREATE INDEX {_quote("idx" + UPSERT_STAGING_TABLE)} '
+                     f'ON {_quote(UPSERT_STAGING_TABLE)} ({_quote(TARGET_ROWID)})')
+        targets = ', '.join(_quote(col) for col in rows.columns)
+        conn.execute(
+            f'UPDATE {_quote(name)} SET ({targets}) = ('
+            f'SELECT {targets} FROM {_quote(UPSERT_STAGING_TABLE)} AS s '
+            f'WHERE s.{_quote(TARGET_ROWID)} = {_quote(name)}.rowid) '
+            f'WHERE rowid IN (SELECT {_quote(TARGET_ROWID)} FROM {_quote(UPSERT_STAGING_TABLE)})'
+        )
+        conn.execute(f'DROP TABLE {_quote(UPSERT_STAGING_TABLE)}')
+
+    def upsert_rows(self, name, rows, id_columns=None):
+        """按匹配列（schema.UPSERT_KEYS）更新已有行并追加新行（追加导入、每日增量），未指定匹配列时只追加
+
+        规则与 incremental.upsert_frame 相同：rows 中同一匹配键取最后一次，原位置覆盖表中该键的最后一条记录，
+        其余行追加在末尾，重新读取后的数据与内存中一致。更新和追加在同一事务中完成。
+        """
+        self._check_name(name)
+        with self._connect() as conn:
+            columns = self._table_columns(conn, name)
+            if id_columns and set(id_columns) <= set(rows.columns) and set(id_columns) <= set(columns):
+                conn.execute(
+                    f'CREATE INDEX IF NOT EXISTS {_quote("idx_" + name + "_id")} '
+                    f'ON {_quote(name)} ({_quote(id_columns[0])})'
+                )
+                keys = match_keys(rows, id_columns)
+                rows = rows[(~keys.duplicated(keep='last') | keys.isna()).to_numpy()]
+                rowids = self._matching_rowids(conn, name, rows, id_columns)
+                matched = rowids >= 0
+                if matched.any():
+                    self._update_rows(conn, name, rows[matched], rowids[matched])
+                rows = rows[~matched]
+            if not rows.empty:
+                self._append(conn, name, rows)
+        self._touch(name)
+
+    def row_counts(self):
+        """各数据集的记录数（不读取数据本身）"""
+        counts = {}
+        with self._connect() as conn:
+            for name in DATASET_NAMES:
+                if self._table_columns(conn, name):
+                    counts[name] = conn.execute(f'SELECT COUNT(*) FROM {_quote(name)}').fetchone()[0]
+        return counts
+
+    def distinct_values(self, name, column):
+        """某列的去重取值，按升序排列"""
+        with self._connect() as conn:
+            if column not in self._table_columns(conn, name):
+                return []
+            rows = conn.execute(
+                f'SELECT DISTINCT {_quote(column)} FROM {_quote(name)} '
+                f'WHERE {_quote(column)} IS NOT NULL ORDER BY 1'
+            ).fetchall()
+        return [row[0] for row in rows]
+
+    def load_dataset(self, name, suppliers=None, batch_range=None):
+        """读取数据集，筛选条件以SQL下推执行
+
+        suppliers: 供应商列表；batch_range: (起始架次, 结束架次)，两端包含，按架次号数值比较
+        （与 pipeline.filter_plans 相同，'2' 在 '10' 之前）。
+        到货等不含供应商列的数据集只读取与筛选后采购计划同键的记录。
+        """
+        self._check_name(name)
+        with self._connect() as conn:
+            columns = self._table_columns(conn, name)
+            if not columns:
+                return pd.DataFrame()
+
+            where, params = self._plan_filter_sql(
+                'p', suppliers, batch_range, conn
+            )
+            if not where:
+                sql = f'SELECT * FROM {_quote(name)}'
+            elif name == 'procurement_plans':
+                sql = f'SELECT * FROM {_quote(name)} AS p WHERE {where}'
+            elif '物料编号' in columns and '架次' in columns:
+                sql = (
+                    f'SELECT * FROM {_quote(name)} AS t WHERE EXISTS ('
+                    f'SELECT 1 FROM "procurement_plans" AS p '
+                    f'WHERE p."物料编号" = t."物料编号" AND p."架次" = t."架次" AND {where})'
+                )
+            else:
+                sql = f'SELECT * FROM {_quote(name)}'
+                params = []
+            df = pd.read_sql_query(sql, conn, params=params)
+        return normalize_frame(df, name)
+
+    def _plan_filter_sql(self, alias, suppliers, batch_range, conn):
+        plan_columns = self._table_columns(conn, 'procurement_plans')
+        clauses, params = [], []
+        if suppliers and '供应商' in plan_columns:
+            clauses.append(f'{alias}."供应商" IN ({", ".join("?" * len(suppliers))})')
+            params.extend(suppliers)
+        if batch_range and '架次' in plan_columns:
+            start, end = (batch_number(pd.Series([value], dtype=object))[0] if value else -1 for value in batch_range)
+            if start >= 0:
+                clauses.append(f'batch_number({alias}."架次") >= ?')
+                params.append(int(start))
+            if end >= 0:
+                clauses.append(f'batch_number({alias}."架次") BETWEEN 0 AND ?')
+                params.append(int(end))
+        return ' AND '.join(clauses), params
+
+    def batch_totals(self):
+        """按架次汇总需求与到货数量，聚合在数据库中完成，结果按架次号数值排序"""
+        with self._connect() as conn:
+            plan_columns = self._table_columns(conn, 'procurement_plans')
+            if not {'架次', '物料编号', '需求数量'} <= set(plan_columns):
+                return pd.DataFrame()
+            if {'物料编号', '架次', '已到货数量'} <= set(self._table_columns(conn, 'deliveries')):
+                delivered = (
+                    'SELECT "物料编号", "架次", SUM("已到货数量") AS qty '
+                    'FROM "deliveries" GROUP BY "物料编号", "架次"'
+                )
+            else:
+                delivered = 'SELECT NULL AS "物料编号", NULL AS "架次", 0 AS qty LIMIT 0'
+            sql = (
+                'SELECT p."架次" AS "架次", COUNT(*) AS "计划行数", '
+                'SUM(p."需求数量") AS "总需求数量", SUM(COALESCE(d.qty, 0)) AS "总到货数量" '
+                f'FROM "procurement_plans" AS p LEFT JOIN ({delivered}) AS d '
+                'ON d."物料编号" = p."物料编号" AND d."架次" = p."架次" '
+                'GROUP BY p."架次"'
+            )
+            totals = pd.read_sql_query(sql, conn)
+        return totals.iloc[sort_batches(totals['架次'])].reset_index(drop=True)
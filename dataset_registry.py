@@ -0,0 +1,225 @@
+# -*- coding: utf-8 -*-
+"""
+供应链物料时间差距分析工具 - 进程内共享数据集登记表
+
+多个用户同时打开工具时，各会话加载的往往是同一份采购计划和到货数据（同一个本地数据库、
+同一个上传文件）。登记表按内容为数据集分配版本号，同一版本在进程中只保存一份，
+各会话的 session state 只引用它：
+- 数据集版本：不可变的数据表，版本号由内容指纹得出，内容相同的数据表只保留先登记的一份
+- 别名：如 (本地数据库, 数据集, 写入次数)，命中时不必重新读取和计算指纹
+- 派生结果：分析数据集、筛选索引、架次汇总等按所依赖的版本号缓存，各会话共用
+- 会话修改（手动录入、追加导入）写时复制：在原版本上应用增量得到新版本，
+  新版本号由原版本号和增量内容得出，对同一版本做相同修改的会话仍共用一份
+
+会话用 SessionHandle 登记自己引用的版本；会话结束、session state 被回收后自动解除，
+没有会话引用的版本及其派生结果在下次登记时释放。登记表中的数据表只读使用，不要原地修改。
+"""
+
+import hashlib
+import threading
+import weakref
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+
+class SessionHandle:
+    """会话在登记表中的标记，保存在 session state 中，随会话回收"""
+
+    __slots__ = ('__weakref__',)
+
+
+def _update_column(digest, values):
+    """把一列的内容写入哈希：直接使用底层数组的字节，只有 object 等类型才逐个值计算哈希"""
+    if isinstance(values.dtype, pd.CategoricalDtype):
+        _update_column(digest, values.cat.categories.to_series())
+        digest.update(values.cat.codes.to_numpy().tobytes())
+    elif hasattr(values.array, '__arrow_array__'):
+        # string[pyarrow] 等：合并为一块后写入 有效位/偏移/数据 缓冲区，分块方式不同时结果相同
+        chunk = values.array.__arrow_array__().combine_chunks()
+        digest.update(f'{chunk.offset}:{len(chunk)}:{chunk.null_count}'.encode('utf-8'))
+        for buffer in chunk.buffers():
+            if buffer is not None:
+                digest.update(buffer)
+    elif isinstance(values.dtype, np.dtype) and values.dtype.kind in 'biufcmM':
+        digest.update(np.ascontiguousarray(values.to_numpy()).tobytes())
+    else:
+        digest.update(pd.util.hash_pandas_object(values, index=False).to_numpy().tobytes())
+
+
+def fingerprint(frame):
+    """数据表内容指纹：列名、类型和各列内容
+
+    内容相同但内部存储不同（如分类列的类别顺序不同）时指纹可能不同，只是不能共用一份，不影响正确性。
+    """
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(repr([(str(col), str(dtype)) for col, dtype in frame.dtypes.items()]).encode('utf-8'))
+    digest.update(str(len(frame)).encode('utf-8'))
+    for col in frame.columns:
+        _update_column(digest, frame[col])
+    return digest.hexdigest()
+
+
+def object_nbytes(obj, _seen=None):
+    """估算对象占用的内存字节数：数据表按列数组计（不含字符串对象本身），容器和普通对象逐层累加"""
+    seen = set() if _seen is None else _seen
+    if id(obj) in seen:
+        return 0
+    seen.add(id(obj))
+    if isinstance(obj, pd.DataFrame):
+        return int(obj.memory_usage(index=True, deep=False).sum())
+    if isinstance(obj, (pd.Series, pd.Index)):
+        return int(obj.memory_usage(deep=False))
+    if isinstance(obj, np.ndarray):
+        return int(obj.nbytes)
+    if isinstance(obj, dict):
+        return sum(object_nbytes(value, seen) for value in obj.values())
+    if isinstance(obj, (list, tuple, set, frozenset)):
+        return sum(object_nbytes(value, seen) for value in obj)
+    if hasattr(obj, '__dict__'):
+        return object_nbytes(vars(obj), seen)
+    return 0
+
+
+def _versions_in(key):
+    """派生结果的键中包含的数据集版本号"""
+    if isinstance(key, tuple):
+        return set().union(*(_versions_in(part) for part in key)) if key else set()
+    return {key} if isinstance(key, str) and ':' in key else set()
+
+
+class _Version:
+    __slots__ = ('name', 'frame', 'memory', 'nbytes', 'created', 'sessions')
+
+    def __init__(self, name, frame, memory):
+        self.name = name
+        self.frame = frame
+        self.nbytes = object_nbytes(frame)
+        self.memory = memory or (self.nbytes, self.nbytes)
+        self.created = datetime.now()
+        self.sessions = weakref.WeakSet()
+
+
+class DatasetRegistry:
+    """进程内共享的数据集版本登记表，可在多个会话线程间共享"""
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._versions = {}
+        self._aliases = {}
+        self._derived = {}
+        # 会话 → {数据集: 版本号}
+        self._attached = weakref.WeakKeyDictionary()
+
+    def publish(self, handle, name, frame, version=None, alias=None, memory=None):
+        """登记数据表并让会话引用它，返回版本号
+
+        version 为空时按内容指纹生成；该版本已存在时沿用已有的数据表，丢弃传入的这份。
+        alias 可供以后 attach_alias 直接找到该版本；memory 为 (转换前, 转换后) 的内存字节数。
+        """
+        version = version or f"{name}:{fingerprint(frame)}"
+        with self._lock:
+            self._prune()
+            if version not in self._versions:
+                self._versions[version] = _Version(name, frame, memory)
+            if alias is not None:
+                self._aliases[alias] = version
+            self._attach(handle, name, version)
+        return version
+
+    def attach_alias(self, handle, name, alias):
+        """按别名找到已登记的版本并让会话引用它，返回版本号；未登记时返回 None"""
+        with self._lock:
+            version = self._aliases.get(alias)
+            if version not in self._versions:
+                return None
+            self._attach(handle, name, version)
+            return version
+
+    def _attach(self, handle, name, version):
+        versions = self._attached.setdefault(handle, {})
+        previous = versions.get(name)
+        if previous is not None and previous != version and previous in self._versions:
+            self._versions[previous].sessions.discard(handle)
+        versions[name] = version
+        self._versions[version].sessions.add(handle)
+
+    def frame(self, version):
+        return self._versions[version].frame
+
+    def memory(self, version):
+        """(转换前, 转换后) 的内存字节数，登记时未提供的按估算值"""
+        return self._versions[version].memory
+
+    def derived(self, key, build):
+        """按键取派生结果，没有时调用 build() 计算并登记
+
+        键中包含所依赖的数据集版本号，这些版本释放时派生结果一起释放。
+        计算在锁外进行，多个会话同时计算同一结果时保留先完成的一份。
+        """
+        with self._lock:
+            entry = self._derived.get(key)
+        if entry is not None:
+            return entry[0]
+        value = build()
+        with self._lock:
+            return self._derived.setdefault(key, (value, object_nbytes(value), datetime.now()))[0]
+
+    def _prune(self):
+        """释放没有会话引用的版本、指向它们的别名和依赖它们的派生结果"""
+        released = {version for version, entry in self._versions.items() if not entry.sessions}
+        if not released:
+            return
+        for version in released:
+            del self._versions[version]
+        self._aliases = {alias: version for alias, version in self._aliases.items() if version in self._versions}
+        self._derived = {key: entry for key, entry in self._derived.items() if not _versions_in(key) & released}
+
+    def release_unused(self):
+        """立即释放没有会话引用的版本，返回释放的字节数（估算）"""
+        with self._lock:
+            before = self.total_bytes()
+            self._prune()
+            return before - self.total_bytes()
+
+    def total_bytes(self):
+        with self._lock:
+            return (sum(entry.nbytes for entry in self._versions.values())
+                    + sum(nbytes for _, nbytes, _ in self._derived.values()))
+
+    def session_count(self):
+        with self._lock:
+            return len(self._attached)
+
+    def version_table(self):
+        """各数据集版本：数据集、版本号、行数、内存、引用会话数、登记时间，以完整版本号为索引"""
+        with self._lock:
+            entries = list(self._versions.items())
+        return pd.DataFrame({
+            '数据集': [entry.name for _, entry in entries],
+            '版本': [version.split(':', 1)[1][:12] for version, _ in entries],
+            '行数': [len(entry.frame) for _, entry in entries],
+            '内存(MB)': [entry.nbytes / 1024 ** 2 for _, entry in entries],
+            '会话数': [len(entry.sessions) for _, entry in entries],
+            '登记时间': [entry.created for _, entry in entries],
+        }, index=pd.Index([version for version, _ in entries], dtype=object))
+
+    def derived_table(self):
+        """各派生结果：类型、依赖的版本数、内存、登记时间"""
+        with self._lock:
+            entries = list(self._derived.items())
+        return pd.DataFrame({
+            '类型': [key[0] for key, _ in entries],
+            '依赖版本数': [len(_versions_in(key)) for key, _ in entries],
+            '内存(MB)': [nbytes / 1024 ** 2 for _, (_, nbytes, _) in entries],
+            '登记时间': [created for _, (_, _, created) in entries],
+        })
+
+
+def child_version(parent, name, delta):
+    """在 parent 版本上应用增量 delta 后的版本号；同一版本上的相同增量得到相同版本号"""
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update((parent or '').encode('utf-8'))
+    digest.update(fingerprint(delta).encode('utf-8'))
+    return f"{name}:{digest.hexdigest()}"
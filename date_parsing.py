@@ -0,0 +1,231 @@
+# -*- coding: utf-8 -*-
+"""
+供应链物料时间差距分析工具 - 日期列解析
+
+ERP和Excel导出的日期列写法不一：2024-01-05、2024/1/5、05/01/2024、2024年1月5日，
+设置为数字格式的日期单元格还会以Excel序列号（如45296）出现。pandas 不指定格式时按第一个值推断格式，
+其余写法的值被静默置空；推断不出时逐个值调用 dateutil，百万行需要数十秒。
+
+这里每列只从抽样值中推断一次格式，再用显式格式向量化解析：
+- 候选格式按抽样中能解析的值数量排序，依次解析，每种格式只解析前面剩下的文本
+- 日、月顺序按排在最前的带顺序的格式确定，只有相反顺序才能解析的值（如月在前的列中出现 25/01/2024）
+  不换顺序重读，置空并计为顺序冲突
+- 文本先去重（百万行通常只有几千个不同日期），相同取值只解析一次
+- Excel序列号按 1899-12-30 起的天数直接换算，日期对象（Excel日期单元格）直接转换
+- 仍未解析的少量取值逐个识别，按其他格式解析、顺序冲突和最终无法识别的行数随结果返回
+"""
+
+import warnings
+from datetime import date
+
+import numpy as np
+import pandas as pd
+
+# 候选格式，抽样中解析数相同时靠前的优先
+# ISO8601 同时接受 2024-01-05、2024/01/05、2024-1-5、20240105 及带时间的写法
+DATE_FORMATS = [
+    'ISO8601',
+    '%Y年%m月%d日',
+    '%Y.%m.%d',
+    '%m/%d/%Y',
+    '%d/%m/%Y',
+    '%d.%m.%Y',
+    '%d-%m-%Y',
+]
+
+# 日在前、月在前的格式：同一列只按其中一种顺序解析
+DAY_FIRST_FORMATS = ('%d/%m/%Y', '%d.%m.%Y', '%d-%m-%Y')
+MONTH_FIRST_FORMATS = ('%m/%d/%Y',)
+
+# 表示Excel序列号的伪格式，与候选格式一起参与抽样排序
+EXCEL_SERIAL = 'Excel序列号'
+
+# Excel（1900日期系统）序列号的起点；1900-03-01 之后的日期按此换算准确
+EXCEL_EPOCH = np.datetime64('1899-12-30', 'ns')
+
+# 视为Excel序列号的数值范围（约 1927-05-18 至 2173-10-14），范围外的数字不当作日期
+EXCEL_SERIAL_RANGE = (10_000, 100_000)
+
+# 推断格式时抽取的非空值个数
+SAMPLE_ROWS = 1_000
+
+
+def _sample(positions):
+    """从行位置中均匀抽取最多 SAMPLE_ROWS 个（不只看开头，避免文件前后写法不同）"""
+    if len(positions) > SAMPLE_ROWS:
+        positions = positions[np.linspace(0, len(positions) - 1, SAMPLE_ROWS).astype(int)]
+    return positions
+
+
+def _strip_text(values):
+    """文本去除首尾空白，日期对象、数字等原样保留"""
+    values = np.array(values, dtype=object)
+    is_text = np.fromiter((isinstance(value, str) for value in values), dtype=bool, count=len(values))
+    if is_text.any():
+        values[is_text] = pd.Series(values[is_text], dtype=object).str.strip().to_numpy()
+    return values
+
+
+def from_excel_serial(values):
+    """按Excel序列号换算日期（小数部分为一天中的时间），不是数字或超出范围的为NaT"""
+    numbers = np.asarray(pd.to_numeric(np.asarray(values), errors='coerce'), dtype=float)
+    low, high = EXCEL_SERIAL_RANGE
+    valid = (numbers >= low) & (numbers < high)
+    result = np.full(len(numbers), np.datetime64('NaT', 'ns'))
+    millis = np.round(numbers[valid] * 86_400_000).astype('int64')
+    result[valid] = EXCEL_EPOCH + millis.astype('timedelta64[ms]')
+    return result
+
+
+def _parse_with(values, fmt):
+    """按一种格式解析，返回 datetime64[ns] 数组；fmt 为 None 时逐个识别（dateutil）"""
+    if fmt == EXCEL_SERIAL:
+        return from_excel_serial(values)
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore', UserWarning)
+        parsed = pd.to_datetime(pd.Series(values, dtype=object), format=fmt or 'mixed', errors='coerce', cache=False)
+    return parsed.to_numpy(dtype='datetime64[ns]')
+
+
+def infer_formats(sample):
+    """按抽样中能解析的值数量从多到少排列候选格式（含Excel序列号），一个值都解析不了的格式不参与"""
+    sample = _strip_text(sample)
+    hits = []
+    for fmt in DATE_FORMATS + [EXCEL_SERIAL]:
+        # 日期对象按任何文本格式都能解析，不影响各文本格式之间的排序
+        count = int((~np.isnat(_parse_with(sample, fmt))).sum()) if len(sample) else 0
+        if count:
+            hits.append((count, fmt))
+    return [fmt for _, fmt in sorted(hits, key=lambda hit: -hit[0])]
+
+
+def _first_parsed(values, formats):
+    """按 formats 依次解析，每个值取第一个能解析的结果"""
+    result = np.full(len(values), np.datetime64('NaT', 'ns'))
+    for fmt in formats:
+        pending = np.isnat(result)
+        if not pending.any():
+            break
+        result[pending] = _parse_with(values[pending], fmt)
+    return result
+
+
+def _opposite_order(formats):
+    """与列的日、月顺序相反的格式；候选格式中没有带顺序的格式时为空"""
+    for fmt in formats:
+        if fmt in DAY_FIRST_FORMATS:
+            return MONTH_FIRST_FORMATS
+        if fmt in MONTH_FIRST_FORMATS:
+            return DAY_FIRST_FORMATS
+    return ()
+
+
+def _order_conflicts(values, opposite):
+    """与列的日、月顺序冲突的值：只有相反顺序的格式能解析；
+    列没有确定顺序时，为日在前、月在前都能解析但结果不同的值
+    """
+    if opposite:
+        return ~np.isnat(_first_parsed(values, opposite))
+    day_first = _first_parsed(values, DAY_FIRST_FORMATS)
+    month_first = _first_parsed(values, MONTH_FIRST_FORMATS)
+    return ~np.isnat(day_first) & ~np.isnat(month_first) & (day_first != month_first)
+
+
+def _parse_text(values, formats, info):
+    """解析文本数组：去重后去除首尾空白（空白视为空值），按 formats 依次解析，最后逐个识别
+
+    与推断格式日、月顺序相反的格式不参与；剩下的值中按相反顺序才能解析的不再逐个识别，
+    置空并计入 ambiguous 和 unparsed。各步骤的行数按取值的出现次数累加到 info。
+    """
+    codes, uniques = pd.factorize(values)
+    uniques = pd.Series(uniques, dtype=object).str.strip().to_numpy()
+    counts = np.bincount(codes, minlength=len(uniques))
+    parsed = np.full(len(uniques), np.datetime64('NaT', 'ns'))
+    pending = uniques != ''
+    opposite = _opposite_order(formats)
+
+    for fmt in [fmt for fmt in formats if fmt not in opposite] + [None]:
+        if not pending.any():
+            break
+        positions = np.flatnonzero(pending)
+        if fmt is None:
+            # dateutil 会自动调换日、月顺序，顺序冲突的值不交给它
+            conflicts = _order_conflicts(uniques[positions], opposite)
+            pending[positions[conflicts]] = False
+            info['ambiguous'] += int(counts[positions[conflicts]].sum())
+            info['unparsed'] += int(counts[positions[conflicts]].sum())
+            positions = positions[~conflicts]
+        result = _parse_with(uniques[positions], fmt)
+        ok = ~np.isnat(result)
+        parsed[positions[ok]] = result[ok]
+        pending[positions[ok]] = False
+        rows = int(counts[positions[ok]].sum())
+        if fmt == EXCEL_SERIAL:
+            info['excel_serial'] += rows
+        elif fmt not in formats[:1]:
+            info['fallback'] += rows
+
+    info['unparsed'] += int(counts[pending].sum())
+    return parsed[codes]
+
+
+def parse_dates(values):
+    """解析一列日期，返回 (datetime64[ns] 列, 解析情况)
+
+    解析情况为字典：format 主要格式（抽样推断），excel_serial 按序列号换算的行数，
+    fallback 不是按主要格式、而是按其他格式或逐个识别解析的行数，
+    ambiguous 日、月顺序与主要格式相反而置空的行数（同时计入 unparsed），
+    unparsed 非空但无法识别的行数。空值和空白文本不计为无法识别。
+    """
+    info = {'format': None, 'excel_serial': 0, 'fallback': 0, 'ambiguous': 0, 'unparsed': 0}
+    if pd.api.types.is_datetime64_any_dtype(values):
+        return values, info
+    if pd.api.types.is_numeric_dtype(values) and not pd.api.types.is_bool_dtype(values):
+        # Excel中设置为数字格式的日期列
+        result = from_excel_serial(values.to_numpy())
+        info['format'] = EXCEL_SERIAL
+        info['excel_serial'] = int((~np.isnat(result)).sum())
+        info['unparsed'] = int(values.notna().sum()) - info['excel_serial']
+        return pd.Series(result, index=values.index, name=values.name), info
+
+    raw = values.to_numpy(dtype=object)
+    present = np.flatnonzero(~pd.isna(raw))
+    formats = infer_formats(raw[_sample(present)])
+    info['format'] = formats[0] if formats else None
+    result = np.full(len(raw), np.datetime64('NaT', 'ns'))
+
+    # 按取值类型分开处理：文本、日期对象（Excel日期单元格与文本混在同一列时）、数字
+    if pd.api.types.infer_dtype(raw, skipna=True) == 'string':
+        is_text = np.ones(len(present), dtype=bool)
+        is_date = np.zeros(len(present), dtype=bool)
+    else:
+        types = pd.Series(raw[present], dtype=object).map(type)
+        kinds = types.unique()
+        is_text = types.isin([kind for kind in kinds if issubclass(kind, str)]).to_numpy()
+        is_date = types.isin([kind for kind in kinds if issubclass(kind, (date, np.datetime64))]).to_numpy()
+
+    text = present[is_text]
+    sample = raw[_sample(text)]
+    if formats[:1] == ['ISO8601'] and len(pd.unique(sample)) == len(sample):
+        # 取值几乎不重复（如带时间）时去重不划算；ISO8601 逐行解析本身很快，只有剩下的文本再去重处理
+        parsed = _parse_with(raw[text], 'ISO8601')
+        ok = ~np.isnat(parsed)
+        result[text[ok]] = parsed[ok]
+        text = text[~ok]
+    if len(text):
+        result[text] = _parse_text(raw[text], formats, info)
+
+    dates = present[is_date]
+    if len(dates):
+        result[dates] = pd.to_datetime(pd.Series(raw[dates], dtype=object),
+                                       errors='coerce').to_numpy(dtype='datetime64[ns]')
+        info['unparsed'] += int(np.isnat(result[dates]).sum())
+
+    numbers = present[~is_text & ~is_date]
+    if len(numbers):
+        result[numbers] = from_excel_serial(raw[numbers])
+        parsed = int((~np.isnat(result[numbers])).sum())
+        info['excel_serial'] += parsed
+        info['unparsed'] += len(numbers) - parsed
+
+    return pd.Series(result, index=values.index, name=values.name), info
@@ -0,0 +1,149 @@
+# -*- coding: utf-8 -*-
+"""
+供应链物料时间差距分析工具 - 运行诊断
+
+诊断模式下记录每次页面重新运行中各环节的耗时、数据表大小和进程内存，
+显示在侧边栏并追加写入本地日志（每次运行一行JSON）。
+
+各模块用 stage() / timed() 标记热点环节；未开启诊断时只是一次 ContextVar 读取，
+几乎没有开销。诊断状态按线程隔离，多个会话同时运行互不影响。
+"""
+
+import contextlib
+import contextvars
+import functools
+import json
+import os
+import sys
+import time
+from datetime import datetime
+
+LOG_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'diagnostics.jsonl')
+
+# 日志超过该大小时改名为 .1 备份后重新开始
+LOG_MAX_BYTES = 20 * 1024 * 1024
+
+_ACTIVE = contextvars.ContextVar('diagnostics_profile', default=None)
+
+
+def current_rss():
+    """当前进程内存，返回 (字节数, 来源)
+
+    优先用 psutil（可选依赖）；Linux 上读取 /proc；都不可用时退回 resource 的峰值内存。
+    """
+    try:
+        import psutil
+        return psutil.Process().memory_info().rss, 'psutil'
+    except ImportError:
+        pass
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE'), 'proc'
+    except (OSError, ValueError, IndexError, AttributeError):
+        pass
+    try:
+        import resource
+    except ImportError:
+        return None, None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux 单位为 KB，macOS 为字节
+    return peak * (1 if sys.platform == 'darwin' else 1024), 'peak'
+
+
+def frame_size(frame):
+    """数据表的行数、列数和内存字节数（不计字符串对象本身，避免逐个扫描）"""
+    return {
+        'rows': len(frame),
+        'columns': len(frame.columns),
+        'bytes': int(frame.memory_usage(index=True, deep=False).sum()),
+    }
+
+
+class RerunProfile:
+    """一次页面运行的诊断记录"""
+
+    def __init__(self, label=''):
+        self.label = label
+        self.stages = []
+        self.frames = {}
+        self._depth = 0
+        self._started = time.perf_counter()
+
+    @contextlib.contextmanager
+    def stage(self, name):
+        """记录一个环节的耗时，环节可以嵌套（depth 为嵌套层级）"""
+        entry = {'name': name, 'depth': self._depth, 'seconds': None}
+        self.stages.append(entry)
+        self._depth += 1
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            entry['seconds'] = round(time.perf_counter() - started, 4)
+            self._depth -= 1
+
+    def record_frame(self, name, frame):
+        self.frames[name] = frame_size(frame)
+
+    def finish(self):
+        """结束记录，返回可写入日志的字典；未计入任何顶层环节的时间记为"其他\""""
+        total = time.perf_counter() - self._started
+        top_level = sum(entry['seconds'] or 0 for entry in self.stages if entry['depth'] == 0)
+        rss, rss_source = current_rss()
+        return {
+            'time': datetime.now().isoformat(timespec='seconds'),
+            'label': self.label,
+            'total_seconds': round(total, 4),
+            'other_seconds': round(max(total - top_level, 0), 4),
+            'rss_bytes': rss,
+            'rss_source': rss_source,
+            'stages': self.stages,
+            'frames': self.frames,
+        }
+
+
+def start_rerun(label=''):
+    """开始记录本线程的一次运行"""
+    profile = RerunProfile(label)
+    _ACTIVE.set(profile)
+    return profile
+
+
+def end_rerun():
+    """结束本线程的记录，返回记录字典；未开始记录时返回 None"""
+    profile = _ACTIVE.get()
+    _ACTIVE.set(None)
+    return profile.finish() if profile is not None else None
+
+
+def stage(name):
+    """标记一个环节：with stage('合并'): ...，未开启诊断时不做任何事"""
+    profile = _ACTIVE.get()
+    return profile.stage(name) if profile is not None else contextlib.nullcontext()
+
+
+def timed(name):
+    """把整个函数记为一个环节的装饰器"""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with stage(name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def record_frame(name, frame):
+    """记录数据表大小，未开启诊断时不做任何事"""
+    profile = _ACTIVE.get()
+    if profile is not None:
+        profile.record_frame(name, frame)
+
+
+def append_log(record, path=LOG_PATH):
+    """追加一行JSON到诊断日志"""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    if os.path.exists(path) and os.path.getsize(path) > LOG_MAX_BYTES:
+        os.replace(path, path + '.1')
+    with open(path, 'a', encoding='utf-8') as f:
+        f.write(json.dumps(record, ensure_ascii=False) + '\n')
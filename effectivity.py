@@ -0,0 +1,140 @@
+# -*- coding: utf-8 -*-
+"""
+供应链物料时间差距分析工具 - 物料架次有效性
+
+架次号统一转换为有序整数（'001'、'B012'、'12架' 分别为 1、12、12），
+每个物料的有效区间 [有效起始架次, 有效结束架次] 合并重叠后建立区间索引。
+任意 (物料, 架次) 组合的有效性用一次 searchsorted 批量判定，
+不需要把物料与架次做笛卡尔积。
+"""
+
+import numpy as np
+import pandas as pd
+
+# 有效性判定结果
+EFFECTIVE = "有效"
+NOT_EFFECTIVE = "不在有效架次"
+UNMAPPED = "未配置有效性"
+UNPARSED = "架次无法识别"
+EFFECTIVITY_STATUSES = [EFFECTIVE, NOT_EFFECTIVE, UNMAPPED, UNPARSED]
+
+# 未填写有效结束架次时视为一直有效
+OPEN_END = np.iinfo('int64').max
+
+# 架次号中作为序号的部分：最后一段连续数字
+BATCH_NUMBER_PATTERN = r'(\d+)\D*$'
+
+
+def batch_number(values):
+    """把架次号转换为整数：取其中最后一段连续数字，无法识别时为 -1
+
+    只对去重后的取值做文本解析，分类列直接使用已有的分类。
+    """
+    values = pd.Series(values, copy=False)
+    if pd.api.types.is_numeric_dtype(values) and not pd.api.types.is_bool_dtype(values):
+        return values.fillna(-1).to_numpy(dtype='int64')
+    if isinstance(values.dtype, pd.CategoricalDtype):
+        codes, uniques = values.cat.codes.to_numpy(), values.cat.categories
+    else:
+        codes, uniques = pd.factorize(values)
+    digits = pd.Series(uniques, dtype=object).astype('string').str.extract(BATCH_NUMBER_PATTERN, expand=False)
+    numbers = np.append(pd.to_numeric(digits, errors='coerce').fillna(-1).to_numpy(dtype='int64'), -1)
+    # 缺失值代码为 -1，正好取到末尾追加的 -1
+    return numbers[codes]
+
+
+def sort_batches(batches):
+    """按架次号数值排序（数值相同的按文本排序，无法识别的排在最后），返回排序后的位置"""
+    batches = pd.Index(batches)
+    numbers = batch_number(batches)
+    return np.lexsort([batches.astype(str).to_numpy(), np.where(numbers < 0, OPEN_END, numbers)])
+
+
+class EffectivityIndex:
+    """物料有效架次区间索引"""
+
+    def __init__(self, mapping):
+        self.n_mappings = 0
+        self._materials = pd.Index([])
+        self._starts = np.array([], dtype='int64')
+        self._ends = np.array([], dtype='int64')
+        self._owners = np.array([], dtype='int64')
+        if mapping.empty or not {'物料编号', '有效起始架次'} <= set(mapping.columns):
+            return
+
+        starts = batch_number(mapping['有效起始架次'])
+        if '有效结束架次' in mapping.columns:
+            ends = batch_number(mapping['有效结束架次'])
+            ends = np.where(ends < 0, OPEN_END, ends)
+        else:
+            ends = np.full(len(mapping), OPEN_END)
+        # 起始架次无法识别或区间颠倒的记录不参与判定
+        valid = mapping['物料编号'].notna().to_numpy() & (starts >= 0) & (ends >= starts)
+        self.n_mappings = int(valid.sum())
+        material_codes, materials = pd.factorize(mapping['物料编号'].astype(object)[valid])
+        self._materials = pd.Index(materials)
+
+        owners, starts, ends = self._merge_intervals(material_codes.astype('int64'), starts[valid], ends[valid])
+        self._owners = owners
+        self._starts = starts
+        self._ends = ends
+
+    @staticmethod
+    def _merge_intervals(owners, starts, ends):
+        """同一物料的重叠或相邻区间合并为一个，返回按(物料, 起始)排序的区间"""
+        order = np.lexsort([starts, owners])
+        owners, starts, ends = owners[order], starts[order], ends[order]
+        if len(owners) == 0:
+            return owners, starts, ends
+        # 同一物料内到目前为止最大的结束架次（每个物料分段累计最大值）
+        group_start = np.r_[True, owners[1:] != owners[:-1]]
+        shifted = np.where(group_start, -1, np.r_[0, ends[:-1]])
+        running_end = pd.Series(shifted).groupby(np.cumsum(group_start)).cummax().to_numpy()
+        # 起始架次超过前面区间的最大结束架次 + 1 时开始新区间
+        new_interval = group_start | (starts - 1 > running_end)
+        interval_id = np.cumsum(new_interval) - 1
+        merged_ends = pd.Series(ends).groupby(interval_id).max().to_numpy()
+        return owners[new_interval], starts[new_interval], merged_ends
+
+    @staticmethod
+    def _combined(owners, batches, span):
+        """(物料, 架次) 合成按物料、架次有序的整数键"""
+        return owners.astype('int64') * span + batches
+
+    def resolve(self, materials, batches):
+        """批量判定 (物料, 架次) 的有效性，返回与输入等长的状态数组"""
+        material_codes = self._materials.get_indexer(pd.Series(materials, copy=False).astype(object))
+        numbers = batch_number(batches)
+        status = np.full(len(material_codes), UNMAPPED, dtype=object)
+
+        mapped = material_codes >= 0
+        status[mapped & (numbers < 0)] = UNPARSED
+        lookup = np.flatnonzero(mapped & (numbers >= 0))
+        if lookup.size == 0:
+            return status
+
+        # 找到同一物料中起始架次不大于该架次的最后一个区间
+        span = max(int(self._starts.max(initial=0)), int(numbers.max())) + 1
+        keys = self._combined(self._owners, self._starts, span)
+        positions = np.searchsorted(keys, self._combined(material_codes[lookup], numbers[lookup], span), side='right') - 1
+        safe = np.maximum(positions, 0)
+        inside = (
+            (positions >= 0)
+            & (self._owners[safe] == material_codes[lookup])
+            & (numbers[lookup] <= self._ends[safe])
+        )
+        status[lookup] = np.where(inside, EFFECTIVE, NOT_EFFECTIVE)
+        return status
+
+    def effective_counts(self, batches):
+        """各架次有效的物料数（已配置有效性的物料），按区间端点计数，不展开物料 × 架次"""
+        numbers = batch_number(batches)
+        started = np.searchsorted(np.sort(self._starts), numbers, side='right')
+        ended = np.searchsorted(np.sort(self._ends), numbers, side='left')
+        return np.where(numbers >= 0, started - ended, 0)
+
+
+def flag_effectivity(merged_data, index):
+    """为分析数据集生成有效性列（分类类型）"""
+    status = index.resolve(merged_data['物料编号'], merged_data['架次'])
+    return pd.Categorical(status, categories=EFFECTIVITY_STATUSES)
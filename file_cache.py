@@ -0,0 +1,132 @@
+# -*- coding: utf-8 -*-
+"""
+供应链物料时间差距分析工具 - 解析结果磁盘缓存
+
+以上传文件内容的哈希为键，缓存解析并规范化后的数据表。同一文件再次上传时
+直接读取缓存，跳过CSV/Excel解析。优先使用Parquet列式格式（需要pyarrow），
+不可用时退回pickle。缓存总大小超过上限时按最近使用时间淘汰。
+"""
+
+import hashlib
+import os
+import pickle
+import tempfile
+
+import pandas as pd
+
+try:
+    import pyarrow  # noqa: F401  仅用于检测Parquet支持
+    PARQUET_AVAILABLE = True
+except ImportError:
+    PARQUET_AVAILABLE = False
+
+CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '.cache', 'parsed')
+
+# 缓存目录总大小上限（字节）
+CACHE_MAX_BYTES = 2 * 1024 ** 3
+
+# 解析/规范化逻辑变化时递增，使旧缓存失效
+CACHE_FORMAT_VERSION = 3
+
+CACHE_SUFFIXES = ('.parquet', '.pkl')
+
+
+def content_key(data, dataset_name):
+    """根据文件内容、数据集名称和缓存格式版本计算缓存键"""
+    digest = hashlib.sha256()
+    digest.update(f'{CACHE_FORMAT_VERSION}:{dataset_name}:'.encode('utf-8'))
+    digest.update(data)
+    return digest.hexdigest()
+
+
+def _cache_paths(key):
+    return [os.path.join(CACHE_DIR, key + suffix) for suffix in CACHE_SUFFIXES]
+
+
+def load_cached(key):
+    """读取缓存的数据表，未命中返回None；命中时刷新访问时间用于LRU淘汰"""
+    for path in _cache_paths(key):
+        if not os.path.exists(path):
+            continue
+        try:
+            if path.endswith('.parquet'):
+                df = pd.read_parquet(path)
+            else:
+                with open(path, 'rb') as f:
+                    df = pickle.load(f)
+        except Exception:
+            # 缓存文件损坏时删除并视为未命中
+            _remove_quietly(path)
+            continue
+        os.utime(path)
+        return df
+    return None
+
+
+def store_cached(key, df):
+    """写入缓存（先写临时文件再原子替换），随后按大小上限淘汰旧缓存"""
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=CACHE_DIR, suffix='.tmp')
+    os.close(fd)
+    try:
+        target = None
+        if PARQUET_AVAILABLE:
+            try:
+                df.to_parquet(tmp_path, index=False)
+                target = os.path.join(CACHE_DIR, key + '.parquet')
+            except Exception:
+                # 混合类型的列等无法写入Parquet时退回pickle
+                target = None
+        if target is None:
+            with open(tmp_path, 'wb') as f:
+                pickle.dump(df, f, protocol=pickle.HIGHEST_PROTOCOL)
+            target = os.path.join(CACHE_DIR, key + '.pkl')
+        os.replace(tmp_path, target)
+    finally:
+        _remove_quietly(tmp_path)
+    evict_cache(CACHE_MAX_BYTES)
+
+
+def evict_cache(max_bytes):
+    """删除最久未使用的缓存文件，直到缓存目录总大小不超过 max_bytes"""
+    if not os.path.isdir(CACHE_DIR):
+        return
+    entries = []
+    for name in os.listdir(CACHE_DIR):
+        if not name.endswith(CACHE_SUFFIXES):
+            continue
+        path = os.path.join(CACHE_DIR, name)
+        stat = os.stat(path)
+        entries.append((stat.st_mtime, stat.st_size, path))
+
+    total = sum(size for _, size, _ in entries)
+    for _, size, path in sorted(entries):
+        if total <= max_bytes:
+            break
+        _remove_quietly(path)
+        total -= size
+
+
+def read_with_cache(data, dataset_name, parse):
+    """按内容哈希读取缓存，未命中时调用 parse() 解析并写入缓存
+
+    返回 (数据表, 是否命中缓存)。
+    """
+    key = content_key(data, dataset_name)
+    df = load_cached(key)
+    if df is not None:
+        return df, True
+    df = parse()
+    try:
+        store_cached(key, df)
+    except OSError:
+        # 缓存目录不可写时不影响正常使用
+        pass
+    return df, False
+
+
+def _remove_quietly(path):
+    try:
+        os.remove(path)
+    except OSError:
+        pass
@@ -0,0 +1,126 @@
+# -*- coding: utf-8 -*-
+"""
+供应链物料时间差距分析工具 - 多维筛选引擎
+
+每个数据版本只建一次索引：
+- 分类维度（供应商、物料类型、物料名称）编码为整数代码，多选筛选用查找表一次映射成行掩码
+- 日期维度预先排序，区间筛选用 searchsorted 定位
+- 延迟状态预先算好行掩码
+筛选结果以行位置数组返回，各维度掩码直接按位与，不复制数据表。
+"""
+
+import numpy as np
+import pandas as pd
+
+from diagnostics import timed
+
+# 延迟状态筛选选项
+STATUS_ALL = "全部数据"
+STATUS_DELAYED = "仅延迟"
+STATUS_ON_TIME = "仅按时/提前"
+STATUS_OPTIONS = [STATUS_ALL, STATUS_DELAYED, STATUS_ON_TIME]
+
+
+class FilterIndex:
+    """分析数据集的筛选索引"""
+
+    def __init__(self, df, dimensions=('供应商', '物料类型', '物料名称'),
+                 date_columns=('需求日期', '实际到货日期'), gap_column='天数差距'):
+        self.n_rows = len(df)
+
+        # 分类维度: 列名 -> (每行代码, 有序取值)；缺失值代码为 -1
+        self._codes = {}
+        for dim in dimensions:
+            if dim in df.columns:
+                codes, categories = pd.factorize(df[dim], sort=True)
+                self._codes[dim] = (codes, list(categories))
+
+        # 日期维度: 列名 -> (升序日期值, 对应行位置)，缺失日期不进入索引
+        self._dates = {}
+        for col in date_columns:
+            if col in df.columns:
+                values = pd.to_datetime(df[col], errors='coerce').to_numpy(dtype='datetime64[ns]')
+                valid = np.flatnonzero(~np.isnat(values))
+                order = valid[np.argsort(values[valid], kind='stable')]
+                self._dates[col] = (values[order], order)
+
+        gaps = df[gap_column] if gap_column in df.columns else pd.Series(np.nan, index=df.index)
+        self.gaps = pd.to_numeric(gaps, errors='coerce').astype('float64').to_numpy()
+        self._status_masks = {
+            STATUS_DELAYED: self.gaps > 0,
+            STATUS_ON_TIME: self.gaps <= 0,
+        }
+
+    def dimensions(self):
+        return list(self._codes)
+
+    def options(self, dim):
+        """维度的可选值（升序）"""
+        return self._codes[dim][1] if dim in self._codes else []
+
+    def date_bounds(self, col):
+        """日期维度的最小/最大值，无数据时返回 None"""
+        if col not in self._dates or len(self._dates[col][0]) == 0:
+            return None
+        values = self._dates[col][0]
+        return pd.Timestamp(values[0]), pd.Timestamp(values[-1])
+
+    @timed('筛选')
+    def select(self, status=STATUS_ALL, selections=None, date_ranges=None):
+        """按条件筛选，返回满足所有条件的行位置（升序）
+
+        selections: {维度: 选中值列表}，空列表表示不筛选该维度
+        date_ranges: {日期列: (起始日期, 结束日期)}，两端均包含；为空或缺少一端的范围不筛选
+        """
+        mask = np.ones(self.n_rows, dtype=bool)
+
+        if status in self._status_masks:
+            mask &= self._status_masks[status]
+
+        for dim, selected in (selections or {}).items():
+            if not selected or dim not in self._codes:
+                continue
+            codes, categories = self._codes[dim]
+            lookup = np.zeros(len(categories) + 1, dtype=bool)
+            position = {value: i for i, value in enumerate(categories)}
+            lookup[[position[value] for value in selected if value in position]] = True
+            # 代码 -1（缺失值）映射到查找表最后一位，恒为 False
+            mask &= lookup[codes]
+
+        for col, date_range in (date_ranges or {}).items():
+            if col not in self._dates or len(date_range or ()) != 2 or any(pd.isna(d) for d in date_range):
+                continue
+            start, end = date_range
+            values, order = self._dates[col]
+            low = np.searchsorted(values, np.datetime64(pd.Timestamp(start), 'ns'), side='left')
+            # 结束日期包含当天全天
+            high = np.searchsorted(values, np.datetime64(pd.Timestamp(end) + pd.Timedelta(days=1), 'ns'), side='left')
+            in_range = np.zeros(self.n_rows, dtype=bool)
+            in_range[order[low:high]] = True
+            mask &= in_range
+
+        return np.flatnonzero(mask)
+
+    def gap_stats(self, positions):
+        """筛选结果的天数差距统计：平均、最大、最小、按时到货率(%)"""
+        gaps = self.gaps[positions]
+        valid = gaps[~np.isnan(gaps)]
+        if valid.size == 0:
+            return {'mean': np.nan, 'max': np.nan, 'min': np.nan, 'on_time_rate': 0.0}
+        return {
+            'mean': valid.mean(),
+            'max': valid.max(),
+            'min': valid.min(),
+            'on_time_rate': (valid <= 0).sum() / len(positions) * 100,
+        }
+
+    def group_mean_gap(self, dim, positions):
+        """按维度分组的平均天数差距（只统计有到货日期的行），返回以维度取值为索引的 Series"""
+        codes, categories = self._codes[dim]
+        gaps = self.gaps[positions]
+        group_codes = codes[positions]
+        valid = (group_codes >= 0) & ~np.isnan(gaps)
+        sums = np.bincount(group_codes[valid], weights=gaps[valid], minlength=len(categories))
+        counts = np.bincount(group_codes[valid], minlength=len(categories))
+        present = counts > 0
+        return pd.Series(sums[present] / counts[present], index=pd.Index(np.asarray(categories, dtype=object)[present], name=dim))
@@ -0,0 +1,177 @@
+# -*- coding: utf-8 -*-
+"""
+供应链物料时间差距分析工具 - 增量更新
+
+每日导入的到货增量通常只涉及少量(物料编号, 架次)。这里提供：
+- upsert_frame: 按编号（采购计划按计划编号，到货按到货编号+物料编号+架次）更新已有记录、追加新记录，
+  返回受影响的键（脏键）
+- refresh_analysis: 只重算脏键对应的计划行（合并、齐套日期、天数差距、完成率、有效性），
+  其余行沿用已有结果
+- refresh_batch_views: 只重算脏键所在架次的汇总行和分组索引
+
+分析数据集与采购计划逐行对应（左关联保持计划行顺序），更新过的计划行留在原位置，
+新计划行追加在末尾，因此增量结果与整表重算完全一致。
+"""
+
+import numpy as np
+import pandas as pd
+
+from analysis_engine import KEY_COLUMNS, KeyIndex, build_batch_summary
+from date_parsing import parse_dates
+from diagnostics import timed
+from effectivity import sort_batches
+from pipeline import build_flagged_dataset
+from schema import match_keys
+
+
+def _align_categories(base, rows):
+    """让新记录与已有数据的分类、字符串和日期列类型一致，拼接和按位置写入后不会退化为object"""
+    base = base.copy(deep=False)
+    rows = rows.copy(deep=False)
+    for col in base.columns:
+        if col not in rows.columns:
+            continue
+        dtype = base[col].dtype
+        if isinstance(dtype, pd.CategoricalDtype):
+            values = rows[col].astype(object)
+            new = pd.Index(values.dropna().unique()).difference(dtype.categories)
+            if len(new):
+                base[col] = base[col].cat.add_categories(new)
+            rows[col] = pd.Categorical(values, categories=base[col].cat.categories)
+        elif isinstance(dtype, pd.StringDtype):
+            rows[col] = rows[col].astype(dtype)
+        elif pd.api.types.is_datetime64_any_dtype(dtype) and not pd.api.types.is_datetime64_any_dtype(rows[col]):
+            rows[col] = parse_dates(rows[col])[0]
+    return base, rows
+
+
+def _assign_rows(frame, positions, rows):
+    """把 rows 按位置写入 frame（原位置覆盖），只复制被写入的列，返回新表"""
+    frame = frame.copy(deep=False)
+    for col in rows.columns:
+        values = rows[col]
+        if col not in frame.columns:
+            frame[col] = pd.Series(pd.NA if isinstance(values.dtype, pd.api.extensions.ExtensionDtype) else np.nan,
+                                   index=frame.index, dtype=values.dtype)
+        column = frame[col]
+        if isinstance(column.dtype, pd.CategoricalDtype):
+            column = column.copy()
+        else:
+            # 取两列拼接后的类型，如 int16 写入 int64 时升级为 int64
+            dtype = pd.concat([column.iloc[:1], values.iloc[:1]]).dtype
+            column = column.astype(dtype, copy=True)
+            values = values.astype(dtype)
+        column.iloc[positions] = values.to_numpy()
+        frame[col] = column
+    return frame
+
+
+def _key_frame(frame):
+    """提取(物料编号, 架次)键表，统一为文本以便不同来源的键合并"""
+    return pd.DataFrame({col: frame[col].astype(object).to_numpy() for col in KEY_COLUMNS})
+
+
+def upsert_frame(base, delta, id_columns=None):
+    """按匹配列（schema.UPSERT_KEYS）更新已有记录并追加新记录
+
+    delta 中匹配键与已有记录相同的行原位置覆盖已有记录中的最后一条，同一匹配键多次出现取最后一次；
+    其余行追加在末尾。未指定匹配列或匹配列有空值的行全部追加。规则与 DatasetStore.upsert_rows 相同。
+    返回 (更新后的数据表, 脏键表)。脏键包括新记录的键和被覆盖记录原来的键；
+    数据集缺少(物料编号, 架次)列时脏键表为 None。
+    """
+    if delta.empty:
+        return base, _key_frame(delta) if set(KEY_COLUMNS) <= set(delta.columns) else None
+    if base.empty:
+        combined = delta.reset_index(drop=True)
+        return combined, _key_frame(combined) if set(KEY_COLUMNS) <= set(combined.columns) else None
+
+    base, delta = _align_categories(base, delta.reset_index(drop=True))
+    replaced = np.array([], dtype='int64')
+    appended = delta
+    if id_columns and set(id_columns) <= set(base.columns) and set(id_columns) <= set(delta.columns):
+        keys = match_keys(delta, id_columns)
+        has_id = keys.notna().to_numpy()
+        # 同一匹配键只保留最后一次出现，匹配列有空值的行全部保留
+        keep = ~keys.duplicated(keep='last').to_numpy() | ~has_id
+        delta, keys, has_id = delta[keep], keys[keep], has_id[keep]
+        # 先用首个匹配列的 isin 找出少量候选行，只对这些行合成匹配键，建立 匹配键 → 位置 的对照
+        first = id_columns[0]
+        hits = np.flatnonzero(base[first].isin(delta.loc[has_id, first].astype(object).unique()).to_numpy())
+        lookup = pd.Series(hits, index=match_keys(base.iloc[hits], id_columns).to_numpy())
+        lookup = lookup[lookup.index.notna() & ~lookup.index.duplicated(keep='last')]
+        positions = lookup.reindex(keys.to_numpy()).to_numpy(dtype='float64')
+        matched = has_id & ~np.isnan(positions)
+        replaced = positions[matched].astype('int64')
+        appended = delta[~matched]
+        updates = delta[matched]
+    else:
+        updates = delta.iloc[:0]
+
+    has_keys = set(KEY_COLUMNS) <= set(base.columns) and set(KEY_COLUMNS) <= set(delta.columns)
+    dirty = None
+    if has_keys:
+        dirty = pd.concat([_key_frame(delta), _key_frame(base.iloc[replaced])], ignore_index=True)
+
+    combined = _assign_rows(base, replaced, updates) if len(replaced) else base
+    if not appended.empty:
+        combined = pd.concat([combined, appended], ignore_index=True)
+    return combined, dirty
+
+
+def refresh_analysis(merged_data, plans, deliveries, dirty_keys, effectivity=None):
+    """只重算脏键对应的计划行，返回新的分析数据集和被重算的行位置
+
+    merged_data 与更新前的采购计划逐行对应；plans 为更新后的采购计划
+    （已有计划行位置不变，新计划行在末尾）。新计划行无论键是否完整都会计算。
+    """
+    n_old = len(merged_data)
+    if dirty_keys is not None and not dirty_keys.empty and not plans.empty:
+        keys = KeyIndex(dirty_keys.drop_duplicates())
+        plan_rows = np.flatnonzero(keys.encode(plans) >= 0)
+        delivery_rows = (
+            np.flatnonzero(keys.encode(deliveries) >= 0) if not deliveries.empty else np.array([], dtype='int64')
+        )
+    else:
+        plan_rows = delivery_rows = np.array([], dtype='int64')
+    rows = np.union1d(plan_rows, np.arange(n_old, len(plans)))
+    if rows.size == 0:
+        return merged_data, rows
+
+    partial = build_flagged_dataset(plans.iloc[rows], deliveries.iloc[delivery_rows], effectivity)
+    merged_data, partial = _align_categories(merged_data, partial)
+    existing = rows < n_old
+    patched = _assign_rows(merged_data, rows[existing], partial[existing]) if existing.any() else merged_data
+    if not existing.all():
+        patched = pd.concat([patched, partial[~existing]], ignore_index=True)
+    return patched, rows
+
+
+@timed('架次汇总修补')
+def refresh_batch_views(batch_summary, batch_index, merged_data, rows):
+    """只重算 rows（被重算的行）以及原先同架次的汇总行和分组索引
+
+    batch_summary 按架次号数值排序；batch_index 为 {架次: 行位置数组}。
+    计划行的架次被更新时，原架次也在 batch_index 中找到并一起重算。
+    """
+    if len(rows) == 0:
+        return batch_summary, batch_index
+    batches = merged_data['架次']
+    dirty = pd.Index(batches.iloc[rows].dropna().unique())
+    if batch_index:
+        # 被重算的行原来所在的架次（计划行的架次可能被更新）
+        labels = list(batch_index)
+        owners = np.repeat(np.arange(len(labels)), [len(positions) for positions in batch_index.values()])
+        hit = np.unique(owners[np.isin(np.concatenate(list(batch_index.values())), rows)])
+        dirty = dirty.union(pd.Index([labels[i] for i in hit]))
+
+    positions = np.flatnonzero(batches.isin(dirty).to_numpy())
+    subset = merged_data.iloc[positions]
+    part = build_batch_summary(subset)
+
+    summary = pd.concat([batch_summary[~batch_summary.index.isin(dirty)], part])
+    summary = summary.iloc[sort_batches(summary.index)]
+    index = {batch: kept for batch, kept in batch_index.items() if batch not in dirty}
+    if not subset.empty:
+        for batch, local in subset.groupby('架次', observed=True, sort=False).indices.items():
+            index[batch] = positions[local]
+    return summary, index
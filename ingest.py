@@ -0,0 +1,144 @@
+# -*- coding: utf-8 -*-
+"""
+供应链物料时间差距分析工具 - 多文件并行导入
+
+同一数据集的多个文件（如按月、按工厂导出的ERP文件）在进程池中并行解析，
+每个文件独立走解析缓存；全部解析完成后统一列结构，只做一次拼接。
+总耗时接近最大的单个文件，而不是所有文件之和。
+"""
+
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+
+import pandas as pd
+
+from data_io import read_table_bytes
+from diagnostics import timed
+from file_cache import read_with_cache
+from schema import DATASET_SCHEMAS, describe_unparsed_dates
+
+# 文件解析状态
+STATUS_OK = "成功"
+STATUS_FAILED = "失败"
+
+# 解析进程池，首次使用时创建并在进程内复用，避免每次上传都重新启动工作进程
+_POOL = None
+
+
+def _get_pool():
+    global _POOL
+    if _POOL is None:
+        # Streamlit 服务进程是多线程的，用 spawn 启动工作进程，不复制父进程的线程状态
+        _POOL = ProcessPoolExecutor(
+            max_workers=os.cpu_count() or 1,
+            mp_context=multiprocessing.get_context('spawn')
+        )
+    return _POOL
+
+
+def _reset_pool():
+    global _POOL
+    if _POOL is not None:
+        _POOL.shutdown(wait=False, cancel_futures=True)
+    _POOL = None
+
+
+def parse_file(filename, data, dataset_name, progress_callback=None):
+    """解析单个文件（可在工作进程中执行），返回 (数据表或None, 是否命中缓存, 耗时秒, 错误信息)
+
+    progress_callback 接收CSV分块读取的进度（0~1），只在当前进程解析时使用。
+    """
+    started = time.perf_counter()
+    try:
+        df, cache_hit = read_with_cache(
+            data, dataset_name, lambda: read_table_bytes(data, filename, dataset_name, progress_callback)
+        )
+    except Exception as e:
+        return None, False, time.perf_counter() - started, f"{type(e).__name__}: {e}"
+    return df, cache_hit, time.perf_counter() - started, None
+
+
+def _parse_task(task):
+    return parse_file(*task)
+
+
+def reconcile_columns(frames, dataset_name):
+    """统一各文件的列结构：列定义中的列在前（按定义顺序），其余列按首次出现顺序
+
+    返回 (统一后的数据表列表, 各文件缺少的列定义列)。缺少的列补为空值。
+    """
+    schema_columns = list(DATASET_SCHEMAS.get(dataset_name, {}))
+    seen = []
+    for df in frames:
+        seen.extend(col for col in df.columns if col not in seen)
+    columns = [col for col in schema_columns if col in seen] + [col for col in seen if col not in schema_columns]
+
+    aligned, missing = [], []
+    for df in frames:
+        missing.append([col for col in schema_columns if col in columns and col not in df.columns])
+        aligned.append(df if list(df.columns) == columns else df.reindex(columns=columns))
+    return aligned, missing
+
+
+def _describe(df, error, missing):
+    """文件状态的说明：解析错误，或缺少的列和无法识别的日期行数"""
+    if error:
+        return error
+    notes = [f"缺少列: {', '.join(missing)}"] if missing else []
+    notes.append(describe_unparsed_dates(df))
+    return "；".join(note for note in notes if note)
+
+
+@timed('导入')
+def ingest_files(files, dataset_name, progress_callback=None):
+    """并行解析同一数据集的多个文件并拼接
+
+    files 为 [(文件名, 文件内容bytes), ...]；progress_callback 接收 (已完成文件数, 文件总数)。
+    返回 (拼接后的数据表, 逐文件状态表)。只有一个文件或单核机器上直接在当前进程解析，
+    此时大CSV文件逐块报告进度，已完成文件数含当前文件已读取的比例（如 0.4）。
+    """
+    tasks = [(filename, data, dataset_name) for filename, data in files]
+    results = [None] * len(tasks)
+
+    if len(tasks) <= 1 or (os.cpu_count() or 1) == 1:
+        for i, task in enumerate(tasks):
+            chunk_progress = None
+            if progress_callback is not None:
+                chunk_progress = lambda fraction, done=i: progress_callback(done + fraction, len(tasks))
+            results[i] = parse_file(*task, progress_callback=chunk_progress)
+            if progress_callback is not None:
+                progress_callback(i + 1, len(tasks))
+    else:
+        try:
+            pool = _get_pool()
+            futures = {pool.submit(_parse_task, task): i for i, task in enumerate(tasks)}
+            for done, future in enumerate(as_completed(futures), start=1):
+                results[futures[future]] = future.result()
+                if progress_callback is not None:
+                    progress_callback(done, len(tasks))
+        except BrokenProcessPool:
+            # 工作进程异常退出时重建进程池，本次改为逐个解析
+            _reset_pool()
+            for i, task in enumerate(tasks):
+                if results[i] is None:
+                    results[i] = _parse_task(task)
+
+    parsed = [(i, result[0]) for i, result in enumerate(results) if result[0] is not None]
+    aligned, missing = reconcile_columns([df for _, df in parsed], dataset_name)
+    missing_by_file = {i: cols for (i, _), cols in zip(parsed, missing)}
+
+    status = pd.DataFrame({
+        '文件': [filename for filename, _ in files],
+        '状态': [STATUS_OK if df is not None else STATUS_FAILED for df, _, _, _ in results],
+        '行数': [len(df) if df is not None else 0 for df, _, _, _ in results],
+        '耗时(秒)': [round(seconds, 2) for _, _, seconds, _ in results],
+        '解析缓存': ["命中" if hit else "" for _, hit, _, _ in results],
+        '说明': [_describe(df, error, missing_by_file.get(i)) for i, (df, _, _, error) in enumerate(results)],
+    })
+
+    if not aligned:
+        return pd.DataFrame(), status
+    return pd.concat(aligned, ignore_index=True), status
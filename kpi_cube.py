@@ -0,0 +1,162 @@
+# -*- coding: utf-8 -*-
+"""
+供应链物料时间差距分析工具 - KPI 汇总立方体
+
+按 供应商 × 物料类型 × 有效性 × 周期（需求日期所在的周/月）预先汇总分析数据集，
+每个单元格只保存可加的量：计划行数、到货行数、按时行数、天数差距合计及平方和。
+趋势图和记分卡从单元格重新汇总得到按时到货率、平均时间差距和标准差，不再扫描明细行：
+百万行的分析数据集通常只有几万个单元格。
+
+这些量都可以相加相减，追加/更新到货后只需减去被重算行原来的贡献、加上新的贡献，
+不必整表重算。立方体在各会话间共享，增量更新返回新对象，不修改原对象。
+"""
+
+import numpy as np
+import pandas as pd
+
+from diagnostics import timed
+
+# 汇总维度（分析数据集中存在的才参与）
+DIMENSIONS = ('供应商', '物料类型', '有效性')
+
+# 周期粒度及显示名称：周以星期一开始，月以1日开始
+WEEK = 'W'
+MONTH = 'M'
+PERIOD_LABELS = {WEEK: '按周', MONTH: '按月'}
+
+# 周期索引层的名称
+PERIOD = '周期'
+
+# 单元格中保存的可加量
+MEASURES = ['计划行数', '到货行数', '按时行数', '差距合计', '差距平方和']
+
+# 分组趋势图最多绘制的序列数（按计划行数取最多的取值）
+MAX_SERIES = 10
+
+# 维度取值为空的行归入该标签，保证合计与明细一致
+MISSING_LABEL = '（空）'
+
+
+def period_start(dates, freq):
+    """日期所在周期的起始日，缺失日期为 NaT"""
+    days = pd.Series(dates, copy=False).to_numpy(dtype='datetime64[ns]').astype('datetime64[D]')
+    if freq == WEEK:
+        # 1970-01-01 为星期四，(天数 + 3) % 7 为距本周一的天数
+        days = days - ((days.view('int64') + 3) % 7).astype('timedelta64[D]')
+    else:
+        days = days.astype('datetime64[M]').astype('datetime64[D]')
+    return days.astype('datetime64[ns]')
+
+
+def build_cells(df, dimensions, freq, date_column='需求日期', gap_column='天数差距'):
+    """按维度和周期汇总各可加量，返回以 (各维度, 周期) 为索引的单元格表
+
+    按时行数与天数差距统计口径一致：天数差距 <= 0 为按时；没有到货的计划行只计入计划行数。
+    需求日期缺失的行周期为 NaT，计入合计但不出现在趋势中。
+    """
+    gaps = pd.to_numeric(df[gap_column], errors='coerce').astype('float64').to_numpy()
+    arrived = ~np.isnan(gaps)
+    gaps = np.where(arrived, gaps, 0.0)
+
+    # 各维度和周期编码为整数后按混合进制合成一个组号，用 bincount 一次汇总
+    levels, combined = [], np.zeros(len(df), dtype='int64')
+    columns = [df[dim].astype(object).fillna(MISSING_LABEL) if df[dim].hasnans else df[dim] for dim in dimensions]
+    for values in columns + [pd.Series(period_start(df[date_column], freq))]:
+        codes, uniques = pd.factorize(values, use_na_sentinel=False)
+        levels.append(uniques)
+        combined = combined * len(uniques) + codes
+    groups, keys = pd.factorize(combined)
+
+    sums = {
+        '计划行数': np.bincount(groups, minlength=len(keys)),
+        '到货行数': np.bincount(groups, weights=arrived, minlength=len(keys)),
+        '按时行数': np.bincount(groups, weights=arrived & (gaps <= 0), minlength=len(keys)),
+        '差距合计': np.bincount(groups, weights=gaps, minlength=len(keys)),
+        '差距平方和': np.bincount(groups, weights=gaps * gaps, minlength=len(keys)),
+    }
+    arrays = []
+    for uniques in reversed(levels):
+        arrays.append(np.asarray(uniques).take(keys % len(uniques)))
+        keys = keys // len(uniques)
+    index = pd.MultiIndex.from_arrays(arrays[::-1], names=list(dimensions) + [PERIOD])
+    return pd.DataFrame(sums, index=index).astype('float64')
+
+
+def kpi_metrics(totals):
+    """由汇总后的可加量计算指标：按时到货率(%)、平均时间差距、差距标准差（样本标准差）"""
+    arrived = totals['到货行数']
+    mean = totals['差距合计'] / arrived.where(arrived > 0)
+    variance = (totals['差距平方和'] - arrived * mean ** 2) / (arrived - 1).where(arrived > 1)
+    return pd.DataFrame({
+        '计划行数': totals['计划行数'].astype('int64'),
+        '到货行数': arrived.astype('int64'),
+        '按时到货率': totals['按时行数'] / totals['计划行数'].where(totals['计划行数'] > 0) * 100,
+        '平均时间差距': mean,
+        '差距标准差': np.sqrt(variance.clip(lower=0)),
+    }, index=totals.index)
+
+
+class KpiCube:
+    """分析数据集的 KPI 汇总立方体，每种周期粒度一张单元格表，只读使用"""
+
+    def __init__(self, df, dimensions=DIMENSIONS):
+        self.dimensions = [dim for dim in dimensions if dim in df.columns]
+        self.cells = {freq: build_cells(df, self.dimensions, freq) for freq in PERIOD_LABELS}
+
+    @timed('KPI立方体修补')
+    def updated(self, removed, added):
+        """返回应用增量后的新立方体：减去 removed 行原来的贡献，加上 added 行的贡献
+
+        removed 为被重算的已有行（更新前），added 为这些行重算后的结果及新增行。
+        """
+        cube = object.__new__(KpiCube)
+        cube.dimensions = self.dimensions
+        cube.cells = {}
+        for freq, cells in self.cells.items():
+            parts = [cells, build_cells(added, self.dimensions, freq)]
+            if len(removed):
+                parts.append(-build_cells(removed, self.dimensions, freq))
+            merged = pd.concat(parts).groupby(level=list(range(cells.index.nlevels)), dropna=False, sort=False).sum()
+            cube.cells[freq] = merged[merged['计划行数'] != 0]
+        return cube
+
+    def _select(self, freq, selections):
+        cells = self.cells[freq]
+        mask = np.ones(len(cells), dtype=bool)
+        for dim, selected in (selections or {}).items():
+            if selected and dim in self.dimensions:
+                mask &= cells.index.get_level_values(dim).isin(selected)
+        return cells[mask]
+
+    def totals(self, selections=None):
+        """所选单元格的合计指标（一行的 Series），与明细行上统计的结果一致"""
+        cells = self._select(MONTH, selections)
+        return kpi_metrics(cells.sum().to_frame().T).iloc[0]
+
+    def trend(self, freq, selections=None, by=None):
+        """按周期重新汇总所选单元格，返回各周期的指标
+
+        by 为维度名时按 (该维度, 周期) 分组，每个取值一条序列。selections 为 {维度: 选中值列表}。
+        """
+        cells = self._select(freq, selections)
+        levels = ([by] if by else []) + [PERIOD]
+        return kpi_metrics(cells.groupby(level=levels, sort=True).sum())
+
+    def scorecard(self, by, freq=MONTH, selections=None, as_of=None):
+        """按维度取值的记分卡：全部周期的合计指标，以及最近一个周期的按时到货率和较上一周期的变化
+
+        最近周期为起始日不晚于 as_of（默认今天）的最后一个有数据的周期。
+        """
+        cells = self._select(freq, selections)
+        card = kpi_metrics(cells.groupby(level=by, sort=True).sum())
+        periods = cells.index.get_level_values(PERIOD)
+        past = np.sort(pd.unique(periods[periods <= pd.Timestamp(as_of or pd.Timestamp.now())].dropna()))
+        for label, period in (('最近周期', past[-1:]), ('上一周期', past[-2:-1])):
+            if len(period):
+                recent = cells[periods == period[0]].groupby(level=by, sort=True).sum()
+                card[f'{label}按时到货率'] = kpi_metrics(recent)['按时到货率'].reindex(card.index)
+            else:
+                card[f'{label}按时到货率'] = np.nan
+        card['较上期变化'] = card['最近周期按时到货率'] - card.pop('上一周期按时到货率')
+        card.attrs['最近周期'] = pd.Timestamp(past[-1]) if len(past) else None
+        return card
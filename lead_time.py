@@ -0,0 +1,182 @@
+# -*- coding: utf-8 -*-
+"""
+供应链物料时间差距分析工具 - 供应链环节时长引擎
+
+以采购计划的每一行为起点，按(物料编号, 架次)依次关联各环节数据集：
+计划下达 → 合同签订 → 订单签收 → 到货 → 待检 → 入库 → 交付。
+每一环节取同键下、不早于上一环节日期的第一条记录。关联按(键, 日期)排序后
+用 searchsorted 一次完成（与按键分组、向前匹配的 merge_asof 等价），不做逐条循环。
+某行缺少某一环节时，下一环节从最近一个已知环节的日期继续匹配。
+"""
+
+import numpy as np
+import pandas as pd
+
+from analysis_engine import KeyIndex, compute_days_gap
+from diagnostics import timed
+
+# 环节节点：(节点名称, 数据集, 日期列)
+STAGES = [
+    ('计划下达', 'procurement_plans', '计划下达日期'),
+    ('合同签订', 'contracts', '合同签订日期'),
+    ('订单签收', 'orders', '订单签收日期'),
+    ('到货', 'deliveries', '实际到货日期'),
+    ('待检', 'inspection_queue', '入检日期'),
+    ('入库', 'inventory', '入库日期'),
+    ('交付', 'delivered_materials', '交付日期'),
+]
+
+STAGE_NODES = [node for node, _, _ in STAGES]
+
+# 相邻节点之间的环节
+SEGMENTS = [f'{start}→{end}' for start, end in zip(STAGE_NODES[:-1], STAGE_NODES[1:])]
+
+# 输出的分位数
+PERCENTILES = (50, 90, 99)
+
+# 分组维度
+GROUP_DIMENSIONS = ['供应商', '物料类型']
+
+# 未知起点（计划下达日期缺失）按最早日期处理，匹配该键的第一条记录
+_EARLIEST = np.iinfo('int64').min + 1
+
+
+def _link_next_stage(plan_keys, anchor_ns, events, date_col):
+    """为每个计划行找到同键下、日期不早于 anchor 的第一条环节记录，返回 datetime64 数组
+
+    键和日期排名合成一个整数排序键，环节记录排序后用一次 searchsorted
+    完成按键分组的向前匹配（等价于 merge_asof(by=键, direction='forward')）。
+    """
+    linked = np.full(len(anchor_ns), np.datetime64('NaT'), dtype='datetime64[ns]')
+    if events.empty or date_col not in events.columns or not {'物料编号', '架次'} <= set(events.columns):
+        return linked
+
+    event_codes = plan_keys.encode(events)
+    event_dates = pd.to_datetime(events[date_col], errors='coerce').to_numpy(dtype='datetime64[ns]')
+    valid = (event_codes >= 0) & ~np.isnat(event_dates)
+    event_codes = event_codes[valid]
+    event_ns = event_dates[valid].view('i8')
+    if event_codes.size == 0:
+        return linked
+
+    # 日期换成排名，使 键 * 日期数 + 排名 不会溢出
+    date_ranks, date_values = pd.factorize(np.concatenate([event_ns, anchor_ns]), sort=True)
+    n_dates = len(date_values)
+    event_sort_key = event_codes * n_dates + date_ranks[:len(event_ns)]
+    order = np.argsort(event_sort_key, kind='stable')
+    event_sort_key = event_sort_key[order]
+    event_ns = event_ns[order]
+
+    rows = np.flatnonzero(plan_keys.codes >= 0)
+    plan_codes = plan_keys.codes[rows]
+    plan_sort_key = plan_codes * n_dates + date_ranks[len(event_ns):][rows]
+    found = np.searchsorted(event_sort_key, plan_sort_key, side='left')
+    in_range = found < len(event_sort_key)
+    # 找到的记录必须属于同一个键，否则该键在 anchor 之后没有记录
+    hit = np.zeros(len(rows), dtype=bool)
+    hit[in_range] = event_sort_key[found[in_range]] // n_dates == plan_codes[in_range]
+    linked[rows[hit]] = event_ns[found[hit]].view('datetime64[ns]')
+    return linked
+
+
+@timed('环节时间线')
+def build_stage_timeline(datasets):
+    """构建环节时间线：每个计划行一行，包含各节点日期和相邻环节的时长(天)
+
+    datasets: {数据集名称: DataFrame}，缺少的数据集视为无该环节记录。
+    另附 有退货 列：该(物料编号, 架次)是否有退货记录。
+    """
+    plans = datasets.get('procurement_plans', pd.DataFrame())
+    if plans.empty:
+        return pd.DataFrame(columns=['物料编号', '架次'] + GROUP_DIMENSIONS + STAGE_NODES + SEGMENTS + ['有退货'])
+
+    timeline = pd.DataFrame({
+        col: plans[col].to_numpy()
+        for col in ['计划编号', '物料编号', '物料名称', '架次'] + GROUP_DIMENSIONS
+        if col in plans.columns
+    })
+
+    start_col = STAGES[0][2]
+    if start_col in plans.columns:
+        start = pd.to_datetime(plans[start_col], errors='coerce').to_numpy(dtype='datetime64[ns]')
+    else:
+        start = np.full(len(plans), np.datetime64('NaT'), dtype='datetime64[ns]')
+    timeline[STAGE_NODES[0]] = start
+    anchor = np.where(np.isnat(start), _EARLIEST, start.view('i8'))
+
+    plan_keys = KeyIndex(plans)
+    for node, dataset_name, date_col in STAGES[1:]:
+        linked = _link_next_stage(plan_keys, anchor, datasets.get(dataset_name, pd.DataFrame()), date_col)
+        timeline[node] = linked
+        found = ~np.isnat(linked)
+        anchor = np.where(found, linked.view('i8'), anchor)
+
+    for segment, start_node, end_node in zip(SEGMENTS, STAGE_NODES[:-1], STAGE_NODES[1:]):
+        timeline[segment] = compute_days_gap(timeline[start_node], timeline[end_node])
+
+    returns = datasets.get('returned_materials', pd.DataFrame())
+    if not returns.empty and {'物料编号', '架次'} <= set(returns.columns):
+        return_codes = plan_keys.encode(returns)
+        timeline['有退货'] = np.isin(plan_keys.codes, return_codes[return_codes >= 0])
+    else:
+        timeline['有退货'] = False
+    return timeline
+
+
+def _long_durations(timeline, by=None):
+    """把各环节时长整理为长表（环节, 时长[, 分组]），缺失时长不计入"""
+    parts = []
+    for segment in SEGMENTS:
+        days = timeline[segment].astype('Float64').to_numpy(dtype='float64', na_value=np.nan)
+        valid = ~np.isnan(days)
+        part = {'环节': np.full(valid.sum(), segment, dtype=object), '时长': days[valid]}
+        if by is not None:
+            part[by] = timeline[by].to_numpy()[valid]
+        parts.append(pd.DataFrame(part))
+    long = pd.concat(parts, ignore_index=True)
+    long['环节'] = pd.Categorical(long['环节'], categories=SEGMENTS, ordered=True)
+    return long
+
+
+def stage_percentiles(timeline, by=None, percentiles=PERCENTILES):
+    """各环节时长的样本数、平均值和分位数(天)
+
+    by 为 None 时每个环节一行，否则按 (分组, 环节) 各一行。
+    """
+    keys = ['环节'] if by is None else [by, '环节']
+    columns = ['样本数', '平均'] + [f'P{p}' for p in percentiles]
+    if timeline.empty or (by is not None and by not in timeline.columns):
+        return pd.DataFrame(columns=keys + columns)
+
+    long = _long_durations(timeline, by)
+    if long.empty:
+        return pd.DataFrame(columns=keys + columns)
+    grouped = long.groupby(keys, observed=True, sort=True)['时长']
+    stats = grouped.agg(样本数='size', 平均='mean')
+    quantiles = grouped.quantile([p / 100 for p in percentiles]).unstack()
+    quantiles.columns = [f'P{p}' for p in percentiles]
+    stats = stats.join(quantiles).reset_index()
+    stats['平均'] = stats['平均'].round(1)
+    return stats[keys + columns]
+
+
+def bottleneck_stages(stats, by=None, metric='P50'):
+    """瓶颈环节：按 metric（默认中位时长）最长的环节
+
+    by 为 None 时返回整体瓶颈 (环节, 时长)；否则返回每个分组一行的瓶颈表。
+    """
+    if stats.empty:
+        return (None, np.nan) if by is None else pd.DataFrame(columns=[by, '瓶颈环节', metric])
+    if by is None:
+        row = stats.loc[stats[metric].idxmax()]
+        return row['环节'], row[metric]
+    rows = stats.loc[stats.groupby(by, observed=True)[metric].idxmax()]
+    return rows[[by, '环节', metric]].rename(columns={'环节': '瓶颈环节'}).reset_index(drop=True)
+
+
+def return_rates(timeline, by):
+    """按分组统计有退货的计划行占比(%)"""
+    if timeline.empty or by not in timeline.columns:
+        return pd.Series(dtype='float64', name='退货率')
+    rates = timeline.groupby(by, observed=True, sort=True)['有退货'].mean() * 100
+    return rates.round(2).rename('退货率')
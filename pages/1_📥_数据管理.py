@@ -0,0 +1,460 @@
+# -*- coding: utf-8 -*-
+"""
+供应链物料时间差距分析工具 - 数据管理页面：文件上传、手动录入、架次管理、本地数据库、内存占用
+"""
+
+import time
+
+import streamlit as st
+import pandas as pd
+import plotly.express as px
+
+from chart_data import MAX_BARS
+from core import (
+    CACHE_LABELS, append_to_dataset, get_analysis_dataset, get_dataset, get_effectivity_index, get_registry,
+    get_store, page_footer, page_setup, pending_count, replace_dataset, restore_datasets, show_chart
+)
+from diagnostics import current_rss
+from effectivity import sort_batches
+from ingest import STATUS_FAILED, ingest_files
+from schema import DATASET_LABELS, DATASET_SCHEMAS, UPSERT_KEYS, validate_rows
+
+
+def handle_uploads(uploaded_files, dataset_name, record_label):
+    """处理同一数据集的多个上传文件：并行解析、统一列结构后一次拼接写入数据集
+
+    替换模式下当前文件列表整体替换数据集；追加模式下只导入新加入列表的文件，
+    编号已存在的采购计划/到货记录按更新处理。
+    同一组文件只在首次出现时解析，之后的重新运行直接复用。
+    """
+    id_columns = UPSERT_KEYS.get(dataset_name)
+    mode = st.radio(
+        "导入方式", ["替换现有数据", "追加到现有数据"], horizontal=True, key=f'{dataset_name}_upload_mode',
+        help=f"追加时{'、'.join(id_columns)}都相同的已有记录按更新处理，只重算受影响的物料和架次" if id_columns else None
+    )
+    key_slot = f'{dataset_name}_upload_key'
+    imported_slot = f'{dataset_name}_imported_files'
+    file_keys = [(f.file_id, f.name, f.size) for f in uploaded_files]
+    imported = st.session_state.setdefault(imported_slot, set())
+    if mode == "追加到现有数据":
+        new_files = [(f, file_key) for f, file_key in zip(uploaded_files, file_keys) if file_key not in imported]
+    elif st.session_state.get(key_slot) != file_keys:
+        new_files = list(zip(uploaded_files, file_keys))
+    else:
+        new_files = []
+    
+    try:
+        if new_files:
+            progress = st.progress(0.0, text=f"正在并行解析 {len(new_files)} 个文件...")
+            started = time.perf_counter()
+            df, status = ingest_files(
+                [(f.name, f.getvalue()) for f, _ in new_files],
+                dataset_name,
+                progress_callback=lambda done, total: progress.progress(
+                    done / total,
+                    text=f"已完成 {int(done)}/{total} 个文件" if total > 1 else f"正在读取 {done:.0%}"
+                )
+            )
+            progress.empty()
+            st.session_state[f'{dataset_name}_upload_status'] = (status, time.perf_counter() - started)
+            
+            if not df.empty:
+                # 保存到session state和本地数据库
+                if mode == "追加到现有数据" and not get_dataset(dataset_name).empty:
+                    append_to_dataset(dataset_name, df)
+                else:
+                    replace_dataset(dataset_name, df)
+                st.session_state.data_loaded = True
+            st.session_state[key_slot] = file_keys
+            imported.update(file_key for _, file_key in new_files)
+        
+        upload_status = st.session_state.get(f'{dataset_name}_upload_status')
+        if upload_status is not None:
+            status, elapsed = upload_status
+            failed = status['状态'] == STATUS_FAILED
+            if failed.any():
+                st.error(f"❌ {failed.sum()} 个文件解析失败，详见下表")
+            st.caption(f"本次导入 {len(status)} 个文件，共 {status['行数'].sum():,} 行，总耗时 {elapsed:.1f} 秒")
+            st.dataframe(status, hide_index=True, use_container_width=True)
+        
+        df = get_dataset(dataset_name)
+        
+        # 验证必要的列
+        required_cols = ['物料编号', '架次']
+        missing_cols = [col for col in required_cols if col not in df.columns]
+        
+        if missing_cols:
+            st.warning(f"⚠️ 缺少必要的列: {', '.join(missing_cols)}")
+            st.info("当前文件包含的列:")
+            st.write(list(df.columns))
+        
+        st.success(f"✅ 当前共 {len(df)} 条{record_label}记录")
+        
+        # 显示数据预览
+        st.markdown("**数据预览:**")
+        st.dataframe(df.head(10))
+        
+        # 显示数据统计
+        st.markdown("**数据统计:**")
+        col_a, col_b, col_c = st.columns(3)
+        with col_a:
+            st.metric("总记录数", len(df))
+        with col_b:
+            st.metric("列数", len(df.columns))
+        with col_c:
+            if '架次' in df.columns:
+                st.metric("架次数", df['架次'].nunique())
+            
+    except Exception as e:
+        st.error(f"❌ 上传失败: {str(e)}")
+        st.error(f"错误类型: {type(e).__name__}")
+        
+        # 提供详细的错误信息
+        if "openpyxl" in str(e) or "xlrd" in str(e):
+            st.warning("💡 提示: 请确保已安装openpyxl和xlrd库。运行: pip install openpyxl xlrd")
+        elif "encoding" in str(e).lower():
+            st.warning("💡 提示: 文件编码问题。请确保CSV文件使用UTF-8或GBK编码")
+        
+        # 显示详细错误信息（调试用）
+        with st.expander("查看详细错误信息"):
+            st.code(str(e))
+
+
+def render_bulk_entry(dataset_name, record_label):
+    """批量录入表格：可从Excel直接粘贴多行，整批校验后一次性追加"""
+    st.caption("可直接从Excel复制多行粘贴到表格中，提交时整批校验")
+    editor_slot = f'{dataset_name}_editor_round'
+    editor_round = st.session_state.setdefault(editor_slot, 0)
+    template = pd.DataFrame({col: pd.Series(dtype='object') for col in DATASET_SCHEMAS[dataset_name]})
+    edited = st.data_editor(
+        template,
+        num_rows="dynamic",
+        use_container_width=True,
+        hide_index=True,
+        key=f'{dataset_name}_editor_{editor_round}'
+    )
+    
+    if st.button(f"✅ 校验并提交{record_label}", key=f'{dataset_name}_bulk_submit'):
+        rows, errors = validate_rows(edited, dataset_name)
+        if rows.empty and errors.empty:
+            st.warning("⚠️ 表格中没有数据")
+        elif not errors.empty:
+            st.error(f"❌ 校验未通过，共 {errors['行号'].nunique()} 行有问题，请修改后重新提交")
+            st.dataframe(errors, hide_index=True)
+        else:
+            append_to_dataset(dataset_name, rows)
+            # 只有架次映射时还没有可分析的数据
+            if dataset_name != 'material_batch_mapping':
+                st.session_state.data_loaded = True
+            # 更换表格组件的key以清空已提交的内容
+            st.session_state[editor_slot] = editor_round + 1
+            st.success(f"✅ 已提交 {len(rows)} 条{record_label}（{pending_count(dataset_name)} 条待合并，进入分析页面时自动合并）")
+
+
+page_setup("📥 数据管理")
+
+st.title("📥 数据管理")
+
+tab1, tab2, tab3, tab4, tab5, tab6 = st.tabs(
+    ["📤 数据上传", "✏️ 手动输入", "🗂️ 架次管理", "🗄️ 本地数据库", "💾 内存占用", "🖥️ 共享数据"]
+)
+
+with tab1:
+    st.markdown("### 📤 批量数据上传")
+    st.markdown("上传Excel或CSV文件以导入数据")
+    
+    # 添加文件格式说明
+    with st.expander("📋 查看文件格式要求"):
+        st.markdown("""
+        **采购计划数据应包含以下列:**
+        - 计划编号, 物料编号, 物料名称, 物料类型, 供应商, 架次, 需求数量, 需求日期
+        
+        **到货数据应包含以下列:**
+        - 到货编号, 物料编号, 架次, 已到货数量, 实际到货日期
+        
+        **供应链环节数据（均需包含 物料编号, 架次）:**
+        - 合同签订: 合同编号, 供应商, 合同签订日期
+        - 订单签收: 订单编号, 订单签收日期
+        - 待检: 待检数量, 入检日期
+        - 入库: 库存数量, 入库日期
+        - 交付: 交付数量, 交付日期
+        - 退货: 退货数量, 退货日期, 退货原因
+        
+        **注意事项:**
+        - 支持CSV和Excel(.xlsx/.xls)格式
+        - 文件大小不超过200MB
+        - 日期格式建议: YYYY-MM-DD (例如: 2024-01-01)
+        - CSV文件支持UTF-8和GBK编码，上传时自动识别
+        """)
+    
+    col1, col2 = st.columns(2)
+    
+    with col1:
+        st.markdown("#### 采购计划数据")
+        uploaded_plans = st.file_uploader(
+            "上传采购计划",
+            type=['csv', 'xlsx', 'xls'],
+            accept_multiple_files=True,
+            key='plans_upload',
+            help="支持CSV和Excel格式，可一次选择多个文件（如按月导出的文件），最大200MB"
+        )
+        
+        if uploaded_plans:
+            handle_uploads(uploaded_plans, 'procurement_plans', '采购计划')
+
+    with col2:
+        st.markdown("#### 到货数据")
+        uploaded_deliveries = st.file_uploader(
+            "上传到货数据",
+            type=['csv', 'xlsx', 'xls'],
+            accept_multiple_files=True,
+            key='deliveries_upload',
+            help="支持CSV和Excel格式，可一次选择多个文件（如按月导出的文件），最大200MB"
+        )
+        
+        if uploaded_deliveries:
+            handle_uploads(uploaded_deliveries, 'deliveries', '到货')
+    
+    st.markdown("#### 供应链环节数据")
+    stage_datasets = {
+        DATASET_LABELS[name]: name
+        for name in ['contracts', 'orders', 'inspection_queue', 'inventory', 'delivered_materials', 'returned_materials']
+    }
+    stage_dataset = stage_datasets[st.selectbox("选择数据集", list(stage_datasets), help="用于【供应链环节分析】页面")]
+    uploaded_stage = st.file_uploader(
+        f"上传{DATASET_LABELS[stage_dataset]}数据",
+        type=['csv', 'xlsx', 'xls'],
+        accept_multiple_files=True,
+        key=f'{stage_dataset}_upload',
+        help="支持CSV和Excel格式，可一次选择多个文件，最大200MB"
+    )
+    
+    if uploaded_stage:
+        handle_uploads(uploaded_stage, stage_dataset, DATASET_LABELS[stage_dataset])
+
+with tab2:
+    st.markdown("### ✏️ 手动输入数据")
+    
+    input_type = st.selectbox("选择输入类型", ["采购计划", "到货记录"])
+    entry_mode = st.radio("录入方式", ["逐条录入", "批量录入（表格粘贴）"], horizontal=True)
+    
+    if entry_mode == "批量录入（表格粘贴）":
+        dataset_name = 'procurement_plans' if input_type == "采购计划" else 'deliveries'
+        render_bulk_entry(dataset_name, input_type)
+    
+    elif input_type == "采购计划":
+        with st.form("plan_form"):
+            col1, col2 = st.columns(2)
+            with col1:
+                plan_id = st.text_input("计划编号")
+                material_id = st.text_input("物料编号")
+                material_name = st.text_input("物料名称")
+                material_type = st.text_input("物料类型")
+            with col2:
+                supplier = st.text_input("供应商")
+                batch = st.text_input("架次")
+                quantity = st.number_input("需求数量", min_value=0, value=0)
+                demand_date = st.date_input("需求日期")
+            
+            submitted = st.form_submit_button("➕ 添加采购计划")
+            if submitted:
+                new_plan = pd.DataFrame({
+                    '计划编号': [plan_id],
+                    '物料编号': [material_id],
+                    '物料名称': [material_name],
+                    '物料类型': [material_type],
+                    '供应商': [supplier],
+                    '架次': [batch],
+                    '需求数量': [quantity],
+                    '需求日期': [pd.to_datetime(demand_date)]
+                })
+                append_to_dataset('procurement_plans', new_plan)
+                st.session_state.data_loaded = True
+                st.success(f"✅ 采购计划已添加！（{pending_count('procurement_plans')} 条待合并，进入分析页面时自动合并）")
+    
+    else:  # 到货记录
+        with st.form("delivery_form"):
+            col1, col2 = st.columns(2)
+            with col1:
+                delivery_id = st.text_input("到货编号")
+                material_id = st.text_input("物料编号")
+                batch = st.text_input("架次")
+            with col2:
+                delivered_qty = st.number_input("已到货数量", min_value=0, value=0)
+                delivery_date = st.date_input("实际到货日期")
+            
+            submitted = st.form_submit_button("➕ 添加到货记录")
+            if submitted:
+                new_delivery = pd.DataFrame({
+                    '到货编号': [delivery_id],
+                    '物料编号': [material_id],
+                    '架次': [batch],
+                    '已到货数量': [delivered_qty],
+                    '实际到货日期': [pd.to_datetime(delivery_date)]
+                })
+                append_to_dataset('deliveries', new_delivery)
+                st.session_state.data_loaded = True
+                st.success(f"✅ 到货记录已添加！（{pending_count('deliveries')} 条待合并，进入分析页面时自动合并）")
+
+with tab3:
+    st.markdown("### 🗂️ 架次管理")
+    st.markdown("管理物料有效起始架次信息")
+    mapping_entry_mode = st.radio(
+        "录入方式", ["逐条录入", "批量录入（表格粘贴）"], horizontal=True, key='mapping_entry_mode'
+    )
+    
+    if mapping_entry_mode == "批量录入（表格粘贴）":
+        render_bulk_entry('material_batch_mapping', "架次映射")
+    else:
+        with st.form("batch_form"):
+            col1, col2 = st.columns(2)
+            with col1:
+                material_id = st.text_input("物料编号")
+                material_name = st.text_input("物料名称")
+            with col2:
+                start_batch = st.text_input("有效起始架次")
+                end_batch = st.text_input("有效结束架次（可选）")
+            
+            submitted = st.form_submit_button("➕ 添加架次映射")
+            if submitted:
+                new_mapping = pd.DataFrame({
+                    '物料编号': [material_id],
+                    '物料名称': [material_name],
+                    '有效起始架次': [start_batch],
+                    '有效结束架次': [end_batch if end_batch else None]
+                })
+                append_to_dataset('material_batch_mapping', new_mapping)
+                st.success("✅ 架次映射已添加！")
+    
+    mapping = get_dataset('material_batch_mapping')
+    if not mapping.empty:
+        st.markdown("#### 当前架次映射")
+        st.dataframe(mapping)
+        
+        effectivity = get_effectivity_index()
+        st.caption(
+            f"有效映射 {effectivity.n_mappings} 条（起始架次无法识别或结束早于起始的记录不参与判定），"
+            "架次号按其中的数字比较，'001'、'B001' 均视为第1架次"
+        )
+        merged_data = get_analysis_dataset()
+        if not merged_data.empty:
+            status_counts = merged_data['有效性'].value_counts(sort=False)
+            st.markdown("#### 采购计划有效性")
+            st.dataframe(status_counts.rename('计划行数').rename_axis('有效性').reset_index(), hide_index=True)
+            
+            batches = pd.Index(merged_data['架次'].dropna().unique())
+            batches = batches[sort_batches(batches)]
+            coverage = pd.DataFrame({'架次': batches.astype(str), '有效物料数': effectivity.effective_counts(batches)})
+            fig = px.line(coverage, x='架次', y='有效物料数', markers=len(coverage) <= MAX_BARS, title="各架次有效物料数")
+            fig.update_xaxes(type='category')
+            show_chart(fig)
+
+with tab4:
+    st.markdown("### 🗄️ 本地数据库")
+    st.markdown("上传和录入的数据会保存到本地数据库，刷新页面或其他用户打开时自动恢复")
+    
+    store = get_store()
+    counts = store.row_counts()
+    if not counts:
+        st.info("本地数据库暂无数据")
+    else:
+        st.markdown("#### 已保存的数据集")
+        st.dataframe(
+            pd.DataFrame({'数据集': list(counts.keys()), '记录数': list(counts.values())}),
+            hide_index=True
+        )
+        
+        batch_totals = store.batch_totals()
+        if not batch_totals.empty:
+            st.markdown("#### 架次汇总（数据库内计算）")
+            st.dataframe(batch_totals, hide_index=True)
+        
+        st.markdown("#### 按条件加载到当前会话")
+        st.caption("筛选在数据库中执行，只读取符合条件的采购计划及对应的到货记录")
+        with st.form("store_load_form"):
+            selected_suppliers = st.multiselect("供应商", store.distinct_values('procurement_plans', '供应商'))
+            batches = pd.Index([str(b) for b in store.distinct_values('procurement_plans', '架次')])
+            batch_options = [''] + list(batches[sort_batches(batches)])
+            col1, col2 = st.columns(2)
+            with col1:
+                start_batch = st.selectbox("起始架次", batch_options)
+            with col2:
+                end_batch = st.selectbox("结束架次", batch_options)
+            
+            submitted = st.form_submit_button("📥 加载")
+            if submitted:
+                restore_datasets(selected_suppliers, (start_batch, end_batch))
+                st.success(f"✅ 已加载 {len(st.session_state.procurement_plans)} 条采购计划")
+
+with tab5:
+    st.markdown("### 💾 数据集内存占用")
+    st.markdown("数据加载时按列定义转换为紧凑类型：分类列转为category，数量转为最小安全数值类型，日期转为datetime")
+    
+    report = st.session_state.memory_report
+    if not report:
+        st.info("当前会话暂无已加载的数据集")
+    else:
+        memory_table = pd.DataFrame(
+            [(name, len(st.session_state[name]), before / 1024 ** 2, after / 1024 ** 2)
+             for name, (before, after) in report.items()],
+            columns=['数据集', '记录数', '转换前(MB)', '转换后(MB)']
+        )
+        memory_table['节省比例'] = (1 - memory_table['转换后(MB)'] / memory_table['转换前(MB)'].where(memory_table['转换前(MB)'] > 0)).fillna(0)
+        
+        col1, col2 = st.columns(2)
+        with col1:
+            st.metric("转换前合计", f"{memory_table['转换前(MB)'].sum():.2f} MB")
+        with col2:
+            st.metric("转换后合计", f"{memory_table['转换后(MB)'].sum():.2f} MB")
+        
+        st.dataframe(
+            memory_table.style.format({'转换前(MB)': '{:.3f}', '转换后(MB)': '{:.3f}', '节省比例': '{:.1%}'}),
+            hide_index=True
+        )
+        
+        selected_dataset = st.selectbox("查看列类型", list(report.keys()))
+        df = st.session_state[selected_dataset]
+        st.dataframe(
+            pd.DataFrame({
+                '列': df.columns,
+                '类型': [str(dtype) for dtype in df.dtypes],
+                '内存(KB)': df.memory_usage(index=False, deep=True).to_numpy() / 1024
+            }),
+            hide_index=True
+        )
+
+with tab6:
+    st.markdown("### 🖥️ 进程内共享数据")
+    st.markdown("各会话加载的相同数据在进程中只保存一份；手动录入、追加导入会在原数据上生成新版本，不影响其他会话")
+    
+    registry = get_registry()
+    rss, rss_source = current_rss()
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        st.metric("活动会话", registry.session_count())
+    with col2:
+        st.metric("共享数据合计（估算）", f"{registry.total_bytes() / 1024 ** 2:,.1f} MB")
+    with col3:
+        st.metric(
+            "进程内存（峰值）" if rss_source == 'peak' else "进程内存",
+            f"{rss / 1024 ** 2:,.0f} MB" if rss else "N/A"
+        )
+    
+    versions = registry.version_table()
+    if versions.empty:
+        st.info("暂无共享的数据集")
+    else:
+        st.markdown("#### 数据集版本")
+        versions['本会话'] = versions.index.isin(list(st.session_state.dataset_versions.values()))
+        st.dataframe(versions.style.format({'内存(MB)': '{:.2f}'}), hide_index=True)
+    
+    derived = registry.derived_table()
+    if not derived.empty:
+        st.markdown("#### 共享的分析结果")
+        derived['类型'] = derived['类型'].map(CACHE_LABELS).fillna(derived['类型'])
+        st.dataframe(derived.style.format({'内存(MB)': '{:.2f}'}), hide_index=True)
+    
+    if st.button("🧹 释放无会话引用的版本", help="已关闭的会话所引用的版本会在下次有数据写入时自动释放，这里可立即释放"):
+        st.success(f"✅ 已释放约 {registry.release_unused() / 1024 ** 2:,.1f} MB")
+
+page_footer()
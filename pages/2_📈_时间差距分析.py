@@ -0,0 +1,223 @@
+# -*- coding: utf-8 -*-
+"""
+供应链物料时间差距分析工具 - 时间差距分析页面
+"""
+
+import streamlit as st
+import pandas as pd
+import numpy as np
+import plotly.express as px
+
+from chart_data import MAX_BARS, histogram_figure, limit_bars, trend_figure
+from components import paginated_table
+from core import (
+    get_analysis_dataset, get_dataset, get_filter_index, get_gap_sketches, get_kpi_cube, has_data, page_footer,
+    page_setup, show_chart
+)
+from filter_engine import STATUS_ALL, STATUS_OPTIONS
+from kpi_cube import MAX_SERIES, MONTH, PERIOD, PERIOD_LABELS
+from quantile_sketch import PERCENTILES, RELATIVE_ACCURACY, exact_group_percentiles, exact_percentiles
+
+page_setup("📈 时间差距分析")
+
+st.title("📈 物料需求与到货时间差距分析")
+
+if not has_data():
+    st.warning("⚠️ 请先在【数据管理】页面上传或输入数据")
+else:
+    # 获取缓存的分析数据集
+    merged_data = get_analysis_dataset()
+    
+    filter_index = get_filter_index()
+    
+    # 筛选选项
+    st.markdown("### 🔍 筛选条件")
+    col1, col2, col3 = st.columns(3)
+    
+    with col1:
+        filter_type = st.selectbox("筛选类型", STATUS_OPTIONS)
+    with col2:
+        selected_suppliers = st.multiselect("供应商", filter_index.options('供应商'), placeholder="全部")
+    with col3:
+        selected_types = st.multiselect("物料类型", filter_index.options('物料类型'), placeholder="全部")
+    
+    selected_effectivity = []
+    if not get_dataset('material_batch_mapping').empty:
+        selected_effectivity = st.multiselect("有效性", filter_index.options('有效性'), placeholder="全部")
+    
+    date_ranges = {}
+    col1, col2 = st.columns(2)
+    for date_col, column in [('需求日期', col1), ('实际到货日期', col2)]:
+        bounds = filter_index.date_bounds(date_col)
+        with column:
+            if bounds is not None and st.checkbox(f"按{date_col}筛选", key=f'filter_{date_col}'):
+                picked = st.date_input(
+                    f"{date_col}范围",
+                    value=(bounds[0].date(), bounds[1].date()),
+                    key=f'filter_{date_col}_range'
+                )
+                # 只选了起始日期时按单日筛选，清空范围时不筛选
+                if len(picked) == 1:
+                    picked = (picked[0], picked[0])
+                if len(picked) == 2:
+                    date_ranges[date_col] = picked
+    
+    # 应用筛选：各维度掩码按位与，得到行位置，不复制数据表
+    selections = {'供应商': selected_suppliers, '物料类型': selected_types, '有效性': selected_effectivity}
+    positions = filter_index.select(status=filter_type, selections=selections, date_ranges=date_ranges)
+    gaps = filter_index.gaps[positions]
+    
+    # 统计摘要
+    st.markdown("### 📊 统计摘要")
+    stats = filter_index.gap_stats(positions)
+    col1, col2, col3, col4 = st.columns(4)
+    
+    with col1:
+        avg_diff = stats['mean']
+        st.metric("平均时间差距", f"{avg_diff:.1f} 天" if not pd.isna(avg_diff) else "N/A")
+    with col2:
+        max_delay = stats['max']
+        st.metric("最大延迟", f"{max_delay:.0f} 天" if not pd.isna(max_delay) else "N/A")
+    with col3:
+        min_diff = stats['min']
+        st.metric("最早到货", f"{min_diff:.0f} 天" if not pd.isna(min_diff) else "N/A")
+    with col4:
+        st.metric("按时到货率", f"{stats['on_time_rate']:.1f}%")
+    
+    # 延迟分位数：只按维度筛选时由分位数草图合并得到，另有状态/日期筛选时在筛选结果上精确计算
+    sketches = get_gap_sketches()
+    if filter_type == STATUS_ALL and not date_ranges:
+        quantiles = sketches.percentiles(selections).iloc[0]
+    else:
+        quantiles = exact_percentiles(gaps)
+    for column, p in zip(st.columns(len(PERCENTILES)), PERCENTILES):
+        with column:
+            value = quantiles[f'P{p}']
+            st.metric(f"P{p} 时间差距", f"{value:.0f} 天" if not pd.isna(value) else "N/A")
+    
+    # 可视化
+    st.markdown("### 📊 可视化分析")
+    
+    tab1, tab2, tab3, tab4, tab5 = st.tabs(["条形图", "分布图", "趋势图", "KPI趋势", "延迟分位数"])
+    
+    with tab1:
+        # 按物料分组的时间差距条形图
+        if len(positions) > 0 and '物料名称' in filter_index.dimensions():
+            material_gaps = filter_index.group_mean_gap('物料名称', positions).rename('天数差距').reset_index()
+            material_gaps, truncated = limit_bars(material_gaps, '天数差距')
+            if truncated:
+                st.caption(f"物料较多，仅显示平均延迟最大的前 {MAX_BARS} 个物料")
+            fig = px.bar(
+                material_gaps,
+                x='物料名称',
+                y='天数差距',
+                title="各物料平均时间差距",
+                labels={'天数差距': '平均时间差距(天)', '物料名称': '物料'},
+                color='天数差距',
+                color_continuous_scale='RdYlGn_r'
+            )
+            fig.add_hline(y=0, line_dash="dash", line_color="black", annotation_text="按时交付线")
+            show_chart(fig)
+    
+    with tab2:
+        # 时间差距分布直方图
+        if not np.isnan(gaps).all():
+            fig = histogram_figure(gaps, 30, "时间差距分布", '时间差距(天)', '数量')
+            fig.add_vline(x=0, line_dash="dash", line_color="red", annotation_text="按时交付线")
+            show_chart(fig)
+    
+    with tab3:
+        # 时间趋势图
+        demand_dates = merged_data['需求日期'].to_numpy()[positions]
+        if (pd.notna(demand_dates) & ~np.isnan(gaps)).any():
+            fig = trend_figure(demand_dates, gaps, "时间差距趋势", '需求日期', '时间差距(天)')
+            fig.add_hline(y=0, line_dash="dash", line_color="red")
+            show_chart(fig)
+    
+    with tab4:
+        # 从预先汇总的 KPI 立方体重新汇总，不扫描明细行
+        cube = get_kpi_cube()
+        st.caption("按需求日期所在周期统计，只应用供应商、物料类型、有效性筛选")
+        col1, col2, col3 = st.columns(3)
+        with col1:
+            period_label = st.radio("周期", list(PERIOD_LABELS.values()), index=1, horizontal=True)
+            freq = next(freq for freq, label in PERIOD_LABELS.items() if label == period_label)
+        with col2:
+            metric = st.selectbox("指标", ['按时到货率', '平均时间差距'])
+        with col3:
+            groupings = {'合计': None}
+            groupings.update({f"按{dim}": dim for dim in ('供应商', '物料类型') if dim in cube.dimensions})
+            by = groupings[st.radio("分组", list(groupings), horizontal=True)]
+        
+        trend = cube.trend(freq, selections, by=by).reset_index()
+        if by:
+            # 分组取值较多时只画计划行数最多的几条序列
+            top = trend.groupby(by, observed=True)['计划行数'].sum().nlargest(MAX_SERIES).index
+            if trend[by].nunique() > len(top):
+                st.caption(f"{by}较多，仅显示计划行数最多的前 {MAX_SERIES} 个")
+            trend = trend[trend[by].isin(top)]
+        if trend[metric].notna().any():
+            unit = '%' if metric == '按时到货率' else '天'
+            fig = px.line(
+                trend,
+                x=PERIOD,
+                y=metric,
+                color=by,
+                markers=True,
+                title=f"{metric}{PERIOD_LABELS[freq]}趋势",
+                labels={metric: f"{metric}({unit})"},
+                hover_data=['计划行数', '到货行数']
+            )
+            show_chart(fig)
+        
+        if '供应商' in cube.dimensions:
+            st.markdown("#### 供应商记分卡")
+            card = cube.scorecard('供应商', freq=MONTH, selections=selections)
+            latest = card.attrs.get('最近周期')
+            if latest is not None:
+                st.caption(f"最近周期为 {latest:%Y年%m月}，较上期变化为最近周期与上一周期按时到货率之差（百分点）")
+            st.dataframe(
+                card.sort_values('按时到货率'),
+                column_config={
+                    '按时到货率': st.column_config.NumberColumn(format="%.1f%%"),
+                    '平均时间差距': st.column_config.NumberColumn(format="%.1f 天"),
+                    '差距标准差': st.column_config.NumberColumn(format="%.1f 天"),
+                    '最近周期按时到货率': st.column_config.NumberColumn(format="%.1f%%"),
+                    '较上期变化': st.column_config.NumberColumn(format="%+.1f"),
+                },
+                use_container_width=True
+            )
+    
+    with tab5:
+        # 各分组的分位数由草图中所选单元格的计数合并得到，不扫描明细行；
+        # 按物料编号、架次分组且选了筛选条件时草图不区分筛选维度，在筛选后的明细上精确计算
+        st.caption(
+            f"只应用供应商、物料类型、有效性筛选；分位数误差不超过实际值的 {RELATIVE_ACCURACY:.0%}（取整到天），"
+            "差距在 50 天以内时与精确值相同"
+        )
+        groupings = {f"按{dim}": dim for dim in ('供应商', '物料类型', '物料编号', '架次') if dim in sketches.dimensions()}
+        if groupings:
+            by = groupings[st.radio("分组", list(groupings), horizontal=True, key='percentile_group')]
+            if sketches.covers(selections, by):
+                table = sketches.percentiles(selections, by=by)
+            else:
+                rows = filter_index.select(selections=selections)
+                table = exact_group_percentiles(filter_index.gaps[rows], merged_data[by].iloc[rows])
+            table = table.sort_values(f'P{PERCENTILES[-1]}', ascending=False)
+            st.dataframe(
+                table,
+                column_config={f'P{p}': st.column_config.NumberColumn(format="%.0f 天") for p in PERCENTILES},
+                use_container_width=True
+            )
+    
+    # 详细数据表
+    st.markdown("### 📋 详细数据")
+    paginated_table(
+        merged_data,
+        ['物料编号', '物料名称', '供应商', '架次', '需求日期', '实际到货日期', '天数差距', '有效性'],
+        key='gap_detail',
+        download_name="时间差距明细",
+        positions=positions
+    )
+
+page_footer()
@@ -0,0 +1,181 @@
+# -*- coding: utf-8 -*-
+"""
+供应链物料时间差距分析工具 - 架次分析页面
+"""
+
+import streamlit as st
+import numpy as np
+import plotly.express as px
+import plotly.graph_objects as go
+
+from chart_data import MAX_BARS, limit_bars
+from components import paginated_table
+from core import get_analysis_dataset, get_batch_views, has_data, page_footer, page_setup, show_chart
+from diagnostics import timed
+from effectivity import NOT_EFFECTIVE
+
+
+@timed('图表构建')
+def batch_completion_heatmap(batch_summary, columns=50):
+    """全部架次完成率热力图：架次按顺序排成固定列数的网格，架次再多图形大小也有限"""
+    n_batches = len(batch_summary)
+    columns = min(columns, n_batches)
+    rows = -(-n_batches // columns)
+    padding = rows * columns - n_batches
+    
+    completion = np.append(batch_summary['完成率'].to_numpy(dtype='float64'), [np.nan] * padding)
+    labels = np.append(batch_summary.index.astype(str).to_numpy(), [''] * padding)
+    
+    fig = go.Figure(go.Heatmap(
+        z=completion.reshape(rows, columns),
+        text=labels.reshape(rows, columns),
+        hovertemplate="架次 %{text}<br>完成率 %{z:.1f}%<extra></extra>",
+        colorscale='RdYlGn',
+        zmin=0,
+        zmax=100,
+        xgap=1,
+        ygap=1,
+        colorbar={'title': '完成率(%)'}
+    ))
+    fig.update_layout(
+        title="各架次完成率（按架次顺序排列）",
+        height=min(120 + rows * 18, 900),
+        yaxis={'autorange': 'reversed', 'showticklabels': False},
+        xaxis={'showticklabels': False}
+    )
+    return fig
+
+
+page_setup("🎯 架次分析")
+
+st.title("🎯 架次物料完成情况分析")
+
+if not has_data():
+    st.warning("⚠️ 请先在【数据管理】页面上传或输入数据")
+else:
+    # 获取缓存的分析数据集及架次汇总
+    merged_data = get_analysis_dataset()
+    batch_summary, batch_index = get_batch_views()
+    
+    view = st.radio("查看方式", ["单架次详情", "全部架次概览"], horizontal=True)
+    
+    if batch_summary.empty:
+        st.info("暂无架次数据")
+    
+    elif view == "全部架次概览":
+        st.markdown("### 🗺️ 全部架次概览")
+        
+        col1, col2, col3 = st.columns(3)
+        with col1:
+            st.metric("架次总数", f"{len(batch_summary)}")
+        with col2:
+            st.metric("已齐套架次", f"{(batch_summary['完成率'] >= 100).sum()}")
+        with col3:
+            st.metric("含延迟物料的架次", f"{(batch_summary['延迟数'] > 0).sum()}")
+        
+        show_chart(batch_completion_heatmap(batch_summary))
+        
+        st.markdown("#### 架次汇总表")
+        paginated_table(
+            batch_summary.reset_index(),
+            ['架次'] + list(batch_summary.columns),
+            key='batch_overview',
+            download_name="架次汇总"
+        )
+    
+    else:
+        # 架次选择
+        selected_batch = st.selectbox("选择架次", list(batch_summary.index))
+        
+        # 按预建的分组索引直接取出选定架次的行，不再全表扫描
+        batch_data = merged_data.iloc[batch_index[selected_batch]]
+        batch_stats = batch_summary.loc[selected_batch]
+        ineffective = int((batch_data['有效性'] == NOT_EFFECTIVE).sum())
+        if ineffective:
+            st.warning(f"⚠️ 该架次有 {ineffective} 条计划行不在物料有效架次范围内，可在侧边栏勾选【排除非有效计划行】")
+        
+        # 架次概览
+        st.markdown(f"### 📊 架次 {selected_batch} 概览")
+    
+        col1, col2, col3, col4 = st.columns(4)
+    
+        with col1:
+            st.metric("物料种类数", f"{int(batch_stats['物料种类数'])}")
+    
+        with col2:
+            st.metric("总需求数量", f"{batch_stats['总需求数量']:,.0f}")
+    
+        with col3:
+            st.metric("总到货数量", f"{batch_stats['总到货数量']:,.0f}")
+    
+        with col4:
+            overall_completion = batch_stats['完成率']
+            st.metric("整体完成率", f"{overall_completion:.1f}%")
+    
+        # 完成率仪表盘
+        st.markdown("### 🎯 架次完成率仪表盘")
+    
+        fig = go.Figure(go.Indicator(
+            mode="gauge+number+delta",
+            value=overall_completion,
+            domain={'x': [0, 1], 'y': [0, 1]},
+            title={'text': f"架次 {selected_batch} 完成率"},
+            delta={'reference': 100, 'suffix': '%'},
+            gauge={
+                'axis': {'range': [None, 100]},
+                'bar': {'color': "darkblue"},
+                'steps': [
+                    {'range': [0, 50], 'color': "lightcoral"},
+                    {'range': [50, 80], 'color': "lightyellow"},
+                    {'range': [80, 100], 'color': "lightgreen"}
+                ],
+                'threshold': {
+                    'line': {'color': "red", 'width': 4},
+                    'thickness': 0.75,
+                    'value': 95
+                }
+            }
+        ))
+    
+        show_chart(fig)
+    
+        # 物料完成情况详细图表
+        st.markdown("### 📊 各物料完成情况")
+        
+        chart_rows, truncated = limit_bars(batch_data, '完成率', ascending=True)
+        if truncated:
+            st.caption(f"物料较多，仅显示完成率最低的前 {MAX_BARS} 个物料")
+    
+        fig = px.bar(
+            chart_rows,
+            x='物料名称',
+            y=['需求数量', '已到货数量'],
+            title=f"架次 {selected_batch} 各物料需求与到货对比",
+            labels={'value': '数量', '物料名称': '物料'},
+            barmode='group'
+        )
+        show_chart(fig)
+    
+        # 完成率分布
+        fig = px.bar(
+            chart_rows,
+            x='物料名称',
+            y='完成率',
+            title=f"架次 {selected_batch} 各物料完成率",
+            labels={'完成率': '完成率(%)', '物料名称': '物料'},
+            color='完成率',
+            color_continuous_scale='RdYlGn'
+        )
+        fig.add_hline(y=100, line_dash="dash", line_color="green", annotation_text="100%完成线")
+        show_chart(fig)
+    
+        # 详细数据表
+        st.markdown("### 📋 详细物料清单")
+        paginated_table(
+            batch_data,
+            ['物料编号', '物料名称', '供应商', '需求数量', '已到货数量', '完成率', '有效性'],
+            key='batch_detail',
+            download_name=f"架次{selected_batch}物料清单"
+        )
+
+page_footer()
@@ -0,0 +1,86 @@
+# -*- coding: utf-8 -*-
+"""
+供应链物料时间差距分析工具 - 供应链环节分析页面
+"""
+
+import streamlit as st
+import plotly.express as px
+import plotly.graph_objects as go
+
+from components import paginated_table
+from core import get_dataset, get_stage_timeline, has_data, page_footer, page_setup, show_chart
+from lead_time import GROUP_DIMENSIONS, SEGMENTS, STAGES, bottleneck_stages, return_rates, stage_percentiles
+from schema import DATASET_LABELS
+
+page_setup("⚙️ 供应链环节分析")
+
+st.title("⚙️ 供应链各环节时间消耗分析")
+
+st.info("💡 此功能需要完整的供应链数据（采购计划、合同签订、订单签收、到货等）")
+
+if not has_data():
+    st.warning("⚠️ 请先在【数据管理】页面上传或输入数据")
+else:
+    # 获取缓存的环节时间线
+    timeline = get_stage_timeline()
+    missing = [DATASET_LABELS[name] for _, name, _ in STAGES[1:] if get_dataset(name).empty]
+    if missing:
+        st.caption(f"尚未导入: {', '.join(missing)}，相关环节无法计算")
+    
+    overall = stage_percentiles(timeline)
+    bottleneck, bottleneck_days = bottleneck_stages(overall)
+    
+    st.markdown("### 📊 供应链环节时间分析")
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        st.metric("计划行数", f"{len(timeline):,}")
+    with col2:
+        st.metric("瓶颈环节", bottleneck or "N/A",
+                  f"中位 {bottleneck_days:.0f} 天" if bottleneck else None, delta_color="off")
+    with col3:
+        st.metric("退货率", f"{timeline['有退货'].mean() * 100:.1f}%" if len(timeline) else "N/A")
+    
+    if overall.empty:
+        st.info("暂无可计算的环节时长")
+    else:
+        fig = go.Figure([
+            go.Bar(x=overall['环节'], y=overall[col], name=col)
+            for col in ['P50', 'P90', 'P99']
+        ])
+        fig.update_layout(
+            title="各环节耗时分位数", barmode='group',
+            xaxis_title="环节", yaxis_title="耗时(天)"
+        )
+        show_chart(fig)
+        st.dataframe(overall, hide_index=True, use_container_width=True)
+        
+        st.markdown("### 🔍 分组对比")
+        dimension = st.radio("分组维度", [dim for dim in GROUP_DIMENSIONS if dim in timeline.columns], horizontal=True)
+        if dimension:
+            grouped = stage_percentiles(timeline, dimension)
+            metric = st.selectbox("对比指标", ['P50', 'P90', 'P99'])
+            heatmap = grouped.pivot(index=dimension, columns='环节', values=metric)
+            heatmap = heatmap.reindex(columns=[seg for seg in SEGMENTS if seg in heatmap.columns])
+            fig = px.imshow(
+                heatmap, text_auto=True, aspect='auto', color_continuous_scale='RdYlGn_r',
+                labels={'x': '环节', 'y': dimension, 'color': f'{metric}耗时(天)'},
+                title=f"各{dimension}环节耗时（{metric}）"
+            )
+            show_chart(fig)
+            
+            summary = bottleneck_stages(grouped, dimension).set_index(dimension)
+            summary = summary.join(return_rates(timeline, dimension)).reset_index()
+            st.markdown("**各组瓶颈环节**")
+            st.dataframe(summary, hide_index=True, use_container_width=True)
+            with st.expander("查看分组明细"):
+                st.dataframe(grouped, hide_index=True, use_container_width=True)
+    
+    st.markdown("### 📋 环节时间线明细")
+    paginated_table(
+        timeline,
+        [col for col in timeline.columns if col != '有退货'] + ['有退货'],
+        key='stage_detail',
+        download_name="环节时间线"
+    )
+
+page_footer()
@@ -0,0 +1,64 @@
+# -*- coding: utf-8 -*-
+"""
+供应链物料时间差距分析工具 - 报告导出页面
+"""
+
+import os
+
+import streamlit as st
+from datetime import datetime
+
+from core import get_analysis_dataset, get_batch_views, has_data, page_footer, page_setup
+from reports import (
+    DOWNLOAD_MAX_BYTES, REPORT_DIR, REPORT_TYPES, SUMMARY_REPORT, build_report, keep_report, report_size
+)
+
+page_setup("📊 报告导出")
+
+st.title("📊 数据报告导出")
+
+if not has_data():
+    st.warning("⚠️ 请先在【数据管理】页面上传或输入数据")
+else:
+    st.markdown("### 📥 导出选项")
+    
+    export_type = st.selectbox("选择导出类型", REPORT_TYPES)
+    compress = st.checkbox(
+        "zip压缩（适合大数据量的CSV报告）",
+        disabled=export_type == SUMMARY_REPORT,
+        help="综合分析报告为xlsx格式，本身已是压缩文件"
+    )
+    
+    if st.button("📥 生成并下载报告"):
+        # 获取缓存的分析数据集及架次汇总
+        merged_data = get_analysis_dataset()
+        batch_summary, _ = get_batch_views()
+        
+        with st.spinner("正在生成报告..."):
+            report_file, extension, mime = build_report(export_type, merged_data, batch_summary, compress)
+            file_name = f"{export_type}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.{extension}"
+            with report_file:
+                size = report_size(report_file)
+                # 下载按钮会把整个文件放在内存中，超过上限的报告改为保存到本地目录
+                if size <= DOWNLOAD_MAX_BYTES:
+                    report_bytes = report_file.read()
+                else:
+                    report_bytes = None
+                    path = keep_report(report_file, os.path.join(REPORT_DIR, file_name))
+        
+        if report_bytes is not None:
+            st.download_button(
+                label=f"📥 下载{export_type}（{extension}）",
+                data=report_bytes,
+                file_name=file_name,
+                mime=mime
+            )
+            st.success(f"✅ 报告已生成（{size / 1024:,.1f} KB），点击上方按钮下载")
+        else:
+            st.warning(
+                f"⚠️ 报告大小 {size / 1024 / 1024:,.1f} MB，超过页面下载上限 "
+                f"{DOWNLOAD_MAX_BYTES // 1024 // 1024} MB，已保存到本地文件：{path}"
+                + ("" if compress or export_type == SUMMARY_REPORT else "（勾选zip压缩可减小报告大小）")
+            )
+
+page_footer()
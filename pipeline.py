@@ -0,0 +1,173 @@
+# -*- coding: utf-8 -*-
+"""
+供应链物料时间差距分析工具 - 无界面分析接口
+
+不依赖 Streamlit，供页面、命令行和定时任务共用：
+- build_flagged_dataset: 合并计划与到货、计算天数差距并标记有效性
+- summarize: 架次汇总（按架次号数值排序）和供应商汇总
+- run_analysis: 可按供应商或架次范围分区，用进程池并行计算各分区
+分区以(物料编号, 架次)为单位，同一键的计划行和到货记录总在同一分区，
+并行结果与单进程计算完全一致。
+"""
+
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from analysis_engine import KeyIndex, build_analysis_dataset, build_batch_summary, build_supplier_summary
+from diagnostics import stage, timed
+from effectivity import NOT_EFFECTIVE, EffectivityIndex, batch_number, flag_effectivity, sort_batches
+
+# 分区方式
+PARTITION_NONE = 'none'
+PARTITION_SUPPLIER = 'supplier'
+PARTITION_BATCH = 'batch'
+PARTITION_MODES = [PARTITION_NONE, PARTITION_SUPPLIER, PARTITION_BATCH]
+
+# 每个工作进程分到的分区数，分区略多于进程数便于负载均衡
+PARTS_PER_WORKER = 2
+
+
+def build_flagged_dataset(plans, deliveries, effectivity=None):
+    """生成分析数据集并附加有效性列，effectivity 为 None 时视为未配置有效性"""
+    merged_data = build_analysis_dataset(plans, deliveries)
+    with stage('有效性'):
+        merged_data['有效性'] = flag_effectivity(merged_data, effectivity or EffectivityIndex(pd.DataFrame()))
+    return merged_data
+
+
+def exclude_ineffective(merged_data):
+    """去掉不在有效架次内的计划行"""
+    return merged_data[merged_data['有效性'] != NOT_EFFECTIVE].reset_index(drop=True)
+
+
+@timed('汇总')
+def summarize(merged_data):
+    """架次汇总（按架次号数值排序）和供应商汇总"""
+    batch_summary = build_batch_summary(merged_data)
+    batch_summary = batch_summary.iloc[sort_batches(batch_summary.index)]
+    return batch_summary, build_supplier_summary(merged_data)
+
+
+def filter_plans(plans, suppliers=None, batch_range=None):
+    """按供应商列表和架次号范围（两端包含，按数值比较）筛选采购计划"""
+    mask = np.ones(len(plans), dtype=bool)
+    if suppliers:
+        mask &= plans['供应商'].isin(suppliers).to_numpy()
+    if batch_range:
+        numbers = batch_number(plans['架次'])
+        start, end = (batch_number(pd.Series([value], dtype=object))[0] if value else -1 for value in batch_range)
+        if start >= 0:
+            mask &= numbers >= start
+        if end >= 0:
+            mask &= (numbers >= 0) & (numbers <= end)
+    return plans[mask].reset_index(drop=True)
+
+
+def _balanced_groups(sizes, n_parts):
+    """把各组按行数从大到小依次分给当前行数最少的分区，返回每组的分区号"""
+    order = np.argsort(-sizes, kind='stable')
+    loads = np.zeros(n_parts, dtype='int64')
+    assignment = np.empty(len(sizes), dtype='int64')
+    for label in order:
+        part = int(np.argmin(loads))
+        assignment[label] = part
+        loads[part] += sizes[label]
+    return assignment
+
+
+def partition_plans(plans, mode, n_parts):
+    """把采购计划分成至多 n_parts 个分区，返回各分区的行位置数组
+
+    supplier: 按供应商分组后均衡分配（同一键跨供应商时随该键第一条计划行）
+    batch: 按架次号排序后切成行数大致相等的连续架次范围，同一架次不拆开
+    """
+    keys = KeyIndex(plans)
+    if mode == PARTITION_NONE or n_parts <= 1 or keys.n_keys == 0:
+        return [np.arange(len(plans))]
+
+    rows = np.flatnonzero(keys.codes >= 0)
+    key_codes = keys.codes[rows]
+    _, first_rows = np.unique(key_codes, return_index=True)
+    key_rows = np.bincount(key_codes, minlength=keys.n_keys)
+
+    if mode == PARTITION_SUPPLIER:
+        if '供应商' not in plans.columns:
+            raise ValueError("采购计划缺少供应商列，无法按供应商分区")
+        supplier_codes, suppliers = pd.factorize(plans['供应商'].to_numpy()[rows][first_rows])
+        supplier_codes = np.where(supplier_codes < 0, len(suppliers), supplier_codes)
+        sizes = np.bincount(supplier_codes, weights=key_rows, minlength=len(suppliers) + 1).astype('int64')
+        key_parts = _balanced_groups(sizes, n_parts)[supplier_codes]
+    elif mode == PARTITION_BATCH:
+        batch_codes, batches = pd.factorize(plans['架次'].to_numpy()[rows][first_rows])
+        order = sort_batches(batches)
+        rank = np.empty(len(batches), dtype='int64')
+        rank[order] = np.arange(len(batches))
+        sizes = np.bincount(rank[batch_codes], weights=key_rows, minlength=len(batches))
+        # 按各架次累计行数的中点所在位置切分连续的架次范围
+        midpoints = (np.cumsum(sizes) - sizes / 2) / max(sizes.sum(), 1)
+        batch_parts = np.minimum((midpoints * n_parts).astype('int64'), n_parts - 1)
+        key_parts = batch_parts[rank[batch_codes]]
+    else:
+        raise ValueError(f"未知的分区方式: {mode}")
+
+    row_parts = key_parts[key_codes]
+    order = np.argsort(row_parts, kind='stable')
+    splits = np.flatnonzero(np.diff(row_parts[order])) + 1
+    partitions = np.split(rows[order], splits)
+    # 键缺失的计划行无法关联到货，单独作为一个分区
+    missing = np.flatnonzero(keys.codes < 0)
+    if len(missing):
+        partitions.append(missing)
+    return partitions
+
+
+def split_deliveries(plans, deliveries, partitions):
+    """按计划键把到货记录分到各分区，计划中没有的键直接丢弃（左关联本就用不到）"""
+    keys = KeyIndex(plans)
+    key_parts = np.full(keys.n_keys, -1, dtype='int64')
+    for part, positions in enumerate(partitions):
+        codes = keys.codes[positions]
+        key_parts[codes[codes >= 0]] = part
+    delivery_codes = keys.encode(deliveries) if not deliveries.empty else np.array([], dtype='int64')
+    delivery_parts = np.where(delivery_codes >= 0, key_parts[np.maximum(delivery_codes, 0)], -1)
+    return [deliveries.iloc[np.flatnonzero(delivery_parts == part)] for part in range(len(partitions))]
+
+
+def _analyze_partition(task):
+    """工作进程入口：计算一个分区的分析数据集"""
+    plans, deliveries, mapping = task
+    return build_flagged_dataset(plans, deliveries, EffectivityIndex(mapping))
+
+
+def run_analysis(plans, deliveries, mapping=None, partition=PARTITION_NONE, workers=None,
+                 exclude=False):
+    """运行完整分析，返回 {'merged': 分析数据集, 'batch_summary': 架次汇总, 'supplier_summary': 供应商汇总}
+
+    partition 为 supplier/batch 时按分区用进程池并行计算，workers 默认为CPU核数。
+    exclude 为 True 时去掉不在有效架次内的计划行。
+    """
+    mapping = mapping if mapping is not None else pd.DataFrame()
+    workers = workers or os.cpu_count() or 1
+
+    partitions = partition_plans(plans, partition, workers * PARTS_PER_WORKER) if workers > 1 else [None]
+    if len(partitions) <= 1:
+        merged_data = build_flagged_dataset(plans, deliveries, EffectivityIndex(mapping))
+    else:
+        delivery_parts = split_deliveries(plans, deliveries, partitions)
+        tasks = [
+            (plans.iloc[positions], part_deliveries, mapping)
+            for positions, part_deliveries in zip(partitions, delivery_parts)
+        ]
+        with ProcessPoolExecutor(max_workers=min(workers, len(tasks))) as pool:
+            parts = list(pool.map(_analyze_partition, tasks))
+        # 恢复采购计划的原始行顺序
+        order = np.argsort(np.concatenate(partitions), kind='stable')
+        merged_data = pd.concat(parts, ignore_index=True).iloc[order].reset_index(drop=True)
+
+    if exclude:
+        merged_data = exclude_ineffective(merged_data)
+    batch_summary, supplier_summary = summarize(merged_data)
+    return {'merged': merged_data, 'batch_summary': batch_summary, 'supplier_summary': supplier_summary}
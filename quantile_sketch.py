@@ -0,0 +1,233 @@
+# -*- coding: utf-8 -*-
+"""
+供应链物料时间差距分析工具 - 天数差距分位数草图
+
+按组精确计算分位数需要保留并排序每组的全部明细，百万行、几千个分组时每次重新运行都很慢。
+这里为每个分组维护一个对数分桶直方图（DDSketch 的做法）：
+- |差距| 按 γ = (1+α)/(1-α) 的幂次分桶，正负分开，|差距| < 1 天归入零桶；
+  桶的代表值为桶区间的中点（相对意义上），因此任何分位数的相对误差不超过 α
+- 各组只保存 (桶, 计数)，计数可以相加，所选分组的分位数把计数相加后查找，不必回到明细行；
+  追加/更新到货后减去旧贡献、加上新贡献即可
+- 桶的总数固定（|差距| 超过 MAX_MAGNITUDE 天的归入最外侧的桶），内存与行数无关：
+  合计/按筛选维度分组的计数表按 (桶, 供应商, 物料类型, 有效性) 保存，不超过 筛选维度组合数 × 桶数 项；
+  物料编号、架次各一张按 (分组, 桶) 保存的计数表，不超过 组数 × 桶数 项
+- 按物料编号、架次分组且选了筛选条件时，草图无法区分各筛选条件，由 exact_group_percentiles
+  在筛选后的明细上精确计算
+
+误差保证：q 分位数取排序后第 floor(q·(n-1)) 个值（numpy 的 method='lower'），设该值为 x，
+草图的代表值与 x 之差不超过 α·|x|（默认 α = 1%），四舍五入到整天后误差不超过 α·|x| + 0.5 天；
+天数差距为整天时，|x| < 50 天的分位数与精确值相同。
+"""
+
+import numpy as np
+import pandas as pd
+
+from diagnostics import timed
+
+# 相对误差上限
+RELATIVE_ACCURACY = 0.01
+
+# 分桶的底数
+GAMMA = (1 + RELATIVE_ACCURACY) / (1 - RELATIVE_ACCURACY)
+
+# 单独分桶的最大 |差距|（天），超过的归入最外侧的桶
+MAX_MAGNITUDE = 100_000
+
+# 每个符号的桶数：|差距| ∈ (γ^(k-1), γ^k] 为第 k 个桶，k = 0..MAX_KEY
+MAX_KEY = int(np.ceil(np.log(MAX_MAGNITUDE) / np.log(GAMMA)))
+
+# 桶编号 0..2·MAX_KEY+2 按数值从小到大排列：负数桶（|差距| 由大到小）、零桶、正数桶
+ZERO_BUCKET = MAX_KEY + 1
+N_BUCKETS = 2 * MAX_KEY + 3
+
+# 默认统计的分位数
+PERCENTILES = (50, 90, 95, 99)
+
+# 筛选维度：合计计数表按其组合保存，任意筛选都可由草图回答
+FILTER_DIMENSIONS = ('供应商', '物料类型', '有效性')
+
+# 分组维度：不是筛选维度的（物料编号、架次）各保存一张只按 (分组, 桶) 的计数表
+GROUP_DIMENSIONS = ('供应商', '物料类型', '物料编号', '架次')
+
+# 桶编号所在的索引层名称
+BUCKET = '桶'
+
+# 维度取值为空的行归入该标签
+MISSING_LABEL = '（空）'
+
+
+def bucket_of(values):
+    """天数差距所在的桶编号（int16），缺失值为 -1"""
+    values = np.asarray(values, dtype='float64')
+    magnitude = np.abs(values)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        keys = np.ceil(np.log(magnitude) / np.log(GAMMA))
+    keys = np.clip(np.nan_to_num(keys, nan=0.0, neginf=0.0), 0, MAX_KEY).astype('int16')
+    buckets = np.where(values > 0, ZERO_BUCKET + 1 + keys, ZERO_BUCKET - 1 - keys)
+    buckets = np.where(magnitude < 1, ZERO_BUCKET, buckets)
+    return np.where(np.isnan(values), -1, buckets).astype('int16')
+
+
+def bucket_values():
+    """各桶的代表值：γ^k 区间的 2γ^k/(γ+1)，与桶内任意值的相对误差不超过 α"""
+    magnitude = 2 * GAMMA ** np.arange(MAX_KEY + 1) / (GAMMA + 1)
+    return np.concatenate([-magnitude[::-1], [0.0], magnitude])
+
+
+BUCKET_VALUES = bucket_values()
+
+
+def exact_percentiles(values, percentiles=PERCENTILES):
+    """精确分位数（与草图的取值方式相同，method='lower'），用于筛选条件无法用草图回答时和结果校验"""
+    values = np.asarray(values, dtype='float64')
+    values = values[~np.isnan(values)]
+    if values.size == 0:
+        return pd.Series(np.nan, index=[f'P{p}' for p in percentiles])
+    result = np.quantile(values, [p / 100 for p in percentiles], method='lower')
+    return pd.Series(result, index=[f'P{p}' for p in percentiles])
+
+
+def exact_group_percentiles(values, groups, percentiles=PERCENTILES):
+    """按组精确计算分位数（method='lower'），返回与 GapSketches.percentiles 相同结构的数据表
+
+    values 为天数差距数组，groups 为与之逐行对应的分组取值（Series，名称作为索引名）。
+    """
+    values = np.asarray(values, dtype='float64')
+    groups = pd.Series(groups, copy=False)
+    if groups.hasnans:
+        groups = groups.astype(object).fillna(MISSING_LABEL)
+    codes, labels = pd.factorize(groups, sort=True)
+    valid = ~np.isnan(values)
+    codes, values = codes[valid], values[valid]
+    sorted_values = values[np.lexsort([values, codes])]
+
+    sizes = np.bincount(codes, minlength=len(labels))
+    present = sizes > 0
+    starts = (np.cumsum(sizes) - sizes)[present]
+    result = {'样本数': sizes[present]}
+    for p in percentiles:
+        result[f'P{p}'] = sorted_values[starts + np.floor(p / 100 * (sizes[present] - 1)).astype('int64')]
+    return pd.DataFrame(result, index=pd.Index(np.asarray(labels, dtype=object)[present], name=groups.name))
+
+
+def build_counts(df, dimensions, by=None, gap_column='天数差距'):
+    """按 (by, 桶, 各筛选维度) 统计行数，返回以其为索引、按索引排序的计数 Series（只含有到货的行）
+
+    by 为分组维度（None 时不分组）。按索引排序后，任意筛选得到的子集仍按 (by, 桶) 排列，
+    查询时不必重新排序。
+    """
+    names = ([by] if by else []) + [BUCKET] + list(dimensions)
+    buckets = bucket_of(pd.to_numeric(df[gap_column], errors='coerce').astype('float64').to_numpy())
+    arrived = buckets >= 0
+
+    # 各维度和桶编码为整数后按混合进制合成一个组号，用 bincount 一次汇总
+    levels, combined = [], np.zeros(int(arrived.sum()), dtype='int64')
+    for name in names:
+        if name == BUCKET:
+            codes, uniques = buckets[arrived], np.arange(N_BUCKETS, dtype='int16')
+        else:
+            values = df[name].astype(object).fillna(MISSING_LABEL) if df[name].hasnans else df[name]
+            codes, uniques = pd.factorize(values[arrived], use_na_sentinel=False)
+        levels.append(uniques)
+        combined = combined * len(uniques) + codes
+    groups, keys = pd.factorize(combined)
+    counts = np.bincount(groups, minlength=len(keys))
+
+    arrays = []
+    for uniques in reversed(levels):
+        arrays.append(np.asarray(uniques).take(keys % len(uniques)))
+        keys = keys // len(uniques)
+    index = pd.MultiIndex.from_arrays(arrays[::-1], names=names)
+    return pd.Series(counts, index=index, name='行数', dtype='int64').sort_index()
+
+
+def sketch_percentiles(counts, by=None, percentiles=PERCENTILES):
+    """按 by（维度名，None 为全部合并）查找分位数，返回以 by 的取值为索引、列为 样本数 和 P50 等的数据表
+
+    counts 为 build_counts 的结果（或其筛选子集）；by 不是其第一层时先按 (by, 桶) 排序。
+    by 为 None 时只有一行。
+    """
+    index = counts.index
+    values = counts.to_numpy()
+    buckets = index.levels[index.names.index(BUCKET)].to_numpy()[index.codes[index.names.index(BUCKET)]]
+    if by:
+        level = index.names.index(by)
+        groups, labels = index.codes[level], index.levels[level]
+        if level != 0:
+            order = np.argsort(groups.astype('int64') * N_BUCKETS + buckets, kind='stable')
+            groups, buckets, values = groups[order], buckets[order], values[order]
+    else:
+        groups, labels = np.zeros(len(values), dtype='int64'), pd.Index(['合计'])
+
+    # 计数按 (组, 桶) 排列，全表累计计数上按各组的起点偏移查找第 floor(q·(n-1)) 个值
+    sizes = np.bincount(groups, weights=values, minlength=len(labels)).astype('int64')
+    present = sizes > 0 if by else np.ones(1, dtype=bool)
+    cumulative = np.cumsum(values)
+    starts = np.cumsum(sizes) - sizes
+    result = {'样本数': sizes[present]}
+    for p in percentiles:
+        if not len(values):
+            result[f'P{p}'] = np.full(int(present.sum()), np.nan)
+            continue
+        ranks = starts[present] + np.floor(p / 100 * (sizes[present] - 1)).astype('int64')
+        found = np.searchsorted(cumulative, ranks, side='right')
+        result[f'P{p}'] = np.round(BUCKET_VALUES[buckets[found]])
+    return pd.DataFrame(result, index=pd.Index(np.asarray(labels, dtype=object)[present], name=by))
+
+
+class GapSketches:
+    """分析数据集天数差距的分位数草图，每个分组维度一张计数表，只读使用
+
+    不分组的计数表按 (桶, 筛选维度) 保存，用于合计及按筛选维度分组；
+    其他分组维度（物料编号、架次）各一张按 (分组维度, 桶) 保存的计数表，只能回答不带筛选条件的查询。
+    """
+
+    def __init__(self, df, filter_dimensions=FILTER_DIMENSIONS, group_dimensions=GROUP_DIMENSIONS):
+        self.filter_dimensions = [dim for dim in filter_dimensions if dim in df.columns]
+        self.counts = {None: build_counts(df, self.filter_dimensions)}
+        for dim in group_dimensions:
+            if dim in df.columns and dim not in self.filter_dimensions:
+                self.counts[dim] = build_counts(df, [], by=dim)
+
+    def _table_dimensions(self, by):
+        return self.filter_dimensions if by is None else []
+
+    @timed('分位数草图修补')
+    def updated(self, removed, added):
+        """返回应用增量后的新草图：减去 removed 行原来的计数，加上 added 行的计数"""
+        sketches = object.__new__(GapSketches)
+        sketches.filter_dimensions = self.filter_dimensions
+        sketches.counts = {}
+        for by, counts in self.counts.items():
+            parts = [counts, build_counts(added, self._table_dimensions(by), by=by)]
+            if len(removed):
+                parts.append(-build_counts(removed, self._table_dimensions(by), by=by))
+            merged = pd.concat(parts).groupby(level=list(range(counts.index.nlevels)), sort=False).sum()
+            sketches.counts[by] = merged[merged != 0].sort_index()
+        return sketches
+
+    def dimensions(self):
+        """可以分组的维度"""
+        return self.filter_dimensions + [dim for dim in self.counts if dim is not None]
+
+    def covers(self, selections=None, by=None):
+        """草图能否回答该查询：按物料编号、架次分组时不能带筛选条件"""
+        active = any(selected for dim, selected in (selections or {}).items() if dim in self.filter_dimensions)
+        return by is None or by not in self.counts or not active
+
+    def percentiles(self, selections=None, by=None, percentiles=PERCENTILES):
+        """所选分组合并后的分位数；by 为维度名时按该维度的取值分别统计
+
+        selections 为 {筛选维度: 选中值列表}。返回列为 样本数、P50 等的数据表，by 为 None 时只有一行。
+        covers() 为 False 的查询抛出 ValueError，应改用 exact_group_percentiles。
+        """
+        if not self.covers(selections, by):
+            raise ValueError(f"按{by}分组的草图不含筛选维度，无法按筛选条件查询")
+        counts = self.counts[by if by in self.counts else None]
+        index = counts.index
+        mask = np.ones(len(counts), dtype=bool)
+        for dim, selected in (selections or {}).items():
+            if selected and dim in self.filter_dimensions:
+                level = index.names.index(dim)
+                mask &= np.isin(index.codes[level], index.levels[level].get_indexer(selected))
+        return sketch_percentiles(counts[mask] if not mask.all() else counts, by=by, percentiles=percentiles)
@@ -0,0 +1,223 @@
+# -*- coding: utf-8 -*-
+"""
+供应链物料时间差距分析工具 - 报告生成
+
+按导出类型生成报告，输出分块写入临时文件（小报告留在内存，超过阈值自动落盘），
+导出百万行报告时不会在内存中再拼出一份完整的CSV文本：
+- 时间差距分析报告：逐行明细CSV，按天数差距从大到小排列
+- 架次完成情况报告：每个架次一行的汇总CSV
+- 综合分析报告：多工作表xlsx（汇总、架次汇总、供应商汇总）
+CSV报告可选zip压缩，压缩同样是边写边压。
+页面下载要把报告整体读入内存，超过上限的报告改为复制到本地目录。
+"""
+
+import io
+import os
+import shutil
+import tempfile
+import zipfile
+
+import numpy as np
+import pandas as pd
+
+from analysis_engine import build_supplier_summary
+from diagnostics import timed
+
+GAP_REPORT = "时间差距分析报告"
+BATCH_REPORT = "架次完成情况报告"
+SUMMARY_REPORT = "综合分析报告"
+REPORT_TYPES = [GAP_REPORT, BATCH_REPORT, SUMMARY_REPORT]
+
+# 时间差距分析报告的明细列
+GAP_REPORT_COLUMNS = [
+    '计划编号', '物料编号', '物料名称', '物料类型', '供应商', '架次',
+    '需求数量', '需求日期', '已到货数量', '到货批次数', '首次到货日期', '最后到货日期',
+    '齐套日期', '实际到货日期', '天数差距', '完成率', '有效性',
+]
+
+# 每次写出的行数
+CHUNK_ROWS = 50_000
+
+# 临时文件留在内存中的上限，超过后转存到磁盘
+SPOOL_MAX_BYTES = 32 * 1024 * 1024
+
+# 页面下载的报告大小上限：Streamlit 的下载按钮要求整个文件内容放在内存中，
+# 超过上限的报告改为分块复制到本地目录，不再读回内存
+DOWNLOAD_MAX_BYTES = 64 * 1024 * 1024
+
+# 超过下载上限的报告保存目录
+REPORT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'reports')
+
+# 复制临时文件时每次读写的字节数
+COPY_CHUNK_BYTES = 1024 * 1024
+
+CSV_MIME = "text/csv"
+XLSX_MIME = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+ZIP_MIME = "application/zip"
+
+
+def write_csv_chunks(df, out, columns=None, order=None, chunk_rows=CHUNK_ROWS):
+    """把数据表分块写为CSV（UTF-8 BOM，Excel可直接打开）
+
+    out 为二进制流；order 为输出的行位置顺序（默认原顺序）。每次只复制一个分块。
+    """
+    columns = [col for col in (columns or df.columns) if col in df.columns]
+    positions = [df.columns.get_loc(col) for col in columns]
+    n_rows = len(df) if order is None else len(order)
+    text = io.TextIOWrapper(out, encoding='utf-8-sig', newline='')
+    try:
+        # 空表也写出表头
+        for start in range(0, max(n_rows, 1), chunk_rows):
+            rows = slice(start, start + chunk_rows) if order is None else order[start:start + chunk_rows]
+            df.iloc[rows, positions].to_csv(text, index=False, header=start == 0)
+        text.flush()
+    finally:
+        # 交还底层流，避免关闭包装器时连带关闭输出文件
+        text.detach()
+
+
+def _sheet_rows(df, chunk_rows=CHUNK_ROWS):
+    """按块把数据表转换为可写入工作表的行，缺失值写为空单元格"""
+    for start in range(0, len(df), chunk_rows):
+        chunk = df.iloc[start:start + chunk_rows].astype(object)
+        chunk = chunk.where(chunk.notna(), None)
+        yield from chunk.itertuples(index=False, name=None)
+
+
+def _append_frame(workbook, title, df):
+    sheet = workbook.create_sheet(title)
+    sheet.append([str(col) for col in df.columns])
+    for row in _sheet_rows(df):
+        sheet.append(row)
+
+
+def overview_table(merged_data, batch_summary):
+    """综合报告的汇总指标（指标, 数值）"""
+    gaps = merged_data['天数差距'].astype('Float64')
+    total = len(merged_data)
+    required = pd.to_numeric(merged_data['需求数量'], errors='coerce').sum()
+    delivered = merged_data['已到货数量'].sum()
+    mean_gap = gaps.mean()
+    metrics = [
+        ('报告生成时间', pd.Timestamp.now().strftime('%Y-%m-%d %H:%M:%S')),
+        ('计划行数', total),
+        ('物料种类数', merged_data['物料编号'].nunique()),
+        ('架次总数', len(batch_summary)),
+        ('供应商数', merged_data['供应商'].nunique() if '供应商' in merged_data.columns else 0),
+        ('总需求数量', required),
+        ('总到货数量', delivered),
+        ('总完成率(%)', round(delivered / required * 100, 2) if required > 0 else 0),
+        ('平均时间差距(天)', None if pd.isna(mean_gap) else round(float(mean_gap), 2)),
+        ('按时到货率(%)', round(int(gaps.le(0).sum()) / total * 100, 2) if total else 0),
+        ('延迟物料数', int(gaps.gt(0).sum())),
+        ('已齐套架次', int((batch_summary['完成率'] >= 100).sum())),
+    ]
+    return pd.DataFrame(metrics, columns=['指标', '数值'])
+
+
+def write_gap_report(merged_data, out):
+    """时间差距分析报告：按天数差距从大到小排列的明细，无到货日期的排在最后"""
+    gaps = merged_data['天数差距'].astype('Float64').to_numpy(dtype='float64', na_value=np.nan)
+    order = np.argsort(np.where(np.isnan(gaps), np.inf, -gaps), kind='stable')
+    write_csv_chunks(merged_data, out, GAP_REPORT_COLUMNS, order=order)
+
+
+def write_batch_report(batch_summary, out):
+    """架次完成情况报告：每个架次一行"""
+    write_csv_chunks(batch_summary.reset_index(), out)
+
+
+def write_summary_workbook(merged_data, batch_summary, out):
+    """综合分析报告：汇总、架次汇总、供应商汇总三个工作表，以只写模式逐行写出"""
+    # openpyxl 导入较慢，只在导出xlsx时加载
+    from openpyxl import Workbook
+
+    workbook = Workbook(write_only=True)
+    _append_frame(workbook, '汇总', overview_table(merged_data, batch_summary))
+    _append_frame(workbook, '架次汇总', batch_summary.reset_index())
+    _append_frame(workbook, '供应商汇总', build_supplier_summary(merged_data).reset_index())
+    workbook.save(out)
+
+
+def report_extension(report_type, compress=False):
+    """报告文件的扩展名和MIME类型"""
+    if report_type not in REPORT_TYPES:
+        raise ValueError(f"未知的报告类型: {report_type}")
+    if report_type == SUMMARY_REPORT:
+        return 'xlsx', XLSX_MIME
+    return ('zip', ZIP_MIME) if compress else ('csv', CSV_MIME)
+
+
+@timed('报告导出')
+def write_report(report_type, merged_data, batch_summary, output, compress=False):
+    """把指定类型的报告写入二进制流
+
+    xlsx 本身已是压缩格式，compress 只对CSV报告生效。
+    """
+    extension, _ = report_extension(report_type, compress)
+    if extension == 'xlsx':
+        write_summary_workbook(merged_data, batch_summary, output)
+        return
+
+    def write(stream):
+        if report_type == GAP_REPORT:
+            write_gap_report(merged_data, stream)
+        else:
+            write_batch_report(batch_summary, stream)
+
+    if extension == 'zip':
+        with zipfile.ZipFile(output, 'w', compression=zipfile.ZIP_DEFLATED) as archive:
+            with archive.open(f'{report_type}.csv', 'w', force_zip64=True) as member:
+                write(member)
+    else:
+        write(output)
+
+
+def build_report(report_type, merged_data, batch_summary, compress=False):
+    """生成指定类型的报告，返回 (临时文件, 扩展名, MIME类型)
+
+    返回的临时文件已回到开头，调用方读取后负责关闭。
+    """
+    extension, mime = report_extension(report_type, compress)
+    output = tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_BYTES, mode='w+b')
+    try:
+        write_report(report_type, merged_data, batch_summary, output, compress)
+    except Exception:
+        output.close()
+        raise
+    output.seek(0)
+    return output, extension, mime
+
+
+def report_size(report_file):
+    """build_report 返回的临时文件的字节数，读写位置回到开头"""
+    size = report_file.seek(0, os.SEEK_END)
+    report_file.seek(0)
+    return size
+
+
+def _write_file(path, write):
+    """先写 path.partial 再改名，写出中断时不会留下不完整的报告"""
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    partial = f'{path}.partial'
+    try:
+        with open(partial, 'wb') as output:
+            write(output)
+        os.replace(partial, path)
+    finally:
+        if os.path.exists(partial):
+            os.remove(partial)
+    return path
+
+
+def keep_report(report_file, path):
+    """把 build_report 返回的临时文件分块复制到本地文件，返回文件路径"""
+    report_file.seek(0)
+    return _write_file(path, lambda output: shutil.copyfileobj(report_file, output, COPY_CHUNK_BYTES))
+
+
+def save_report(report_type, merged_data, batch_summary, directory, stem=None, compress=False):
+    """把报告写入目录下的文件，先写临时文件再改名，返回文件路径"""
+    extension, _ = report_extension(report_type, compress)
+    path = os.path.join(directory, f'{stem or report_type}.{extension}')
+    return _write_file(path, lambda output: write_report(report_type, merged_data, batch_summary, output, compress))
@@ -0,0 +1,171 @@
+# -*- coding: utf-8 -*-
+"""
+供应链物料时间差距分析工具 - 示例与模拟数据
+
+- create_sample_data 等：页面"加载示例数据"使用的少量固定数据
+- generate_sample_data：按参数生成任意规模的模拟采购计划和到货数据，
+  用于在生产规模下试用页面和做性能基准测试
+"""
+
+import numpy as np
+import pandas as pd
+
+# 模拟数据的物料类型
+MATERIAL_TYPES = ['紧固件', '密封件', '传动件', '电气件', '结构件', '管路件']
+
+# 第一个架次的需求日期，之后每个架次间隔的天数
+FIRST_BATCH_DATE = pd.Timestamp('2024-01-01')
+BATCH_INTERVAL_DAYS = 7
+
+# 尚无到货记录的计划行占比
+UNDELIVERED_RATIO = 0.05
+
+# 分批到货的计划行中最终未到齐的占比
+SHORT_SHIPMENT_RATIO = 1 / 3
+
+# 到货日期偏移的标准差(天)
+DELAY_SPREAD_DAYS = 10
+
+
+def create_sample_data():
+    """创建示例数据"""
+    # 示例采购计划数据
+    sample_plans = pd.DataFrame({
+        '计划编号': ['P001', 'P002', 'P003', 'P004', 'P005'],
+        '物料编号': ['M001', 'M002', 'M003', 'M001', 'M004'],
+        '物料名称': ['螺栓A', '螺母B', '垫片C', '螺栓A', '轴承D'],
+        '物料类型': ['紧固件', '紧固件', '密封件', '紧固件', '传动件'],
+        '供应商': ['供应商A', '供应商B', '供应商A', '供应商C', '供应商B'],
+        '架次': ['001', '001', '002', '002', '003'],
+        '需求数量': [1000, 500, 200, 800, 100],
+        '计划下达日期': pd.to_datetime(['2024-01-01', '2024-01-02', '2024-01-05', '2024-01-08', '2024-01-10']),
+        '需求日期': pd.to_datetime(['2024-02-01', '2024-02-01', '2024-02-15', '2024-02-15', '2024-03-01'])
+    })
+
+    # 示例到货数据
+    sample_deliveries = pd.DataFrame({
+        '到货编号': ['D001', 'D002', 'D003', 'D004', 'D005'],
+        '物料编号': ['M001', 'M002', 'M003', 'M001', 'M004'],
+        '架次': ['001', '001', '002', '002', '003'],
+        '已到货数量': [1000, 500, 200, 600, 80],
+        '实际到货日期': pd.to_datetime(['2024-02-05', '2024-01-28', '2024-02-20', '2024-02-18', '2024-03-05'])
+    })
+
+    return sample_plans, sample_deliveries
+
+
+def create_sample_stage_data(sample_plans, sample_deliveries):
+    """按示例采购计划和到货数据生成其余各环节的示例数据"""
+    keys = sample_plans[['物料编号', '架次']]
+    issued = sample_plans['计划下达日期']
+    arrived = sample_deliveries['实际到货日期']
+    days = lambda values: pd.to_timedelta(values, unit='D')
+    inspected = arrived + days([1, 3, 2, 5, 1])
+    stored = inspected + days([2, 4, 1, 6, 3])
+    return {
+        'contracts': keys.assign(
+            合同编号=['C001', 'C002', 'C003', 'C004', 'C005'],
+            供应商=sample_plans['供应商'],
+            合同签订日期=issued + days([5, 8, 4, 12, 6])
+        ),
+        'orders': keys.assign(
+            订单编号=['O001', 'O002', 'O003', 'O004', 'O005'],
+            订单签收日期=issued + days([9, 11, 10, 15, 9])
+        ),
+        'inspection_queue': keys.assign(待检数量=sample_deliveries['已到货数量'], 入检日期=inspected),
+        'inventory': keys.assign(库存数量=sample_deliveries['已到货数量'], 入库日期=stored),
+        'delivered_materials': keys.assign(
+            交付数量=sample_deliveries['已到货数量'],
+            交付日期=stored + days([3, 2, 7, 4, 2])
+        ),
+        'returned_materials': keys.iloc[[3]].assign(
+            退货数量=[50], 退货日期=stored.iloc[[3]] + days([1]), 退货原因=['尺寸不合格']
+        ),
+    }
+
+
+def create_sample_mapping():
+    """创建示例物料架次映射"""
+    return pd.DataFrame({
+        '物料编号': ['M001', 'M003', 'M004'],
+        '物料名称': ['螺栓A', '垫片C', '轴承D'],
+        '有效起始架次': ['001', '002', '001'],
+        '有效结束架次': ['001', None, '005']
+    })
+
+
+def _labels(prefix, n, width=None):
+    """生成 前缀 + 补零序号 形式的编号，如 M00001"""
+    width = width or max(len(str(n)), 3)
+    return pd.Index(np.arange(1, n + 1)).astype(str).str.zfill(width).map(lambda s: prefix + s)
+
+
+def _row_ids(prefix, n):
+    """逐行编号（计划编号、到货编号），补零规则与 _labels 相同"""
+    return prefix + pd.Series(np.arange(1, n + 1)).astype(str).str.zfill(max(len(str(n)), 3))
+
+
+def generate_sample_data(n_plans=10_000, n_batches=50, n_suppliers=20, partial_ratio=0.3, date_skew=0.0, seed=0):
+    """按参数生成模拟采购计划和到货数据，列与 create_sample_data 相同
+
+    n_plans 条计划行均匀分布在 n_batches 个架次上，每个架次需要同一组物料，
+    每个物料固定由 n_suppliers 个供应商之一供货；(物料编号, 架次) 不重复。
+    partial_ratio: 分批（2~4批）到货的计划行占比，其中约三分之一最终未到齐；
+    date_skew: 到货日期相对需求日期的平均偏移(天)，正数整体延迟，负数整体提前。
+    另有约 5% 的计划行尚无到货记录。相同参数和 seed 生成的数据相同。
+    """
+    rng = np.random.default_rng(seed)
+    n_batches = max(min(n_batches, n_plans), 1)
+    n_materials = max(-(-n_plans // n_batches), 1)
+    rows = np.arange(n_plans)
+    material_codes = rows % n_materials
+    batch_codes = rows // n_materials
+
+    # 物料属性：类型、名称、供应商按物料固定
+    type_codes = rng.integers(0, len(MATERIAL_TYPES), n_materials)
+    materials = _labels('M', n_materials)
+    names = pd.Index(np.asarray(MATERIAL_TYPES, dtype=object)[type_codes]) + '-' + materials.str[1:]
+    suppliers = _labels('供应商', max(n_suppliers, 1))
+    supplier_codes = rng.integers(0, len(suppliers), n_materials)
+
+    batch_dates = FIRST_BATCH_DATE + pd.to_timedelta(np.arange(n_batches) * BATCH_INTERVAL_DAYS, unit='D')
+    demand_dates = batch_dates.to_numpy()[batch_codes] - pd.to_timedelta(rng.integers(0, 30, n_plans), unit='D').to_numpy()
+    issue_dates = demand_dates - pd.to_timedelta(rng.integers(30, 120, n_plans), unit='D').to_numpy()
+    demand = rng.integers(10, 1000, n_plans)
+
+    plans = pd.DataFrame({
+        '计划编号': _row_ids('P', n_plans),
+        '物料编号': pd.Categorical.from_codes(material_codes, categories=materials),
+        '物料名称': pd.Categorical.from_codes(material_codes, categories=names),
+        '物料类型': pd.Categorical.from_codes(type_codes[material_codes], categories=MATERIAL_TYPES),
+        '供应商': pd.Categorical.from_codes(supplier_codes[material_codes], categories=suppliers),
+        '架次': pd.Categorical.from_codes(batch_codes, categories=_labels('', n_batches)),
+        '需求数量': demand,
+        '计划下达日期': issue_dates,
+        '需求日期': demand_dates,
+    })
+
+    # 到货：每个已到货计划行 1 批或分 2~4 批
+    delivered = np.flatnonzero(rng.random(n_plans) >= UNDELIVERED_RATIO)
+    partial = rng.random(len(delivered)) < partial_ratio
+    shipments = np.where(partial, rng.integers(2, 5, len(delivered)), 1)
+    fill = np.where(partial & (rng.random(len(delivered)) < SHORT_SHIPMENT_RATIO), rng.uniform(0.5, 0.95, len(delivered)), 1.0)
+
+    plan_rows = np.repeat(delivered, shipments)
+    group = np.repeat(np.arange(len(delivered)), shipments)
+    # 各批按随机权重分摊，累计量取整后差分，保证到齐的计划行到货总量恰好等于需求数量
+    weights = rng.random(len(plan_rows)) + 0.1
+    cumulative = pd.Series(weights).groupby(group).cumsum().to_numpy() / np.bincount(group, weights=weights)[group]
+    cumulative_qty = np.floor(demand[plan_rows] * fill[group] * cumulative + 1e-9).astype('int64')
+    first = np.r_[True, group[1:] != group[:-1]]
+    quantities = np.where(first, cumulative_qty, cumulative_qty - np.r_[0, cumulative_qty[:-1]])
+
+    delays = np.rint(rng.normal(date_skew, DELAY_SPREAD_DAYS, len(plan_rows))).astype('int64')
+    deliveries = pd.DataFrame({
+        '到货编号': _row_ids('D', len(plan_rows)),
+        '物料编号': pd.Categorical.from_codes(material_codes[plan_rows], dtype=plans['物料编号'].dtype),
+        '架次': pd.Categorical.from_codes(batch_codes[plan_rows], dtype=plans['架次'].dtype),
+        '已到货数量': quantities,
+        '实际到货日期': demand_dates[plan_rows] + pd.to_timedelta(delays, unit='D').to_numpy(),
+    })
+    return plans, deliveries
@@ -0,0 +1,296 @@
+# -*- coding: utf-8 -*-
+"""
+供应链物料时间差距分析工具 - 数据集列定义
+
+列类型说明:
+- key: 关联键（物料编号、架次），按文本读取，保留前导零
+- text: 普通文本（多为唯一编号）
+- category: 取值较少的文本（供应商、物料类型等），加载后转为分类类型
+- quantity: 数量
+- date: 日期
+"""
+
+import numpy as np
+import pandas as pd
+
+from date_parsing import parse_dates
+
+try:
+    import pyarrow  # noqa: F401  仅用于检测Arrow字符串类型支持
+    COMPACT_STRING_DTYPE = 'string[pyarrow]'
+except ImportError:
+    COMPACT_STRING_DTYPE = None
+
+# 键列唯一值占比不超过该比例时转为分类类型，否则使用紧凑字符串
+KEY_CATEGORY_MAX_RATIO = 0.5
+
+# 规范化后记录各日期列无法识别行数的 DataFrame.attrs 键：{列名: 行数}，没有时不设置
+UNPARSED_DATES_ATTR = 'unparsed_dates'
+
+DATASET_SCHEMAS = {
+    'procurement_plans': {
+        '计划编号': 'text',
+        '物料编号': 'key',
+        '物料名称': 'category',
+        '物料类型': 'category',
+        '供应商': 'category',
+        '架次': 'key',
+        '需求数量': 'quantity',
+        '计划下达日期': 'date',
+        '需求日期': 'date',
+    },
+    'deliveries': {
+        '到货编号': 'text',
+        '物料编号': 'key',
+        '架次': 'key',
+        '已到货数量': 'quantity',
+        '实际到货日期': 'date',
+    },
+    'contracts': {
+        '合同编号': 'text',
+        '物料编号': 'key',
+        '架次': 'key',
+        '供应商': 'category',
+        '合同签订日期': 'date',
+    },
+    'orders': {
+        '订单编号': 'text',
+        '物料编号': 'key',
+        '架次': 'key',
+        '订单签收日期': 'date',
+    },
+    'inspection_queue': {
+        '物料编号': 'key',
+        '架次': 'key',
+        '待检数量': 'quantity',
+        '入检日期': 'date',
+    },
+    'inventory': {
+        '物料编号': 'key',
+        '架次': 'key',
+        '库存数量': 'quantity',
+        '入库日期': 'date',
+    },
+    'delivered_materials': {
+        '物料编号': 'key',
+        '架次': 'key',
+        '交付数量': 'quantity',
+        '交付日期': 'date',
+    },
+    'returned_materials': {
+        '物料编号': 'key',
+        '架次': 'key',
+        '退货数量': 'quantity',
+        '退货日期': 'date',
+        '退货原因': 'category',
+    },
+    'material_batch_mapping': {
+        '物料编号': 'key',
+        '物料名称': 'category',
+        '有效起始架次': 'key',
+        '有效结束架次': 'key',
+    },
+}
+
+# 数据集的显示名称
+DATASET_LABELS = {
+    'procurement_plans': '采购计划',
+    'contracts': '合同签订',
+    'orders': '订单签收',
+    'deliveries': '到货',
+    'inspection_queue': '待检',
+    'inventory': '入库',
+    'delivered_materials': '交付',
+    'returned_materials': '退货',
+    'batch_info': '架次信息',
+    'material_batch_mapping': '物料架次映射',
+}
+
+# 录入时必须填写的列
+REQUIRED_COLUMNS = {
+    'procurement_plans': ['物料编号', '架次', '需求数量', '需求日期'],
+    'deliveries': ['物料编号', '架次', '已到货数量', '实际到货日期'],
+    'material_batch_mapping': ['物料编号', '有效起始架次'],
+}
+
+# 按编号更新已有记录的数据集：{数据集: 匹配列}，其他数据集只追加
+# 一张到货单可以包含多个物料，到货按 (到货编号, 物料编号, 架次) 匹配
+UPSERT_KEYS = {
+    'procurement_plans': ('计划编号',),
+    'deliveries': ('到货编号', '物料编号', '架次'),
+}
+
+# 合成匹配键时各列取值之间的分隔符
+MATCH_KEY_SEPARATOR = '\x1f'
+
+
+def csv_dtypes(dataset_name):
+    """读取CSV时使用的显式列类型：数量和日期先按文本读入，再统一转换"""
+    schema = DATASET_SCHEMAS.get(dataset_name, {})
+    return {col: str for col in schema}
+
+
+def _to_key_text(values):
+    """将键列统一为去除首尾空白的文本，缺失值保持为NaN"""
+    if pd.api.types.is_float_dtype(values) and (values.dropna() % 1 == 0).all():
+        # Excel中的纯数字列含空值时会被读成浮点数，先转回整数避免出现'1.0'
+        values = values.astype('Int64')
+    text = values.astype(str).str.strip()
+    return text.where(values.notna())
+
+
+def normalize_frame(df, dataset_name):
+    """按列定义规范化数据：去除列名空白、键去空白、数量转数值、日期转datetime
+
+    日期按抽样推断的格式解析（见 date_parsing），非空但无法识别的行数记录在 df.attrs[UNPARSED_DATES_ATTR]。
+    """
+    df.columns = [str(col).strip() for col in df.columns]
+    schema = DATASET_SCHEMAS.get(dataset_name, {})
+    unparsed = {}
+    for col, kind in schema.items():
+        if col not in df.columns:
+            continue
+        if kind == 'key':
+            df[col] = _to_key_text(df[col])
+        elif kind == 'quantity':
+            df[col] = pd.to_numeric(df[col], errors='coerce')
+        elif kind == 'date':
+            df[col], info = parse_dates(df[col])
+            if info['unparsed']:
+                unparsed[col] = info['unparsed']
+    if unparsed:
+        df.attrs[UNPARSED_DATES_ATTR] = unparsed
+    else:
+        df.attrs.pop(UNPARSED_DATES_ATTR, None)
+    return df
+
+
+def describe_unparsed_dates(df):
+    """无法识别的日期行数说明，如 '日期无法识别: 需求日期 12 行'；没有时返回空字符串"""
+    unparsed = df.attrs.get(UNPARSED_DATES_ATTR)
+    if not unparsed:
+        return ""
+    return "日期无法识别: " + "，".join(f"{col} {count:,} 行" for col, count in unparsed.items())
+
+
+def _is_blank(values):
+    """缺失值或空白文本"""
+    return values.isna() | values.astype(str).str.strip().eq('')
+
+
+def match_keys(df, columns):
+    """按匹配列合成每行的文本键，任一列为空或空白的行为 None（不参与匹配，只追加）
+
+    内存中的数据集（incremental.upsert_frame）与本地数据库（DatasetStore.upsert_rows）按同一键匹配。
+    """
+    if not columns or not set(columns) <= set(df.columns):
+        return pd.Series(None, index=df.index, dtype=object)
+    blank = np.zeros(len(df), dtype=bool)
+    keys = None
+    for col in columns:
+        values = df[col].astype(object)
+        blank |= _is_blank(values).to_numpy()
+        text = values.astype(str).str.strip()
+        keys = text if keys is None else keys + MATCH_KEY_SEPARATOR + text
+    return keys.where(~blank, None)
+
+
+def validate_rows(df, dataset_name):
+    """批量校验录入的数据，整批向量化检查
+
+    返回 (规范化后的数据, 错误明细)。错误明细包含 行号/列/问题 三列，
+    行号从1开始，与录入表格中的行对应。
+    """
+    raw = df.reset_index(drop=True)
+    schema = DATASET_SCHEMAS.get(dataset_name, {})
+    blank = {col: _is_blank(raw[col]) for col in raw.columns}
+
+    # 所有列都为空的行视为未填写，直接忽略
+    if blank:
+        filled = ~pd.concat(blank, axis=1).all(axis=1)
+    else:
+        filled = pd.Series(False, index=raw.index)
+
+    normalized = normalize_frame(raw.copy(), dataset_name)
+
+    problems = []
+    for col in REQUIRED_COLUMNS.get(dataset_name, []):
+        if col not in raw.columns:
+            continue
+        mask = filled & blank[col]
+        problems.append((mask, col, '必填项为空'))
+    for col, kind in schema.items():
+        if col not in raw.columns:
+            continue
+        if kind == 'quantity':
+            problems.append((filled & ~blank[col] & normalized[col].isna(), col, '不是有效数字'))
+            problems.append((filled & (normalized[col] < 0), col, '数量不能为负数'))
+        elif kind == 'date':
+            problems.append((filled & ~blank[col] & normalized[col].isna(), col, '不是有效日期'))
+
+    errors = [
+        pd.DataFrame({'行号': mask.index[mask] + 1, '列': col, '问题': message})
+        for mask, col, message in problems
+        if mask.any()
+    ]
+    if errors:
+        errors = pd.concat(errors, ignore_index=True).sort_values('行号', kind='stable', ignore_index=True)
+    else:
+        errors = pd.DataFrame(columns=['行号', '列', '问题'])
+
+    return normalized[filled.to_numpy()].reset_index(drop=True), errors
+
+
+def _compact_quantity(values):
+    """数量列转为能无损表示的最小数值类型
+
+    无缺失的整数列向下转换为最小整数类型；含缺失值或小数的保持float64，
+    避免float32在大量累加时丢失精度。
+    """
+    values = pd.to_numeric(values, errors='coerce')
+    if values.isna().any() or not pd.api.types.is_numeric_dtype(values):
+        return values
+    if pd.api.types.is_float_dtype(values) and not np.all(np.mod(values.to_numpy(), 1) == 0):
+        return values
+    return pd.to_numeric(values.astype('int64'), downcast='integer')
+
+
+def _compact_text(values):
+    if COMPACT_STRING_DTYPE is None or isinstance(values.dtype, pd.CategoricalDtype):
+        return values
+    return values.astype(COMPACT_STRING_DTYPE)
+
+
+def compact_frame(df, dataset_name):
+    """按列定义把数据集转换为紧凑类型
+
+    分类列转为category；键列取值较少时转为category，否则转为Arrow字符串；
+    数量列转为最小安全数值类型；日期列转为datetime64。未声明的列保持不变。
+    """
+    schema = DATASET_SCHEMAS.get(dataset_name, {})
+    if not schema or df.empty:
+        return df
+    df = df.copy()
+    for col, kind in schema.items():
+        if col not in df.columns:
+            continue
+        values = df[col]
+        if kind == 'category':
+            df[col] = values.astype('category')
+        elif kind == 'key':
+            if values.nunique(dropna=True) <= KEY_CATEGORY_MAX_RATIO * len(values):
+                df[col] = values.astype('category')
+            else:
+                df[col] = _compact_text(values)
+        elif kind == 'text':
+            df[col] = _compact_text(values)
+        elif kind == 'quantity':
+            df[col] = _compact_quantity(values)
+        elif kind == 'date' and not pd.api.types.is_datetime64_any_dtype(values):
+            df[col] = parse_dates(values)[0]
+    return df
+
+
+def frame_memory(df):
+    """数据表实际占用的内存字节数（含字符串对象本身）"""
+    return int(df.memory_usage(index=True, deep=True).sum())
@@ -0,0 +1,59 @@
+# -*- coding: utf-8 -*-
+"""天数差距、到货汇总与计划关联"""
+
+import numpy as np
+import pandas as pd
+
+from analysis_engine import build_analysis_dataset, compute_days_gap, rollup_deliveries
+
+
+def test_days_gap_floors_like_timedelta_days_and_keeps_missing():
+    demand = pd.Series(pd.to_datetime(['2024-01-10 00:00', '2024-01-10 00:00', None, '2024-01-10 12:00']))
+    delivery = pd.Series(pd.to_datetime(['2024-01-12', '2024-01-08', '2024-01-09', '2024-01-10']))
+    gaps = pd.Series(compute_days_gap(demand, delivery))
+    assert gaps.dtype == 'Int64'
+    assert gaps.tolist()[:2] == [2, -2]
+    assert pd.isna(gaps[2])
+    # 与逐行计算的 (到货 - 需求).days 一致：-12 小时向下取整为 -1 天
+    assert gaps[3] == (delivery[3] - demand[3]).days == -1
+
+
+def _plans():
+    return pd.DataFrame({
+        '计划编号': ['P1', 'P2', 'P3'],
+        '物料编号': ['M1', 'M2', 'M3'],
+        '架次': ['001', '001', '002'],
+        '需求数量': [10, 20, 30],
+        '需求日期': pd.to_datetime(['2024-01-10', '2024-01-10', '2024-01-20']),
+    })
+
+
+def test_rollup_sums_split_deliveries_and_finds_fill_date():
+    deliveries = pd.DataFrame({
+        '物料编号': ['M1', 'M1', 'M2'],
+        '架次': ['001', '001', '001'],
+        '已到货数量': [4, 6, 5],
+        '实际到货日期': pd.to_datetime(['2024-01-12', '2024-01-08', '2024-01-09']),
+    })
+    rollup = rollup_deliveries(deliveries, _plans()).set_index(['物料编号', '架次'])
+    assert rollup.loc[('M1', '001'), '已到货数量'] == 10
+    assert rollup.loc[('M1', '001'), '到货批次数'] == 2
+    assert rollup.loc[('M1', '001'), '齐套日期'] == pd.Timestamp('2024-01-12')
+    assert pd.isna(rollup.loc[('M2', '001'), '齐套日期'])
+
+
+def test_rollup_skips_deliveries_with_blank_keys():
+    # 物料编号为空的行不能被算到其他物料上（曾因 -1 编码回绕到最后一个物料而产生重复键）
+    deliveries = pd.DataFrame({
+        '物料编号': ['M1', 'M3', np.nan, 'M2'],
+        '架次': ['001', '002', '002', np.nan],
+        '已到货数量': [10, 30, 99, 7],
+        '实际到货日期': pd.to_datetime(['2024-01-09', '2024-01-19', '2024-01-19', '2024-01-05']),
+    })
+    rollup = rollup_deliveries(deliveries, _plans())
+    assert not rollup.duplicated(['物料编号', '架次']).any()
+    assert rollup.set_index(['物料编号', '架次'])['已到货数量'].to_dict() == {('M1', '001'): 10, ('M3', '002'): 30}
+
+    merged = build_analysis_dataset(_plans(), deliveries)
+    assert len(merged) == 3
+    assert merged.set_index('计划编号')['已到货数量'].to_dict() == {'P1': 10, 'P2': 0, 'P3': 30}
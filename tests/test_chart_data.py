@@ -0,0 +1,50 @@
+# -*- coding: utf-8 -*-
+"""图表数据的服务端预处理：分箱、趋势聚合、降采样、条形截断"""
+
+import numpy as np
+import pandas as pd
+
+from chart_data import aggregate_trend, histogram_bins, limit_bars, lttb
+
+
+def test_integer_histogram_bins_do_not_split_days():
+    values = pd.Series([-3, -3, 0, 1, 1, 1, 10, np.nan])
+    counts, edges = histogram_bins(values, nbins=5)
+    assert counts.sum() == 7
+    assert np.all(np.diff(edges) == np.diff(edges)[0]) and np.diff(edges)[0] % 1 == 0
+    # 箱边界落在半天处，同一天数只落在一个箱中
+    assert np.all(np.mod(edges, 1) == 0.5)
+    assert histogram_bins(pd.Series([np.nan]), 5)[0].size == 0
+
+
+def test_trend_is_aggregated_when_too_many_points():
+    dates = pd.date_range('2024-01-01', periods=100, freq='h').repeat(3)
+    values = np.arange(len(dates), dtype=float)
+    raw, freq = aggregate_trend(dates, values, max_points=1000)
+    assert freq is None and len(raw) == 300
+
+    daily, freq = aggregate_trend(dates, values, max_points=10)
+    assert freq == 'D'
+    assert daily['count'].sum() == 300
+    first_day = values[:72]
+    assert daily.iloc[0][['mean', 'min', 'max']].tolist() == [first_day.mean(), first_day.min(), first_day.max()]
+
+
+def test_lttb_keeps_endpoints_and_peaks():
+    x = np.arange(1000)
+    y = np.zeros(1000)
+    y[500] = 100
+    selected = lttb(x, y, 50)
+    assert len(selected) == 50
+    assert selected[0] == 0 and selected[-1] == 999
+    assert 500 in selected
+    assert np.all(np.diff(selected) > 0)
+    assert len(lttb(x[:10], y[:10], 50)) == 10
+
+
+def test_limit_bars_keeps_largest():
+    frame = pd.DataFrame({'供应商': list('abcde'), '延迟': [1, 5, np.nan, 3, 4]})
+    kept, truncated = limit_bars(frame, '延迟', max_bars=2)
+    assert truncated and kept['供应商'].tolist() == ['b', 'e']
+    kept, truncated = limit_bars(frame, '延迟', max_bars=10)
+    assert kept is frame and not truncated
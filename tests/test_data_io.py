@@ -0,0 +1,47 @@
+# -*- coding: utf-8 -*-
+"""CSV 分块读取：编码识别、逐块规范化和读取进度"""
+
+import codecs
+import io
+
+import pandas as pd
+
+from data_io import read_csv_chunked, sniff_encoding
+
+
+def _csv(n_rows=250):
+    lines = ['到货编号,物料编号,架次,已到货数量,实际到货日期']
+    lines += [f'D{i}, M{i % 7} ,{i % 3 + 1:03d},{i},2024-01-{i % 28 + 1:02d}' for i in range(n_rows)]
+    return '\n'.join(lines) + '\n'
+
+
+def test_sniff_encoding():
+    assert sniff_encoding(codecs.BOM_UTF8 + '物料'.encode('utf-8')) == 'utf-8-sig'
+    assert sniff_encoding('物料'.encode('utf-8')) == 'utf-8'
+    # 样本截断在多字节字符中间时仍识别为 utf-8
+    assert sniff_encoding('物料'.encode('utf-8')[:-1]) == 'utf-8'
+    assert sniff_encoding('物料'.encode('gbk')) == 'gbk'
+
+
+def test_chunks_are_normalized_and_report_progress():
+    progress = []
+    df = read_csv_chunked(io.BytesIO(_csv().encode('gbk')), 'deliveries', chunksize=100,
+                          progress_callback=progress.append)
+    assert len(df) == 250
+    # 键列去除首尾空白、保持文本；数量转为数值；日期转为 datetime
+    assert df['物料编号'].iloc[1] == 'M1'
+    assert df['架次'].iloc[0] == '001'
+    assert df['已到货数量'].sum() == sum(range(250))
+    assert pd.api.types.is_datetime64_any_dtype(df['实际到货日期'])
+    assert len(progress) == 3
+    assert progress == sorted(progress) and progress[-1] == 1.0
+
+
+def test_gbk_after_ascii_head_is_reread():
+    # 文件头部样本全是 ASCII，GBK 字符出现在样本之后
+    text = 'id,name\n' + ''.join(f'{i},item{i}\n' for i in range(10_000)) + '10000,物料\n'
+    data = text.encode('gbk')
+    assert sniff_encoding(data[:64 * 1024]) == 'utf-8'
+    df = read_csv_chunked(io.BytesIO(data), chunksize=1000)
+    assert len(df) == 10_001
+    assert df['name'].iloc[-1] == '物料'
@@ -0,0 +1,58 @@
+# -*- coding: utf-8 -*-
+"""本地数据库存储：读写和筛选下推"""
+
+import pandas as pd
+
+from data_store import DatasetStore
+from pipeline import filter_plans
+
+
+def _plans():
+    return pd.DataFrame({
+        '计划编号': ['P1', 'P2', 'P3', 'P4', 'P5'],
+        '物料编号': ['M1', 'M1', 'M2', 'M2', 'M3'],
+        '供应商': ['甲', '甲', '乙', '乙', '甲'],
+        '架次': ['2', '10', '3', 'B12', '架次?'],
+        '需求数量': [1, 2, 3, 4, 5],
+    })
+
+
+def test_round_trip_and_supplier_filter(tmp_path):
+    store = DatasetStore(str(tmp_path / 'store.db'))
+    assert not store.has_table('procurement_plans')
+    store.replace_dataset('procurement_plans', _plans().iloc[:3])
+    store.append_rows('procurement_plans', _plans().iloc[3:])
+    assert store.row_counts()['procurement_plans'] == 5
+    assert sorted(store.distinct_values('procurement_plans', '供应商')) == ['乙', '甲']
+
+    loaded = store.load_dataset('procurement_plans')
+    assert loaded['计划编号'].tolist() == ['P1', 'P2', 'P3', 'P4', 'P5']
+    assert loaded['需求数量'].tolist() == [1, 2, 3, 4, 5]
+    assert sorted(store.load_dataset('procurement_plans', suppliers=['乙'])['计划编号']) == ['P3', 'P4']
+
+
+def test_batch_range_compares_batch_numbers(tmp_path):
+    store = DatasetStore(str(tmp_path / 'store.db'))
+    store.replace_dataset('procurement_plans', _plans())
+
+    loaded = store.load_dataset('procurement_plans', batch_range=('2', '10'))
+    assert sorted(loaded['计划编号']) == ['P1', 'P2', 'P3']
+    # 与命令行使用的 pipeline.filter_plans 结果一致
+    for batch_range in [('2', '10'), ('3', ''), ('', '12'), ('B10', 'B12')]:
+        expected = filter_plans(_plans(), batch_range=batch_range)
+        loaded = store.load_dataset('procurement_plans', batch_range=batch_range)
+        assert sorted(loaded['计划编号']) == sorted(expected['计划编号']), batch_range
+
+
+def test_batch_range_applies_to_deliveries_and_totals_sorted(tmp_path):
+    store = DatasetStore(str(tmp_path / 'store.db'))
+    store.replace_dataset('procurement_plans', _plans())
+    store.replace_dataset('deliveries', pd.DataFrame({
+        '到货编号': ['D1', 'D2', 'D3'],
+        '物料编号': ['M1', 'M1', 'M2'],
+        '架次': ['2', '10', 'B12'],
+        '已到货数量': [1, 2, 4],
+    }))
+    loaded = store.load_dataset('deliveries', suppliers=['甲'], batch_range=('1', '9'))
+    assert loaded['到货编号'].tolist() == ['D1']
+    assert store.batch_totals()['架次'].tolist() == ['2', '3', '10', 'B12', '架次?']
@@ -0,0 +1,52 @@
+# -*- coding: utf-8 -*-
+"""数据集登记表：按内容共用版本，会话释放后版本及派生结果一起释放"""
+
+import gc
+
+import pandas as pd
+
+from dataset_registry import DatasetRegistry, SessionHandle, child_version, fingerprint
+
+
+def _frame(quantity=10):
+    return pd.DataFrame({'物料编号': pd.Categorical(['M1', 'M2']), '需求数量': [quantity, 20]})
+
+
+def test_same_content_shares_one_version():
+    registry = DatasetRegistry()
+    first, second = SessionHandle(), SessionHandle()
+    frame = _frame()
+    version = registry.publish(first, 'procurement_plans', frame, alias=('db', 1))
+    assert registry.publish(second, 'procurement_plans', _frame()) == version
+    assert registry.frame(version) is frame
+    assert registry.attach_alias(SessionHandle(), 'procurement_plans', ('db', 1)) == version
+    assert registry.attach_alias(first, 'procurement_plans', ('db', 2)) is None
+    assert fingerprint(_frame(11)) != fingerprint(frame)
+
+
+def test_child_versions_are_deterministic():
+    parent = 'procurement_plans:abc'
+    assert child_version(parent, 'procurement_plans', _frame()) == child_version(parent, 'procurement_plans', _frame())
+    assert child_version(parent, 'procurement_plans', _frame()) != child_version(parent, 'procurement_plans', _frame(11))
+
+
+def test_unreferenced_versions_and_derived_results_are_released():
+    registry = DatasetRegistry()
+    handle = SessionHandle()
+    version = registry.publish(handle, 'procurement_plans', _frame())
+    calls = []
+    build = lambda: calls.append(1) or len(registry.frame(version))
+    assert registry.derived(('rows', version), build) == 2
+    assert registry.derived(('rows', version), build) == 2
+    assert len(calls) == 1
+
+    # 会话改用新版本后，旧版本及其派生结果在下次释放时移除
+    newer = registry.publish(handle, 'procurement_plans', _frame(11))
+    assert registry.release_unused() > 0
+    assert list(registry.version_table().index) == [newer]
+    assert registry.derived_table().empty
+
+    del handle
+    gc.collect()
+    registry.release_unused()
+    assert registry.version_table().empty
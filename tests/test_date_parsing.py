@@ -0,0 +1,86 @@
+# -*- coding: utf-8 -*-
+"""日期列解析：按抽样推断格式、Excel序列号、无法识别的行数"""
+
+from datetime import date, datetime
+
+import numpy as np
+import pandas as pd
+
+from date_parsing import EXCEL_SERIAL, from_excel_serial, infer_formats, parse_dates
+
+
+def _dates(*values):
+    return pd.to_datetime(list(values), format='ISO8601').to_numpy(dtype='datetime64[ns]')
+
+
+def test_formats_are_ranked_by_sample_hits():
+    sample = np.array(['2024年1月5日', '2024年2月6日', '2024-03-07'], dtype=object)
+    assert infer_formats(sample)[:2] == ['%Y年%m月%d日', 'ISO8601']
+    assert infer_formats(np.array(['abc'], dtype=object)) == []
+
+
+def test_text_column_with_one_format():
+    values = pd.Series(['05/01/2024', ' 06/02/2024 ', None, '', '07/03/2024'] * 100, name='需求日期')
+    parsed, info = parse_dates(values)
+    assert info == {'format': '%m/%d/%Y', 'excel_serial': 0, 'fallback': 0, 'ambiguous': 0, 'unparsed': 0}
+    assert parsed.name == '需求日期'
+    assert (parsed.to_numpy()[:5][[0, 1, 4]] == _dates('2024-05-01', '2024-06-02', '2024-07-03')).all()
+    # 空值和空白文本为 NaT，不计为无法识别
+    assert parsed.iloc[2:4].isna().all()
+
+
+def test_iso_dates_with_times_and_unparsed_rows():
+    values = pd.Series([f'2024-01-{day:02d} 08:{minute:02d}:00' for day in range(1, 29) for minute in range(60)]
+                       + ['不是日期', '2024-02-30'])
+    parsed, info = parse_dates(values)
+    assert info['format'] == 'ISO8601'
+    assert info['unparsed'] == 2
+    assert parsed.iloc[0] == pd.Timestamp('2024-01-01 08:00')
+    assert parsed.iloc[-2:].isna().all()
+
+
+def test_excel_serials_in_numeric_and_mixed_columns():
+    assert from_excel_serial([45296, 45296.5, 5, 'x'])[:2].tolist() == _dates('2024-01-05', '2024-01-05 12:00').tolist()
+    assert np.isnat(from_excel_serial([5, 'x'])).all()
+
+    parsed, info = parse_dates(pd.Series([45296.0, np.nan, 3.0]))
+    assert info == {'format': EXCEL_SERIAL, 'excel_serial': 1, 'fallback': 0, 'ambiguous': 0, 'unparsed': 1}
+    assert parsed.iloc[0] == pd.Timestamp('2024-01-05')
+
+    # Excel 中文本、日期单元格和数字单元格混在同一列
+    mixed = pd.Series(['2024-01-05', datetime(2024, 1, 6, 12), date(2024, 1, 7), 45299, '45300', None], dtype=object)
+    parsed, info = parse_dates(mixed)
+    assert parsed.tolist()[:5] == list(pd.to_datetime(['2024-01-05', '2024-01-06 12:00', '2024-01-07',
+                                                       '2024-01-08', '2024-01-09'], format='ISO8601'))
+    assert pd.isna(parsed.iloc[5])
+    assert info['excel_serial'] == 2 and info['unparsed'] == 0
+
+
+def test_other_writings_fall_back_to_later_formats():
+    values = pd.Series(['2024-01-05'] * 50 + ['2024年1月6日', 'Jan 7 2024'])
+    parsed, info = parse_dates(values)
+    assert info['format'] == 'ISO8601'
+    assert parsed.iloc[-2:].tolist() == list(pd.to_datetime(['2024-01-06', '2024-01-07']))
+    assert info['fallback'] == 2 and info['unparsed'] == 0
+
+
+def test_values_in_the_other_day_month_order_are_not_reread():
+    """月在前的列中混入只能按日在前解析的值：置空并计为顺序冲突，不换顺序重读"""
+    values = pd.Series(['05/01/2024'] * 3000 + ['25/01/2024'] + ['06/01/2024'] * 3000)
+    parsed, info = parse_dates(values)
+    assert info['format'] == '%m/%d/%Y'
+    assert info['ambiguous'] == 1 and info['unparsed'] == 1 and info['fallback'] == 0
+    assert parsed.iloc[0] == pd.Timestamp('2024-05-01') and pd.isna(parsed.iloc[3000])
+
+    # 抽样中没有带日、月顺序的写法时，两种顺序都能解析且结果不同的值同样不逐个识别
+    values = pd.Series(['2024-01-05', '05/01/2024', '25/01/2024'] + ['2024-01-05'] * 5000)
+    parsed, info = parse_dates(values)
+    assert info['format'] == 'ISO8601'
+    assert info['ambiguous'] == 1 and info['fallback'] == 1
+    assert pd.isna(parsed.iloc[1]) and parsed.iloc[2] == pd.Timestamp('2024-01-25')
+
+
+def test_datetime_columns_are_returned_unchanged():
+    values = pd.Series(pd.to_datetime(['2024-01-05', None]))
+    parsed, info = parse_dates(values)
+    assert parsed is values and info['unparsed'] == 0
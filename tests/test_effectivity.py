@@ -0,0 +1,48 @@
+# -*- coding: utf-8 -*-
+"""架次号解析与有效性区间判定"""
+
+import pandas as pd
+
+from effectivity import (EFFECTIVE, NOT_EFFECTIVE, UNMAPPED, UNPARSED, EffectivityIndex, batch_number,
+                         sort_batches)
+
+
+def test_batch_numbers_sort_numerically():
+    batches = ['10', '2', 'B3', '架次?', '002']
+    assert list(batch_number(pd.Series(batches))) == [10, 2, 3, -1, 2]
+    # '2' 排在 '10' 之前；数值相同的按文本排序，无法识别的排在最后
+    assert [batches[i] for i in sort_batches(batches)] == ['002', '2', 'B3', '10', '架次?']
+
+
+def test_open_ended_and_overlapping_intervals():
+    mapping = pd.DataFrame({
+        '物料编号': ['M1', 'M1', 'M1', 'M2'],
+        '有效起始架次': ['001', '005', '020', '010'],
+        '有效结束架次': ['006', '008', None, '012'],
+    })
+    index = EffectivityIndex(mapping)
+    assert index.n_mappings == 4
+
+    materials = ['M1', 'M1', 'M1', 'M1', 'M1', 'M2', 'M2', 'M3', 'M1']
+    batches = ['001', '008', '009', '020', '999', '009', '012', '001', '架次?']
+    assert list(index.resolve(materials, batches)) == [
+        EFFECTIVE,        # [1, 6] 与 [5, 8] 合并为 [1, 8]
+        EFFECTIVE,
+        NOT_EFFECTIVE,    # 两个区间之间
+        EFFECTIVE,        # 未填写结束架次，一直有效
+        EFFECTIVE,
+        NOT_EFFECTIVE,
+        EFFECTIVE,
+        UNMAPPED,
+        UNPARSED,
+    ]
+
+
+def test_effective_counts_per_batch():
+    mapping = pd.DataFrame({
+        '物料编号': ['M1', 'M1', 'M2'],
+        '有效起始架次': ['1', '3', '2'],
+        '有效结束架次': ['2', None, '2'],
+    })
+    index = EffectivityIndex(mapping)
+    assert list(index.effective_counts(pd.Series(['1', '2', '3', '10', '?']))) == [1, 2, 1, 1, 0]
@@ -0,0 +1,66 @@
+# -*- coding: utf-8 -*-
+"""解析结果磁盘缓存：按内容命中、损坏文件视为未命中、按最近使用淘汰"""
+
+import os
+
+import pandas as pd
+import pytest
+
+import file_cache
+from file_cache import content_key, evict_cache, load_cached, read_with_cache, store_cached
+
+
+@pytest.fixture(autouse=True)
+def cache_dir(tmp_path, monkeypatch):
+    directory = str(tmp_path / 'parsed')
+    monkeypatch.setattr(file_cache, 'CACHE_DIR', directory)
+    return directory
+
+
+def _frame():
+    return pd.DataFrame({'物料编号': ['M1', 'M2'], '已到货数量': [3, 4],
+                         '实际到货日期': pd.to_datetime(['2024-01-01', '2024-01-02'])})
+
+
+def test_key_depends_on_content_and_dataset():
+    assert content_key(b'a,b', 'deliveries') == content_key(b'a,b', 'deliveries')
+    assert content_key(b'a,b', 'deliveries') != content_key(b'a,c', 'deliveries')
+    assert content_key(b'a,b', 'deliveries') != content_key(b'a,b', 'procurement_plans')
+
+
+def test_read_with_cache_parses_once():
+    calls = []
+
+    def parse():
+        calls.append(1)
+        return _frame()
+
+    first, hit = read_with_cache(b'content', 'deliveries', parse)
+    assert not hit
+    second, hit = read_with_cache(b'content', 'deliveries', parse)
+    assert hit and len(calls) == 1
+    pd.testing.assert_frame_equal(second, first)
+
+
+def test_corrupt_entry_is_a_miss(cache_dir):
+    key = content_key(b'content', 'deliveries')
+    store_cached(key, _frame())
+    [name] = os.listdir(cache_dir)
+    with open(os.path.join(cache_dir, name), 'wb') as f:
+        f.write(b'not a cache file')
+    assert load_cached(key) is None
+    assert os.listdir(cache_dir) == []
+
+
+def test_evict_removes_least_recently_used(cache_dir):
+    keys = [content_key(bytes([i]), 'deliveries') for i in range(3)]
+    for i, key in enumerate(keys):
+        store_cached(key, _frame())
+        path = next(os.path.join(cache_dir, name) for name in os.listdir(cache_dir) if name.startswith(key))
+        os.utime(path, (1_000_000 + i, 1_000_000 + i))
+    # 读取刷新访问时间，第一个变为最近使用
+    assert load_cached(keys[0]) is not None
+    size = max(os.path.getsize(os.path.join(cache_dir, name)) for name in os.listdir(cache_dir))
+    evict_cache(2 * size)
+    assert load_cached(keys[1]) is None
+    assert load_cached(keys[0]) is not None and load_cached(keys[2]) is not None
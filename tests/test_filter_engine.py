@@ -0,0 +1,48 @@
+# -*- coding: utf-8 -*-
+"""筛选索引：按行掩码筛选的结果与直接在数据表上筛选一致"""
+
+import numpy as np
+import pandas as pd
+
+from filter_engine import STATUS_DELAYED, STATUS_ON_TIME, FilterIndex
+
+
+def _frame():
+    return pd.DataFrame({
+        '供应商': ['S1', 'S2', None, 'S1', 'S3'],
+        '物料类型': ['紧固件', '密封件', '紧固件', '密封件', '紧固件'],
+        '物料名称': ['螺栓', '垫片', '螺母', '垫片', '螺栓'],
+        '需求日期': pd.to_datetime(['2024-01-01', '2024-01-05', '2024-01-10', None, '2024-01-31']),
+        '实际到货日期': pd.to_datetime(['2024-01-03', None, '2024-01-09', '2024-01-02', '2024-01-31']),
+        '天数差距': [2.0, np.nan, -1.0, 4.0, 0.0],
+    })
+
+
+def test_select_combines_status_selections_and_dates():
+    index = FilterIndex(_frame())
+    assert index.options('供应商') == ['S1', 'S2', 'S3']
+    assert list(index.select()) == [0, 1, 2, 3, 4]
+    assert list(index.select(status=STATUS_DELAYED)) == [0, 3]
+    assert list(index.select(status=STATUS_ON_TIME)) == [2, 4]
+    assert list(index.select(selections={'供应商': ['S1', '未知'], '物料类型': []})) == [0, 3]
+    # 结束日期包含当天，缺失日期的行不在任何区间内
+    assert list(index.select(date_ranges={'需求日期': ('2024-01-05', '2024-01-31')})) == [1, 2, 4]
+    assert list(index.select(status=STATUS_DELAYED, selections={'物料类型': ['密封件']})) == [3]
+
+
+def test_empty_or_incomplete_date_ranges_are_ignored():
+    """清空日期选择框得到空元组，只选了一端时另一端为空，都不筛选"""
+    index = FilterIndex(_frame())
+    for date_range in [(), None, ('2024-01-05',), ('2024-01-05', None)]:
+        assert list(index.select(date_ranges={'需求日期': date_range})) == [0, 1, 2, 3, 4]
+
+
+def test_gap_stats_and_group_means():
+    index = FilterIndex(_frame())
+    stats = index.gap_stats(index.select(selections={'供应商': ['S1', 'S2']}))
+    assert stats['mean'] == 3.0 and stats['max'] == 4.0 and stats['min'] == 2.0
+    # 按时到货率的分母为全部计划行（含未到货）
+    assert stats['on_time_rate'] == 0.0
+    assert index.gap_stats(index.select(selections={'供应商': ['S2']}))['on_time_rate'] == 0.0
+    means = index.group_mean_gap('物料类型', index.select())
+    assert means.to_dict() == {'密封件': 4.0, '紧固件': 1 / 3}
@@ -0,0 +1,131 @@
+# -*- coding: utf-8 -*-
+"""增量更新：按编号更新/追加后只重算脏键，结果与整表重算一致"""
+
+import numpy as np
+import pandas as pd
+
+from data_store import DatasetStore
+from effectivity import EffectivityIndex
+from incremental import refresh_analysis, upsert_frame
+from pipeline import build_flagged_dataset
+from schema import UPSERT_KEYS
+
+
+def _data(n_materials=12, n_batches=5, seed=1):
+    """每个 (物料, 架次) 一条计划，约 80% 有到货，部分分两批到货"""
+    rng = np.random.default_rng(seed)
+    n_plans = n_materials * n_batches
+    materials = pd.Series([f'M{i:03d}' for i in range(n_materials)] * n_batches)
+    batches = pd.Series(np.repeat([f'{i:03d}' for i in range(1, n_batches + 1)], n_materials))
+    demand_dates = pd.Timestamp('2024-01-01') + pd.to_timedelta(rng.integers(0, 90, n_plans), unit='D')
+    plans = pd.DataFrame({
+        '计划编号': [f'P{i:03d}' for i in range(n_plans)],
+        '物料编号': pd.Categorical(materials),
+        '物料名称': pd.Categorical('名称' + materials.str[1:]),
+        '物料类型': pd.Categorical(np.array(['紧固件', '密封件', '传动件'])[np.arange(n_plans) % 3]),
+        '供应商': pd.Categorical(np.array(['甲', '乙'])[np.arange(n_plans) % n_materials % 2]),
+        '架次': pd.Categorical(batches),
+        '需求数量': rng.integers(10, 100, n_plans),
+        '计划下达日期': demand_dates - pd.Timedelta(days=60),
+        '需求日期': demand_dates,
+    })
+    delivered = np.flatnonzero(rng.random(n_plans) < 0.8)
+    rows = np.concatenate([delivered, delivered[::3]])
+    deliveries = pd.DataFrame({
+        '到货编号': [f'D{i:03d}' for i in range(len(rows))],
+        '物料编号': pd.Categorical(materials.to_numpy()[rows]),
+        '架次': pd.Categorical(batches.to_numpy()[rows]),
+        '已到货数量': plans['需求数量'].to_numpy()[rows] // 2,
+        '实际到货日期': demand_dates[rows] + pd.to_timedelta(rng.integers(-10, 20, len(rows)), unit='D'),
+    })
+    return plans, deliveries
+
+
+def _delta(plans, deliveries):
+    """改一条计划的数量、把一条计划挪到别的架次、追加一条新计划；改两条到货、补一条到货"""
+    undelivered = plans[~plans.set_index(['物料编号', '架次']).index.isin(
+        deliveries.set_index(['物料编号', '架次']).index)].iloc[0]
+    plan_delta = pd.DataFrame({
+        '计划编号': [plans['计划编号'].iloc[3], plans['计划编号'].iloc[7], 'P-NEW'],
+        '物料编号': [plans['物料编号'].iloc[3], plans['物料编号'].iloc[7], 'M-NEW'],
+        '物料名称': [plans['物料名称'].iloc[3], plans['物料名称'].iloc[7], '新物料'],
+        '物料类型': [plans['物料类型'].iloc[3], plans['物料类型'].iloc[7], plans['物料类型'].iloc[0]],
+        '供应商': [plans['供应商'].iloc[3], plans['供应商'].iloc[7], '供应商NEW'],
+        '架次': [plans['架次'].iloc[3], '999', '001'],
+        '需求数量': [1, plans['需求数量'].iloc[7], 5],
+        '计划下达日期': pd.to_datetime(['2024-01-01'] * 3),
+        '需求日期': [plans['需求日期'].iloc[3], plans['需求日期'].iloc[7], pd.Timestamp('2024-03-01')],
+    })
+    delivery_delta = pd.DataFrame({
+        '到货编号': [deliveries['到货编号'].iloc[0], deliveries['到货编号'].iloc[5], 'D-NEW1', 'D-NEW2'],
+        '物料编号': [deliveries['物料编号'].iloc[0], deliveries['物料编号'].iloc[5], undelivered['物料编号'], 'M-NEW'],
+        '架次': [deliveries['架次'].iloc[0], deliveries['架次'].iloc[5], undelivered['架次'], '001'],
+        '已到货数量': [0, 10_000, undelivered['需求数量'], 5],
+        '实际到货日期': pd.to_datetime(['2024-02-01', '2024-02-02', '2024-02-03', '2024-02-20']),
+    })
+    return plan_delta, delivery_delta
+
+
+def _plain(frame):
+    """分类列转为 object：整表重算时两边分类不同的键列关联后会变成 object，只比较取值"""
+    return frame.apply(lambda col: col.astype(object) if isinstance(col.dtype, pd.CategoricalDtype) else col)
+
+
+def test_refresh_after_upsert_matches_full_rebuild():
+    plans, deliveries = _data()
+    mapping = pd.DataFrame({
+        '物料编号': [plans['物料编号'].iloc[3], plans['物料编号'].iloc[7]],
+        '有效起始架次': ['002', '005'],
+        '有效结束架次': ['010', None],
+    })
+    effectivity = EffectivityIndex(mapping)
+    merged_data = build_flagged_dataset(plans, deliveries, effectivity)
+
+    plan_delta, delivery_delta = _delta(plans, deliveries)
+    new_plans, plan_keys = upsert_frame(plans, plan_delta, UPSERT_KEYS['procurement_plans'])
+    new_deliveries, delivery_keys = upsert_frame(deliveries, delivery_delta, UPSERT_KEYS['deliveries'])
+    assert len(new_plans) == len(plans) + 1
+    assert len(new_deliveries) == len(deliveries) + 2
+    assert new_plans['架次'].iloc[7] == '999'
+
+    dirty = pd.concat([plan_keys, delivery_keys], ignore_index=True)
+    refreshed, rows = refresh_analysis(merged_data, new_plans, new_deliveries, dirty, effectivity)
+    assert 0 < len(rows) < len(new_plans)
+
+    expected = build_flagged_dataset(new_plans, new_deliveries, effectivity)
+    pd.testing.assert_frame_equal(_plain(refreshed), _plain(expected))
+
+
+def test_refresh_without_dirty_keys_returns_same_frame():
+    plans, deliveries = _data(seed=2)
+    merged_data = build_flagged_dataset(plans, deliveries)
+    refreshed, rows = refresh_analysis(merged_data, plans, deliveries, None)
+    assert refreshed is merged_data
+    assert np.size(rows) == 0
+
+
+def test_repeated_delivery_number_updates_memory_and_store_alike(tmp_path):
+    """一张到货单含多个物料：按 (到货编号, 物料编号, 架次) 匹配，增量中重复的键取最后一次"""
+    deliveries = pd.DataFrame({
+        '到货编号': ['D100', 'D100', 'D101'],
+        '物料编号': ['M001', 'M002', 'M001'],
+        '架次': ['003', '003', '004'],
+        '已到货数量': [1, 2, 3],
+    })
+    delta = pd.DataFrame({
+        '到货编号': ['D100', 'D100', 'D100', 'D100', 'D102', None],
+        '物料编号': ['M001', 'M002', 'M003', 'M002', 'M001', 'M009'],
+        '架次': ['003', '003', '003', '003', '005', '001'],
+        '已到货数量': [10, 20, 30, 21, 40, 50],
+    })
+    in_memory, _ = upsert_frame(deliveries, delta, UPSERT_KEYS['deliveries'])
+
+    store = DatasetStore(str(tmp_path / 'store.db'))
+    store.replace_dataset('deliveries', deliveries)
+    store.upsert_rows('deliveries', delta, UPSERT_KEYS['deliveries'])
+    stored = store.load_dataset('deliveries')
+
+    assert in_memory['已到货数量'].tolist() == [10, 21, 3, 30, 40, 50]
+    assert stored['已到货数量'].tolist() == in_memory['已到货数量'].tolist()
+    assert stored['物料编号'].tolist() == in_memory['物料编号'].tolist()
+    assert stored['到货编号'].fillna('').tolist() == in_memory['到货编号'].fillna('').tolist()
@@ -0,0 +1,69 @@
+# -*- coding: utf-8 -*-
+"""多文件导入：统一列结构后拼接，逐文件报告状态"""
+
+import functools
+import os
+
+import pandas as pd
+import pytest
+
+import data_io
+import file_cache
+from ingest import STATUS_FAILED, STATUS_OK, ingest_files, reconcile_columns
+
+
+@pytest.fixture(autouse=True)
+def in_process(tmp_path, monkeypatch):
+    # 单核时在当前进程解析，不启动进程池；解析缓存写入临时目录
+    monkeypatch.setattr(os, 'cpu_count', lambda: 1)
+    monkeypatch.setattr(file_cache, 'CACHE_DIR', str(tmp_path / 'parsed'))
+
+
+def _csv(rows, columns):
+    return pd.DataFrame(rows, columns=columns).to_csv(index=False).encode('utf-8')
+
+
+def test_reconcile_columns_puts_schema_columns_first():
+    first = pd.DataFrame({'备注': ['a'], '架次': ['001'], '物料编号': ['M1']})
+    second = pd.DataFrame({'物料编号': ['M2'], '需求数量': [3]})
+    aligned, missing = reconcile_columns([first, second], 'procurement_plans')
+    assert list(aligned[0].columns) == ['物料编号', '架次', '需求数量', '备注']
+    assert list(aligned[1].columns) == list(aligned[0].columns)
+    assert missing == [['需求数量'], ['架次']]
+
+
+def test_ingest_concatenates_files_and_reports_failures():
+    files = [
+        ('一月.csv', _csv([['P1', 'M1', '甲', '001', 10, '2024-01-05']],
+                          ['计划编号', '物料编号', '供应商', '架次', '需求数量', '需求日期'])),
+        ('二月.csv', _csv([['P2', 'M2', '002', 20, '2024-02-05'], ['P3', 'M3', '002', 30, '2024-02-06']],
+                          ['计划编号', '物料编号', '架次', '需求数量', '需求日期'])),
+        ('说明.txt', b'not a table'),
+    ]
+    df, status = ingest_files(files, 'procurement_plans')
+    assert df['计划编号'].tolist() == ['P1', 'P2', 'P3']
+    assert df['供应商'].iloc[0] == '甲' and df['供应商'].iloc[1:].isna().all()
+    assert df['需求数量'].sum() == 60
+    assert status['状态'].tolist() == [STATUS_OK, STATUS_OK, STATUS_FAILED]
+    assert status['行数'].tolist() == [1, 2, 0]
+    assert status['说明'].iloc[1] == '缺少列: 供应商'
+    assert '不支持的文件格式' in status['说明'].iloc[2]
+
+    # 同一文件再次导入时命中解析缓存
+    _, status = ingest_files(files[:1], 'procurement_plans')
+    assert status['解析缓存'].tolist() == ['命中']
+
+
+def test_single_file_reports_per_chunk_progress(monkeypatch):
+    monkeypatch.setattr(data_io, 'read_csv_chunked', functools.partial(data_io.read_csv_chunked, chunksize=5000))
+    rows = [[f'P{i}', f'M{i}', '001', i, '2024-01-05'] for i in range(40_000)]
+    progress = []
+    df, _ = ingest_files([('计划.csv', _csv(rows, ['计划编号', '物料编号', '架次', '需求数量', '需求日期']))],
+                         'procurement_plans', progress_callback=lambda done, total: progress.append((done, total)))
+    assert len(df) == 40_000
+    # 每读完一块报告一次已读取的比例，最后报告文件完成
+    assert len(progress) == 9
+    assert all(total == 1 for _, total in progress)
+    done = [value for value, _ in progress]
+    assert done == sorted(done) and 0 < done[0] < 1
+    assert progress[-1] == (1, 1)
@@ -0,0 +1,63 @@
+# -*- coding: utf-8 -*-
+"""KPI 汇总立方体：合计与明细一致，增量修补与重新构建一致"""
+
+import numpy as np
+import pandas as pd
+
+from kpi_cube import MONTH, PERIOD_LABELS, KpiCube
+from pipeline import build_flagged_dataset
+from sample_data import generate_sample_data
+
+
+def _dataset():
+    plans, deliveries = generate_sample_data(n_plans=800, n_batches=20, n_suppliers=6, seed=3)
+    return build_flagged_dataset(plans, deliveries)
+
+
+def _patched(df):
+    """改写部分行（天数差距、供应商、缺失需求日期）并追加新行，返回 (新数据集, 被改写的原行, 改写及新增的行)"""
+    rows = np.arange(0, len(df), 37)
+    added = df.iloc[rows].copy()
+    added['天数差距'] = np.where(np.arange(len(rows)) % 3 == 0, np.nan, np.arange(len(rows)) - 5.0)
+    added['供应商'] = added['供应商'].astype(object)
+    added.iloc[1, added.columns.get_loc('供应商')] = '新供应商'
+    added.iloc[2, added.columns.get_loc('需求日期')] = pd.NaT
+    new_rows = df.iloc[:4].copy()
+    new_rows['供应商'] = np.nan
+    added = pd.concat([added, new_rows], ignore_index=True)
+
+    patched = df.copy()
+    patched['供应商'] = patched['供应商'].astype(object)
+    patched.iloc[rows] = added.iloc[:len(rows)].to_numpy()
+    patched = pd.concat([patched, added.iloc[len(rows):]], ignore_index=True)
+    return patched, df.iloc[rows], added
+
+
+def _sorted(cells):
+    cells = cells.reset_index()
+    keys = list(cells.columns[:-5])
+    cells[keys[:-1]] = cells[keys[:-1]].astype(object)
+    return cells.sort_values(keys, na_position='first').reset_index(drop=True)
+
+
+def test_totals_match_detail_rows():
+    df = _dataset()
+    totals = KpiCube(df).totals({'供应商': [df['供应商'].iloc[0]]})
+    rows = df[df['供应商'] == df['供应商'].iloc[0]]
+    gaps = rows['天数差距'].dropna()
+    assert totals['计划行数'] == len(rows)
+    assert totals['到货行数'] == len(gaps)
+    assert np.isclose(totals['按时到货率'], (gaps <= 0).sum() / len(rows) * 100)
+    assert np.isclose(totals['平均时间差距'], gaps.mean())
+    assert np.isclose(totals['差距标准差'], gaps.std())
+
+
+def test_updated_cube_matches_fresh_build():
+    df = _dataset()
+    patched, removed, added = _patched(df)
+    updated = KpiCube(df).updated(removed, added)
+    fresh = KpiCube(patched)
+    for freq in PERIOD_LABELS:
+        pd.testing.assert_frame_equal(_sorted(updated.cells[freq]), _sorted(fresh.cells[freq]))
+    pd.testing.assert_series_equal(updated.totals(), fresh.totals())
+    pd.testing.assert_frame_equal(updated.trend(MONTH, by='供应商'), fresh.trend(MONTH, by='供应商'))
@@ -0,0 +1,76 @@
+# -*- coding: utf-8 -*-
+"""供应链环节时长：按键向前匹配各环节记录，统计分位数和瓶颈"""
+
+import pandas as pd
+
+from lead_time import SEGMENTS, STAGE_NODES, bottleneck_stages, build_stage_timeline, return_rates, stage_percentiles
+
+
+def _datasets():
+    plans = pd.DataFrame({
+        '计划编号': ['P1', 'P2', 'P3'],
+        '物料编号': ['M1', 'M1', 'M2'],
+        '架次': ['001', '002', '001'],
+        '供应商': ['甲', '甲', '乙'],
+        '物料类型': ['紧固件', '紧固件', '密封件'],
+        '计划下达日期': pd.to_datetime(['2024-01-10', '2024-01-01', None]),
+    })
+    return {
+        'procurement_plans': plans,
+        # 早于计划下达日期的合同不匹配，取之后的第一条
+        'contracts': pd.DataFrame({
+            '物料编号': ['M1', 'M1', 'M1', 'M2'],
+            '架次': ['001', '001', '001', '001'],
+            '合同签订日期': pd.to_datetime(['2024-01-05', '2024-01-20', '2024-01-15', '2024-02-01']),
+        }),
+        # P1 没有订单记录，到货从合同签订日期继续匹配
+        'orders': pd.DataFrame({
+            '物料编号': ['M1', 'M2'],
+            '架次': ['002', '001'],
+            '订单签收日期': pd.to_datetime(['2024-01-03', '2024-02-03']),
+        }),
+        'deliveries': pd.DataFrame({
+            '物料编号': ['M1', 'M1', 'M2'],
+            '架次': ['001', '001', '001'],
+            '实际到货日期': pd.to_datetime(['2024-01-14', '2024-02-10', '2024-02-13']),
+        }),
+        'returned_materials': pd.DataFrame({'物料编号': ['M2'], '架次': ['001'], '退货日期': pd.to_datetime(['2024-03-01'])}),
+    }
+
+
+def test_timeline_links_stages_forward_per_key():
+    timeline = build_stage_timeline(_datasets()).set_index('计划编号')
+    assert timeline.loc['P1', '合同签订'] == pd.Timestamp('2024-01-15')
+    assert pd.isna(timeline.loc['P1', '订单签收'])
+    assert timeline.loc['P1', '到货'] == pd.Timestamp('2024-02-10')
+    assert timeline.loc['P1', '计划下达→合同签订'] == 5
+    assert pd.isna(timeline.loc['P1', '订单签收→到货'])
+
+    assert pd.isna(timeline.loc['P2', '合同签订'])
+    assert timeline.loc['P2', '订单签收'] == pd.Timestamp('2024-01-03')
+    assert pd.isna(timeline.loc['P2', '到货'])
+
+    # 计划下达日期缺失时从该键的第一条记录开始匹配
+    assert timeline.loc['P3', '合同签订'] == pd.Timestamp('2024-02-01')
+    assert timeline.loc['P3', '订单签收→到货'] == 10
+    assert timeline['有退货'].tolist() == [False, False, True]
+    assert list(timeline.columns[-len(SEGMENTS) - 1:-1]) == SEGMENTS
+
+
+def test_missing_plans_give_empty_timeline():
+    timeline = build_stage_timeline({})
+    assert timeline.empty
+    assert set(STAGE_NODES + SEGMENTS) <= set(timeline.columns)
+
+
+def test_percentiles_and_bottlenecks():
+    timeline = build_stage_timeline(_datasets())
+    stats = stage_percentiles(timeline).set_index('环节')
+    assert stats.loc['计划下达→合同签订', '样本数'] == 1
+    assert stats.loc['订单签收→到货', 'P50'] == 10
+    stage, days = bottleneck_stages(stats.reset_index())
+    assert (stage, days) == ('订单签收→到货', 10)
+
+    by_supplier = bottleneck_stages(stage_percentiles(timeline, by='供应商'), by='供应商')
+    assert by_supplier.set_index('供应商')['瓶颈环节'].to_dict() == {'甲': '计划下达→合同签订', '乙': '订单签收→到货'}
+    assert return_rates(timeline, '供应商').to_dict() == {'甲': 0.0, '乙': 100.0}
@@ -0,0 +1,95 @@
+# -*- coding: utf-8 -*-
+"""天数差距分位数草图：误差上限、增量修补、精确计算的回退"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from quantile_sketch import RELATIVE_ACCURACY, GapSketches, exact_group_percentiles, exact_percentiles
+
+
+def _frame(n_rows=5000, seed=4):
+    rng = np.random.default_rng(seed)
+    gaps = np.round(rng.lognormal(2.5, 1.5, n_rows) * np.where(rng.random(n_rows) < 0.3, -1, 1))
+    gaps[rng.random(n_rows) < 0.05] = np.nan
+    return pd.DataFrame({
+        '供应商': rng.choice(['S1', 'S2', 'S3'], n_rows).astype(object),
+        '物料类型': rng.choice(['紧固件', '密封件'], n_rows).astype(object),
+        '有效性': '有效',
+        '物料编号': rng.choice([f'M{i}' for i in range(40)] + [None], n_rows),
+        '架次': rng.choice(['2', '10', '11'], n_rows).astype(object),
+        '天数差距': gaps,
+    })
+
+
+def _counts_equal(left, right):
+    for by in right.counts:
+        pd.testing.assert_series_equal(left.counts[by].sort_index(), right.counts[by].sort_index(),
+                                       check_index_type=False)
+
+
+def _exact(df, by):
+    """逐组精确计算分位数（method='lower'）"""
+    groups = df[by].astype(object).fillna('（空）')
+    return df.groupby(groups)['天数差距'].apply(exact_percentiles).unstack()
+
+
+def test_percentiles_within_relative_bound():
+    df = _frame()
+    sketches = GapSketches(df)
+    columns = ['P50', 'P90', 'P95', 'P99']
+    for by in ('供应商', '物料编号', '架次'):
+        expected = _exact(df, by)
+        sketched = sketches.percentiles(by=by).reindex(expected.index)
+        assert (sketched['样本数'] == df[by].astype(object).fillna('（空）')[df['天数差距'].notna()]
+                .value_counts().reindex(expected.index)).all()
+        error = np.abs(sketched[columns].to_numpy() - expected[columns].to_numpy())
+        assert (error <= RELATIVE_ACCURACY * np.abs(expected[columns].to_numpy()) + 0.5).all()
+
+
+def test_small_integer_gaps_are_exact():
+    gaps = pd.Series([-3, -1, 0, 0, 2, 5, 7, 12, 30, 45, np.nan], dtype='float64')
+    df = pd.DataFrame({'供应商': 'S1', '天数差距': gaps})
+    sketched = GapSketches(df).percentiles()
+    pd.testing.assert_series_equal(sketched.iloc[0].drop('样本数'), exact_percentiles(gaps), check_names=False)
+
+
+def test_updated_sketches_match_fresh_build():
+    df = _frame()
+    rows = np.arange(0, len(df), 17)
+    added = df.iloc[rows].copy()
+    added['天数差距'] = np.where(np.arange(len(rows)) % 4 == 0, np.nan, -added['天数差距'] + 3)
+    added.iloc[0, added.columns.get_loc('供应商')] = 'S4'
+    appended = df.iloc[:5].assign(物料编号='M-NEW', 天数差距=1000.0)
+    added = pd.concat([added, appended], ignore_index=True)
+    patched = df.copy()
+    patched.iloc[rows] = added.iloc[:len(rows)].to_numpy()
+    patched = pd.concat([patched, appended], ignore_index=True)
+
+    updated = GapSketches(df).updated(df.iloc[rows], added)
+    fresh = GapSketches(patched)
+    _counts_equal(updated, fresh)
+    for by in (None, '供应商', '物料编号', '架次'):
+        pd.testing.assert_frame_equal(updated.percentiles(by=by), fresh.percentiles(by=by), check_index_type=False)
+    pd.testing.assert_frame_equal(updated.percentiles({'供应商': ['S1', 'S4']}, by='物料类型'),
+                                  fresh.percentiles({'供应商': ['S1', 'S4']}, by='物料类型'))
+
+
+def test_filtered_group_queries_fall_back_to_exact():
+    df = _frame()
+    sketches = GapSketches(df)
+    selections = {'供应商': ['S1']}
+    assert sketches.covers(selections, by='供应商')
+    assert sketches.covers({}, by='物料编号')
+    assert not sketches.covers(selections, by='物料编号')
+    with pytest.raises(ValueError):
+        sketches.percentiles(selections, by='物料编号')
+
+    rows = np.flatnonzero(df['供应商'].eq('S1').to_numpy())
+    table = exact_group_percentiles(df['天数差距'].to_numpy()[rows], df['物料编号'].iloc[rows])
+    subset = df.iloc[rows]
+    assert table.index.name == '物料编号'
+    assert '（空）' in table.index
+    assert table.loc['M0', 'P50'] == np.quantile(subset.loc[subset['物料编号'] == 'M0', '天数差距'].dropna(), 0.5,
+                                                 method='lower')
+    assert table['样本数'].sum() == subset['天数差距'].notna().sum()
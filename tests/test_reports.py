@@ -0,0 +1,109 @@
+# -*- coding: utf-8 -*-
+"""报告生成：分块写出的CSV与整表导出一致，zip 与 xlsx 报告内容完整"""
+
+import codecs
+import io
+import zipfile
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from analysis_engine import build_analysis_dataset, build_batch_summary
+from reports import (BATCH_REPORT, GAP_REPORT, SUMMARY_REPORT, build_report, keep_report, overview_table,
+                     report_size, write_csv_chunks)
+
+
+def _dataset():
+    plans = pd.DataFrame({
+        '计划编号': ['P1', 'P2', 'P3', 'P4'],
+        '物料编号': ['M1', 'M2', 'M3', 'M4'],
+        '物料名称': ['螺栓', '垫片', '螺母', '轴承'],
+        '物料类型': ['紧固件', '密封件', '紧固件', '传动件'],
+        '供应商': ['甲', '乙', '甲', '丙'],
+        '架次': ['001', '001', '002', '002'],
+        '需求数量': [10, 20, 30, 40],
+        '需求日期': pd.to_datetime(['2024-01-10', '2024-01-10', '2024-01-20', '2024-01-20']),
+    })
+    deliveries = pd.DataFrame({
+        '物料编号': ['M1', 'M2', 'M3'],
+        '架次': ['001', '001', '002'],
+        '已到货数量': [10, 20, 15],
+        '实际到货日期': pd.to_datetime(['2024-01-12', '2024-01-05', '2024-01-30']),
+    })
+    merged_data = build_analysis_dataset(plans, deliveries)
+    return merged_data, build_batch_summary(merged_data)
+
+
+def _read(report_type, compress=False):
+    merged_data, batch_summary = _dataset()
+    report_file, extension, mime = build_report(report_type, merged_data, batch_summary, compress)
+    with report_file:
+        return report_file.read(), extension, mime
+
+
+def test_csv_chunks_match_whole_frame_export():
+    df = pd.DataFrame({'a': np.arange(10), 'b': list('abcdefghij')})
+    out = io.BytesIO()
+    write_csv_chunks(df, out, chunk_rows=3, order=np.arange(10)[::-1])
+    data = out.getvalue()
+    assert data.startswith(codecs.BOM_UTF8)
+    assert data.decode('utf-8-sig') == df.iloc[::-1].to_csv(index=False)
+    assert not out.closed
+
+    out = io.BytesIO()
+    write_csv_chunks(df.iloc[:0], out, chunk_rows=3)
+    assert out.getvalue().decode('utf-8-sig') == 'a,b\n'
+
+
+def test_gap_report_sorted_by_gap_with_missing_last():
+    data, extension, mime = _read(GAP_REPORT)
+    assert (extension, mime) == ('csv', 'text/csv')
+    report = pd.read_csv(io.BytesIO(data), encoding='utf-8-sig', dtype={'架次': str})
+    assert report['计划编号'].tolist() == ['P3', 'P1', 'P2', 'P4']
+    assert report['天数差距'].tolist()[:3] == [10, 2, -5] and pd.isna(report['天数差距'].iloc[3])
+
+
+def test_zip_report_contains_the_csv():
+    plain, _, _ = _read(BATCH_REPORT)
+    data, extension, _ = _read(BATCH_REPORT, compress=True)
+    assert extension == 'zip'
+    with zipfile.ZipFile(io.BytesIO(data)) as archive:
+        assert archive.read(f'{BATCH_REPORT}.csv') == plain
+    batches = pd.read_csv(io.BytesIO(plain), encoding='utf-8-sig', dtype={'架次': str})
+    assert batches['架次'].tolist() == ['001', '002']
+    assert batches['完成率'].tolist() == [100.0, 21.43]
+
+
+def test_large_report_is_copied_to_disk(tmp_path):
+    """超过下载上限的报告不读回内存，分块复制到本地文件"""
+    plain, _, _ = _read(GAP_REPORT)
+    merged_data, batch_summary = _dataset()
+    report_file, _, _ = build_report(GAP_REPORT, merged_data, batch_summary)
+    with report_file:
+        assert report_size(report_file) == len(plain)
+        path = keep_report(report_file, str(tmp_path / 'reports' / 'gap.csv'))
+    with open(path, 'rb') as saved:
+        assert saved.read() == plain
+    assert not (tmp_path / 'reports' / 'gap.csv.partial').exists()
+
+
+def test_summary_workbook_sheets():
+    openpyxl = pytest.importorskip('openpyxl')
+    data, extension, _ = _read(SUMMARY_REPORT, compress=True)
+    assert extension == 'xlsx'
+    workbook = openpyxl.load_workbook(io.BytesIO(data), read_only=True)
+    assert workbook.sheetnames == ['汇总', '架次汇总', '供应商汇总']
+    overview = {row[0]: row[1] for row in workbook['汇总'].iter_rows(min_row=2, values_only=True)}
+    assert overview['计划行数'] == 4
+    assert overview['延迟物料数'] == 2
+    assert overview['按时到货率(%)'] == 25.0
+    assert overview['已齐套架次'] == 1
+
+
+def test_overview_table_metrics():
+    merged_data, batch_summary = _dataset()
+    overview = overview_table(merged_data, batch_summary).set_index('指标')['数值']
+    assert overview['总需求数量'] == 100 and overview['总到货数量'] == 45
+    assert overview['总完成率(%)'] == 45.0
+    assert overview['平均时间差距(天)'] == 2.33
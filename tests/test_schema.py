@@ -0,0 +1,86 @@
+# -*- coding: utf-8 -*-
+"""录入数据的批量校验与紧凑类型转换"""
+
+import pandas as pd
+
+from schema import COMPACT_STRING_DTYPE, compact_frame, frame_memory, validate_rows
+
+
+def _grid():
+    """录入表格：第3行全空（未填写），第2、4行有错误"""
+    return pd.DataFrame({
+        '计划编号': ['P1', 'P2', None, 'P4'],
+        '物料编号': [' M1 ', 'M2', None, ''],
+        '架次': ['001', '002', None, '003'],
+        '需求数量': ['10', '-5', None, 'abc'],
+        '需求日期': ['2024-01-05', '2024-13-45', None, '2024-01-07'],
+    })
+
+
+def test_validate_rows_reports_problems_by_grid_row():
+    normalized, errors = validate_rows(_grid(), 'procurement_plans')
+    # 全空的行忽略，其余行原样返回（规范化后）
+    assert normalized['计划编号'].tolist() == ['P1', 'P2', 'P4']
+    assert normalized['物料编号'].iloc[0] == 'M1'
+    assert normalized['需求数量'].iloc[0] == 10
+    assert list(errors.columns) == ['行号', '列', '问题']
+    assert sorted(map(tuple, errors.to_numpy().tolist())) == [
+        (2, '需求数量', '数量不能为负数'),
+        (2, '需求日期', '不是有效日期'),
+        (4, '物料编号', '必填项为空'),
+        (4, '需求数量', '不是有效数字'),
+    ]
+    assert errors['行号'].is_monotonic_increasing
+
+
+def test_validate_rows_without_errors():
+    grid = _grid().iloc[:1]
+    normalized, errors = validate_rows(grid, 'procurement_plans')
+    assert errors.empty and list(errors.columns) == ['行号', '列', '问题']
+    assert len(normalized) == 1
+    assert normalized['需求日期'].iloc[0] == pd.Timestamp('2024-01-05')
+
+
+def test_validate_rows_for_batch_mapping():
+    """架次映射的批量录入：物料编号和有效起始架次必填，结束架次可空"""
+    grid = pd.DataFrame({
+        '物料编号': ['M1', ' M2 ', None],
+        '物料名称': ['螺栓', None, '垫片'],
+        '有效起始架次': ['001', 'B002', '003'],
+        '有效结束架次': [None, '010', None],
+    })
+    normalized, errors = validate_rows(grid, 'material_batch_mapping')
+    assert normalized['物料编号'].tolist()[:2] == ['M1', 'M2']
+    assert errors.to_numpy().tolist() == [[3, '物料编号', '必填项为空']]
+
+
+def test_compact_frame_uses_small_lossless_types():
+    n = 1000
+    df = pd.DataFrame({
+        '计划编号': [f'P{i}' for i in range(n)],
+        '物料编号': [f'M{i % 10}' for i in range(n)],
+        '供应商': ['甲', '乙'] * (n // 2),
+        '架次': [f'{i:04d}' for i in range(n)],
+        '需求数量': list(range(n)),
+        '需求日期': ['2024-01-05'] * n,
+    })
+    compact = compact_frame(df, 'procurement_plans')
+    # 取值较少的键列和分类列转为 category，取值多的键列保持文本
+    assert isinstance(compact['物料编号'].dtype, pd.CategoricalDtype)
+    assert isinstance(compact['供应商'].dtype, pd.CategoricalDtype)
+    assert not isinstance(compact['架次'].dtype, pd.CategoricalDtype)
+    if COMPACT_STRING_DTYPE is not None:
+        assert compact['计划编号'].dtype == COMPACT_STRING_DTYPE
+    assert compact['需求数量'].dtype == 'int16'
+    assert pd.api.types.is_datetime64_any_dtype(compact['需求日期'])
+    assert compact['物料编号'].astype(object).tolist() == df['物料编号'].tolist()
+    assert frame_memory(compact) < frame_memory(df)
+
+
+def test_compact_quantities_keep_missing_and_fractions_as_float():
+    df = pd.DataFrame({'已到货数量': [1.0, None, 3.0], '物料编号': ['M1', 'M1', 'M2']})
+    assert compact_frame(df, 'deliveries')['已到货数量'].dtype == 'float64'
+    df['已到货数量'] = [1.5, 2.0, 3.0]
+    assert compact_frame(df, 'deliveries')['已到货数量'].tolist() == [1.5, 2.0, 3.0]
+    df['已到货数量'] = [1.0, 2.0, 300.0]
+    assert compact_frame(df, 'deliveries')['已到货数量'].dtype == 'int16'